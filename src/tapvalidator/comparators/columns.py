@@ -11,18 +11,21 @@ class ColumnComparator:
     TAP Query) with the expected columns we get when checking the table in TAP_SCHEMA
 
     Methods:
-        compare_columns (actual_columns: Result, expected_columns: Result) -> bool
+        compare_columns (actual_columns: Result, expected_columns: Result | dict)
+            -> bool
 
     """
 
     @staticmethod
-    def compare(actual: Result | None, expected: Result | None) -> bool:
+    def compare(actual: Result | None, expected: Result | dict | None) -> bool:
         """
         Compare the columns we get from a query to a table in TAP, with the expected
         columns we see in TAP_SCHEMA for that table
         Args:
             actual (VOTable):The actual columns we got for the query
-            expected (VOTable): The expected columns in TAP_SCHEMA
+            expected (VOTable | dict): The expected columns in TAP_SCHEMA, either as
+                the result of a columns query or as a mapping of column name to
+                datatype (i.e. from a ColumnIndex)
 
         Returns:
             bool: Whether the comparison was successful or not
@@ -60,9 +63,16 @@ class ColumnComparator:
             return mapping
 
         actual_columns = _get_columns_from_votable_fields(actual)
-        expected_columns = _get_columns_from_votable_data(expected)
+        expected_columns = (
+            expected
+            if isinstance(expected, dict)
+            else _get_columns_from_votable_data(expected)
+        )
 
         for k, v in actual_columns.items():
+            if k not in expected_columns:
+                logger.error(f"Column {k} not found in TAP_SCHEMA")
+                return False
             expected_col = convert_type(settings.database_engine, expected_columns[k])
             if expected_col == v:
                 continue
@@ -1,59 +1,402 @@
-from tapvalidator.models.result import VOTable
+import mmap
+from itertools import zip_longest
+from typing import BinaryIO
+import numpy as np
+from tapvalidator.models.comparison_options import ComparisonOptions
+from tapvalidator.models.comparison_report import ComparisonReport
+from astropy.io.votable.tree import Table  # type: ignore
+from tapvalidator.models.result import Result, VOTable
+from tapvalidator.settings import settings
+from tapvalidator.utility.votable_stream import VOTableRowReader
+
+__all__ = ["VOTableComparator", "StreamingVOTableComparator"]
+
+
+def _values_equal(value1, value2) -> bool:
+    """Compare two values of an object column (i.e. strings or variable length
+    arrays), considering NaN values as equal
+
+    Args:
+        value1: The first value
+        value2: The second value
+
+    Returns:
+        bool: Whether the values are equal
+    """
+    if isinstance(value1, np.ndarray) or isinstance(value2, np.ndarray):
+        array1, array2 = np.ma.asarray(value1), np.ma.asarray(value2)
+        if array1.shape != array2.shape:
+            return False
+        return not VOTableComparator.column_mismatches(
+            array1.ravel(), array2.ravel()
+        ).any()
+    if isinstance(value1, float) and isinstance(value2, float):
+        return value1 == value2 or (value1 != value1 and value2 != value2)
+    return bool(value1 == value2)
+
+
+def _first_table(result: VOTable | Result) -> Table | None:
+    """Get the first table of a result
+
+    Args:
+        result (VOTable | Result): The result
+
+    Returns:
+        Table | None: The table, or None if the result has no table
+    """
+    if not isinstance(result, VOTable):
+        return None
+    try:
+        return result.astropy_table
+    except IndexError:
+        return None
+
+
+def _json_value(column: np.ndarray, row: int):
+    """Get a value of a column as a JSON serializable value, for reports
+
+    Args:
+        column (np.ndarray): The column, optionally a masked array
+        row (int): The row index
+
+    Returns:
+        The value, None if it is masked
+    """
+    if np.ma.getmaskarray(column)[row].all():
+        return None
+    value = np.ma.getdata(column)[row]
+    if isinstance(value, np.ndarray):
+        return [_json_value(value, index) for index in range(len(value))]
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return str(value)
+    return value
 
 
 class VOTableComparator:
     """Comparator implementation for comparing two VOTables"""
 
     @staticmethod
-    def compare(votable1: VOTable, votable2: VOTable) -> bool:
+    def column_mismatches(
+        column1: np.ndarray,
+        column2: np.ndarray,
+        atol: float = 0.0,
+        rtol: float = 0.0,
+    ) -> np.ndarray:
+        """Compare two columns row by row, with vectorised numpy operations
+
+        NaN values are considered equal to each other, two masked (null) values
+        are considered equal, and a masked value is never equal to an unmasked one.
+        Numeric values are equal if |value1 - value2| <= atol + rtol * the largest
+        of |value1| and |value2|
+
+        Args:
+            column1 (np.ndarray): The first column, optionally a masked array
+            column2 (np.ndarray): The second column, optionally a masked array
+            atol (float): The absolute tolerance for numeric values
+            rtol (float): The relative tolerance for numeric values
+
+        Returns:
+            np.ndarray: Boolean array, True for the rows where the columns differ
+        """
+        nrows = len(column1)
+        mask1 = np.ma.getmaskarray(column1)
+        mask2 = np.ma.getmaskarray(column2)
+        data1 = np.ma.getdata(column1)
+        data2 = np.ma.getdata(column2)
+
+        if data1.shape != data2.shape:
+            return np.ones(nrows, dtype=bool)
+
+        if data1.dtype.kind == "O" or data2.dtype.kind == "O":
+            equal = np.fromiter(
+                (_values_equal(v1, v2) for v1, v2 in zip(data1.flat, data2.flat)),
+                dtype=bool,
+                count=data1.size,
+            ).reshape(data1.shape)
+        else:
+            equal = np.asarray(data1 == data2)
+            if equal.shape != data1.shape:
+                return np.ones(nrows, dtype=bool)
+            if data1.dtype.kind in "fc" and data2.dtype.kind in "fc":
+                equal |= np.isnan(data1) & np.isnan(data2)
+            if (
+                (atol or rtol)
+                and data1.dtype.kind in "iuf"
+                and data2.dtype.kind in "iuf"
+            ):
+                values1 = data1.astype(np.float64)
+                values2 = data2.astype(np.float64)
+                with np.errstate(invalid="ignore", over="ignore"):
+                    equal |= np.abs(values1 - values2) <= atol + rtol * np.maximum(
+                        np.abs(values1), np.abs(values2)
+                    )
+
+        equal = np.where(mask1 & mask2, True, np.where(mask1 | mask2, False, equal))
+        return ~equal.reshape(nrows, -1).all(axis=1)
+
+    @staticmethod
+    def field_differences(fields1: dict[str, str], fields2: dict[str, str]) -> list:
+        """Describe the differences between the fields of two tables
+
+        Args:
+            fields1 (dict[str, str]): The datatype of each field of the first table
+            fields2 (dict[str, str]): The datatype of each field of the second table
+
+        Returns:
+            list[str]: The differences, empty if the fields match
         """
-        Compares two VOTable results to ensure they have the same number of rows.
+        differences = []
+        for name, datatype in fields1.items():
+            if name not in fields2:
+                differences.append(f"Field [{name}] is missing from the second result")
+            elif fields2[name] != datatype:
+                differences.append(
+                    f"Field [{name}] has datatype [{datatype}] in the first result "
+                    f"and [{fields2[name]}] in the second"
+                )
+        for name in fields2:
+            if name not in fields1:
+                differences.append(f"Field [{name}] is missing from the first result")
+        if not differences and list(fields1) != list(fields2):
+            differences.append("Fields are in a different order")
+        return differences
+
+    @staticmethod
+    def match_rows(
+        data1: np.ndarray, data2: np.ndarray, key_columns: list[str]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Match the rows of two tables on their key columns
+
+        The values of each key column of both tables are encoded as integers with
+        np.unique, the encoded keys of each row are combined into a single integer,
+        and the rows are then matched with a sort-merge (np.intersect1d)
 
         Args:
-            votable1 (VOTable): The first VOTable result.
-            votable2 (VOTable): The second VOTable result.
+            data1 (np.ndarray): The rows of the first table
+            data2 (np.ndarray): The rows of the second table
+            key_columns (list[str]): The columns identifying a row
 
         Returns:
-            bool: True if the VOTables have the same number of rows; False otherwise.
+            tuple[np.ndarray, np.ndarray]: The indices of the matched rows in each
+                table, ordered by key. Only the first row of duplicated keys is
+                matched
         """
-        if len(votable1.data) == 0 and len(votable2.data) == 0:
-            return True
+        codes = []
+        for name in key_columns:
+            values = np.ma.concatenate([data1[name], data2[name]])
+            _, code = np.unique(np.ma.getdata(values), return_inverse=True)
+            codes.append(np.where(np.ma.getmaskarray(values), -1, code.ravel()))
+        _, keys = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+        keys = keys.ravel()
+        keys1, keys2 = np.split(keys, [len(data1)])
+        _, index1, index2 = np.intersect1d(keys1, keys2, return_indices=True)
+        return index1, index2
 
-        try:
-            first_table1 = votable1.astropy_table
-        except IndexError:
-            first_table1 = None
+    @staticmethod
+    def diff(
+        votable1: VOTable | Result,
+        votable2: VOTable | Result,
+        options: ComparisonOptions | None = None,
+        max_rows: int = settings.comparison_report_rows,
+    ) -> ComparisonReport:
+        """
+        Compares two VOTable results, reporting the differences in their fields and
+        row counts, and the mismatched values of their common columns. Each column
+        is compared in a single vectorised pass over the rows both tables have
 
-        try:
-            first_table2 = votable2.astropy_table
-        except IndexError:
-            first_table2 = None
+        Args:
+            votable1 (VOTable | Result): The first VOTable result.
+            votable2 (VOTable | Result): The second VOTable result.
+            options (ComparisonOptions): The tolerances, the columns to compare and
+                the key columns (default: None, compares every value exactly)
+            max_rows (int): The number of mismatched rows included in the report
 
+        Returns:
+            ComparisonReport: The report of the differences
+        """
+        options = options or ComparisonOptions()
+        report = ComparisonReport()
+        if len(votable1.data) == 0 and len(votable2.data) == 0:
+            return report
+
+        first_table1 = _first_table(votable1)
+        first_table2 = _first_table(votable2)
+
+        report.messages = [f"First result: {message}" for message in votable1.messages]
+        report.messages += [
+            f"Second result: {message}" for message in votable2.messages
+        ]
         if not first_table2 and not first_table1:
-            return True
+            return report
         if not first_table2 or not first_table1:
-            return False
-
-        rows_length1 = first_table1.nrows
-        rows_length2 = first_table2.nrows
-        if rows_length1 != rows_length2:
-            return False
+            report.equal = False
+            report.messages.append(
+                f"{'Second' if first_table1 else 'First'} result has no table"
+            )
+            return report
 
+        report.nrows1 = first_table1.nrows
+        report.nrows2 = first_table2.nrows
         data1 = first_table1.array
         data2 = first_table2.array
 
-        for i in range(len(data1)):
-            for j in range(len(data1[i])):
-                if data1[i][j] != data2[i][j]:
-                    return False
+        fields1 = {
+            name: field.datatype
+            for name, field in zip(data1.dtype.names, first_table1.fields)
+            if options.selects(name)
+        }
+        fields2 = {
+            name: field.datatype
+            for name, field in zip(data2.dtype.names, first_table2.fields)
+            if options.selects(name)
+        }
+        report.field_differences = VOTableComparator.field_differences(fields1, fields2)
 
-        fields1 = first_table1.fields
-        fields2 = first_table2.fields
+        rows1: slice | np.ndarray = slice(0, min(report.nrows1, report.nrows2))
+        rows2: slice | np.ndarray = rows1
+        if options.key_columns:
+            missing = [
+                name
+                for name in options.key_columns
+                if name not in data1.dtype.names or name not in data2.dtype.names
+            ]
+            if missing:
+                report.equal = False
+                report.messages.append(f"Key columns {missing} are missing")
+                return report
+            rows1, rows2 = VOTableComparator.match_rows(
+                data1, data2, options.key_columns
+            )
+            report.unmatched_rows1 = report.nrows1 - len(rows1)
+            report.unmatched_rows2 = report.nrows2 - len(rows2)
 
-        for i in range(len(fields1)):
-            if (
-                not fields1[i].ID == fields2[i].ID
-                or not fields1[i].datatype == fields2[i].datatype
-            ):
+        columns = [name for name in fields1 if name in fields2]
+        mismatches = {}
+        for name in columns:
+            atol, rtol = options.tolerance(name)
+            column_mismatches = VOTableComparator.column_mismatches(
+                data1[name][rows1], data2[name][rows2], atol=atol, rtol=rtol
+            )
+            if column_mismatches.any():
+                mismatches[name] = column_mismatches
+                report.column_mismatches[name] = int(column_mismatches.sum())
+
+        if mismatches:
+            mismatched = np.logical_or.reduce(list(mismatches.values()))
+            index1 = np.arange(report.nrows1)[rows1]
+            index2 = np.arange(report.nrows2)[rows2]
+            for row in np.flatnonzero(mismatched)[:max_rows]:
+                mismatched_row = {
+                    "row": int(index1[row]),
+                    "columns": {
+                        name: [
+                            _json_value(data1[name], index1[row]),
+                            _json_value(data2[name], index2[row]),
+                        ]
+                        for name, column_mismatches in mismatches.items()
+                        if column_mismatches[row]
+                    },
+                }
+                if options.key_columns:
+                    mismatched_row["key"] = {
+                        name: _json_value(data1[name], index1[row])
+                        for name in options.key_columns
+                    }
+                report.mismatched_rows.append(mismatched_row)
+
+        report.equal = (
+            report.nrows1 == report.nrows2
+            and not report.unmatched_rows1
+            and not report.unmatched_rows2
+            and not report.field_differences
+            and not report.column_mismatches
+        )
+        return report
+
+    @staticmethod
+    def compare(
+        votable1: VOTable | Result,
+        votable2: VOTable | Result,
+        options: ComparisonOptions | None = None,
+    ) -> bool:
+        """
+        Compares two VOTable results, checking that they have the same fields and
+        the same values in every row
+
+        Args:
+            votable1 (VOTable | Result): The first VOTable result.
+            votable2 (VOTable | Result): The second VOTable result.
+            options (ComparisonOptions): The tolerances, the columns to compare and
+                the key columns (default: None, compares every value exactly)
+
+        Returns:
+            bool: True if the VOTables have the same fields and rows; False
+                otherwise.
+        """
+        return VOTableComparator.diff(votable1, votable2, options, max_rows=0).equal
+
+
+class StreamingVOTableComparator:
+    """Comparator implementation for comparing two TABLEDATA VOTables in chunks of
+    rows, so the memory used does not grow with the size of the tables"""
+
+    @staticmethod
+    def compare(
+        source1: bytes | mmap.mmap | BinaryIO,
+        source2: bytes | mmap.mmap | BinaryIO,
+        chunk_size: int = settings.comparison_chunk_size,
+        options: ComparisonOptions | None = None,
+    ) -> bool:
+        """
+        Compares two VOTables, read incrementally from bytes, memory-mapped views
+        of spooled responses or binary files
+
+        Rows are compared by position, so options with key columns are not
+        supported. Only TABLEDATA VOTables can be read in chunks, a ValueError is
+        raised for other serializations
+
+        Args:
+            source1 (bytes | mmap.mmap | BinaryIO): The first VOTable
+            source2 (bytes | mmap.mmap | BinaryIO): The second VOTable
+            chunk_size (int): The number of rows compared at a time
+            options (ComparisonOptions): The tolerances and the columns to compare
+                (default: None, compares every value exactly)
+
+        Returns:
+            bool: True if the VOTables have the same fields and rows; False
+                otherwise.
+        """
+        options = options or ComparisonOptions()
+        if options.key_columns:
+            raise ValueError("Key columns are not supported when streaming VOTables")
+
+        chunks1 = VOTableRowReader.iter_chunks(source1, chunk_size)
+        chunks2 = VOTableRowReader.iter_chunks(source2, chunk_size)
+
+        for chunk1, chunk2 in zip_longest(chunks1, chunks2):
+            if chunk1 is None or chunk2 is None:
+                return False
+            (reader1, rows1), (reader2, rows2) = chunk1, chunk2
+            if not reader1.is_tabledata or not reader2.is_tabledata:
+                raise ValueError("Only TABLEDATA VOTables can be streamed")
+            if len(rows1) != len(rows2):
                 return False
+            fields1 = [f for f in reader1.fields if options.selects(f.name)]
+            fields2 = [f for f in reader2.fields if options.selects(f.name)]
+            if [(f.name, f.datatype) for f in fields1] != [
+                (f.name, f.datatype) for f in fields2
+            ]:
+                return False
+            columns1 = reader1.to_columns(rows1)
+            columns2 = reader2.to_columns(rows2)
+            for field in fields1:
+                atol, rtol = options.tolerance(field.name)
+                if VOTableComparator.column_mismatches(
+                    columns1[field.name], columns2[field.name], atol=atol, rtol=rtol
+                ).any():
+                    return False
         return True
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+__all__ = ["ValidationBudget"]
+
+
+@dataclass
+class ValidationBudget:
+    """The time and number of queries a table validation may use
+
+    Attributes:
+        deadline (float): The wall-clock time the validation may take in seconds,
+            queries still running at the deadline are cancelled (default: 0, no
+            limit)
+        max_queries (int): The maximum number of tables queried (default: 0, no
+            limit)
+    """
+
+    deadline: float = 0.0
+    max_queries: int = 0
+
+    def __post_init__(self):
+        if self.deadline < 0 or self.max_queries < 0:
+            raise ValueError("The budget of a validation can not be negative")
+
+    @property
+    def is_limited(self) -> bool:
+        """Check whether the budget limits the validation"""
+        return bool(self.deadline or self.max_queries)
@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+
+__all__ = ["ColumnIndex"]
+
+
+@dataclass
+class ColumnIndex:
+    """In-memory index of the columns in TAP_SCHEMA, keyed by schema and table
+
+    Attributes:
+        columns (dict): Mapping of (schema_name, table_name) to a mapping of column
+            name to datatype
+        schemas (set): The schemas whose columns have been loaded
+    """
+
+    columns: dict[tuple[str, str], dict[str, str]] = field(default_factory=dict)
+    schemas: set[str] = field(default_factory=set)
+
+    def add(self, schema_name: str, table_name: str, column_name: str, datatype: str):
+        """Add a column to the index
+
+        Args:
+            schema_name (str): The schema name
+            table_name (str): The table name
+            column_name (str): The column name
+            datatype (str): The datatype of the column
+        """
+        self.columns.setdefault((schema_name, table_name), {})[column_name] = datatype
+
+    def get(self, schema_name: str, table_name: str) -> dict[str, str] | None:
+        """Get the columns of a table
+
+        Args:
+            schema_name (str): The schema name
+            table_name (str): The table name
+
+        Returns:
+            dict[str, str] | None: Mapping of column name to datatype, or None if
+                the table is not in the index
+        """
+        return self.columns.get((schema_name, table_name))
+
+    def discard(self, schema_name: str):
+        """Remove a schema and the columns of its tables from the index
+
+        Args:
+            schema_name (str): The schema name
+        """
+        self.schemas.discard(schema_name)
+        for key in [key for key in self.columns if key[0] == schema_name]:
+            del self.columns[key]
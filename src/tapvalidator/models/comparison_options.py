@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from tapvalidator.settings import settings
+
+__all__ = ["ComparisonOptions"]
+
+
+@dataclass
+class ComparisonOptions:
+    """Options of the comparison of two query results
+
+    Attributes:
+        atol (float): The absolute tolerance for numeric values
+        rtol (float): The relative tolerance for numeric values
+        tolerances (dict[str, tuple[float, float]]): The (absolute, relative)
+            tolerance of specific columns, overriding atol and rtol
+        include (list[str]): The columns to compare, all if empty
+        exclude (list[str]): The columns not compared
+        key_columns (list[str]): Columns identifying a row, if set rows are matched
+            on these columns instead of by position, so the order of the rows does
+            not matter
+        page_size (int): If set, queries are split into pages of about this many
+            rows over the range of the first key column, compared concurrently
+            (default: settings.comparison_page_size, 0 to disable)
+    """
+
+    atol: float = settings.comparison_atol
+    rtol: float = settings.comparison_rtol
+    tolerances: dict[str, tuple[float, float]] = field(default_factory=dict)
+    include: list[str] = field(default_factory=list)
+    exclude: list[str] = field(default_factory=list)
+    key_columns: list[str] = field(default_factory=list)
+    page_size: int = settings.comparison_page_size
+
+    def tolerance(self, name: str) -> tuple[float, float]:
+        """Get the tolerance of a column
+
+        Args:
+            name (str): The name of the column
+
+        Returns:
+            tuple[float, float]: The absolute and relative tolerance
+        """
+        return self.tolerances.get(name, (self.atol, self.rtol))
+
+    def selects(self, name: str) -> bool:
+        """Check whether a column is compared
+
+        Args:
+            name (str): The name of the column
+
+        Returns:
+            bool: True if the column is compared
+        """
+        return (not self.include or name in self.include) and name not in self.exclude
+
+    @staticmethod
+    def parse_tolerance(tolerance: str) -> tuple[str, float, float]:
+        """Parse the tolerance of a column
+
+        Args:
+            tolerance (str): The tolerance as "name:atol:rtol"
+
+        Returns:
+            tuple[str, float, float]: The column name, and its absolute and
+                relative tolerances
+
+        Raises:
+            ValueError: If the tolerance is not a name and two numbers
+        """
+        parts = tolerance.rsplit(":", 2)
+        try:
+            name, column_atol, column_rtol = parts
+            return name, float(column_atol), float(column_rtol)
+        except ValueError:
+            raise ValueError(
+                f"Invalid column tolerance [{tolerance}], expected name:atol:rtol"
+            ) from None
+
+    @classmethod
+    def from_strings(
+        cls,
+        atol: float = settings.comparison_atol,
+        rtol: float = settings.comparison_rtol,
+        tolerances: tuple[str, ...] = (),
+        include: str = "",
+        exclude: str = "",
+        key_columns: str = "",
+        page_size: int = settings.comparison_page_size,
+    ) -> "ComparisonOptions":
+        """Create the options from their command line representation
+
+        Args:
+            atol (float): The absolute tolerance for numeric values
+            rtol (float): The relative tolerance for numeric values
+            tolerances (tuple[str, ...]): Column tolerances as "name:atol:rtol"
+            include (str): Comma separated columns to compare
+            exclude (str): Comma separated columns not compared
+            key_columns (str): Comma separated columns identifying a row
+            page_size (int): The number of rows of each page, 0 to disable paging
+
+        Returns:
+            ComparisonOptions: The options
+
+        Raises:
+            ValueError: If a column tolerance is invalid
+        """
+
+        def _names(value: str) -> list[str]:
+            return [name.strip() for name in value.split(",") if name.strip()]
+
+        column_tolerances = {}
+        for tolerance in tolerances:
+            name, column_atol, column_rtol = cls.parse_tolerance(tolerance)
+            column_tolerances[name] = (column_atol, column_rtol)
+
+        return cls(
+            atol=atol,
+            rtol=rtol,
+            tolerances=column_tolerances,
+            include=_names(include),
+            exclude=_names(exclude),
+            key_columns=_names(key_columns),
+            page_size=page_size,
+        )
@@ -0,0 +1,133 @@
+import json
+from dataclasses import dataclass, field
+
+__all__ = ["ComparisonReport"]
+
+
+@dataclass
+class ComparisonReport:
+    """Report of the differences between the results of a query on two TAP Services
+
+    Attributes:
+        query (str): The query that was compared (default "")
+        equal (bool): Whether the results are the same (default True)
+        nrows1 (int): The number of rows of the first result
+        nrows2 (int): The number of rows of the second result
+        unmatched_rows1 (int): The rows of the first result without a matching row
+            in the second, when rows are matched on key columns
+        unmatched_rows2 (int): The rows of the second result without a matching
+            row in the first, when rows are matched on key columns
+        field_differences (list[str]): The differences between the fields of the
+            results, i.e. missing fields or different datatypes
+        column_mismatches (dict[str, int]): Number of mismatched rows per column,
+            for the columns with any mismatch
+        mismatched_rows (list[dict]): The first mismatched rows, each with the row
+            index (in the first result), the (first, second) values of its
+            mismatched columns and its key if rows are matched on key columns
+        messages (list[str]): Any other messages, i.e. errors of the queries
+    """
+
+    query: str = ""
+    equal: bool = True
+    nrows1: int = 0
+    nrows2: int = 0
+    unmatched_rows1: int = 0
+    unmatched_rows2: int = 0
+    field_differences: list[str] = field(default_factory=list)
+    column_mismatches: dict[str, int] = field(default_factory=dict)
+    mismatched_rows: list[dict] = field(default_factory=list)
+    messages: list[str] = field(default_factory=list)
+
+    @property
+    def row_count_delta(self) -> int:
+        """Get the difference between the row counts of the second and first result"""
+        return self.nrows2 - self.nrows1
+
+    @property
+    def summary(self) -> str:
+        """Get a one line summary of the differences
+
+        Returns:
+            str: The summary
+        """
+        if self.equal:
+            return "Results match"
+        parts = []
+        if self.row_count_delta:
+            parts.append(f"row count delta {self.row_count_delta:+d}")
+        if self.unmatched_rows1 or self.unmatched_rows2:
+            parts.append(
+                f"unmatched rows ({self.unmatched_rows1} in first result, "
+                f"{self.unmatched_rows2} in second result)"
+            )
+        if self.field_differences:
+            parts.append(f"{len(self.field_differences)} field differences")
+        if self.column_mismatches:
+            columns = ", ".join(
+                f"{name}: {count}" for name, count in self.column_mismatches.items()
+            )
+            parts.append(f"mismatched rows per column ({columns})")
+        parts.extend(self.messages)
+        return "; ".join(parts) or "Results differ"
+
+    @classmethod
+    def combine(
+        cls, query: str, reports: list["ComparisonReport"], max_rows: int
+    ) -> "ComparisonReport":
+        """Combine the reports of the pages of a query into the report of the query
+
+        Args:
+            query (str): The query that was compared
+            reports (list[ComparisonReport]): The report of each page
+            max_rows (int): The number of mismatched rows kept
+
+        Returns:
+            ComparisonReport: The report of the query, where each mismatched row
+                also has the index of its page. The query differs if any page
+                does, or if the total row counts differ
+        """
+        report = cls(query=query, equal=all(page.equal for page in reports))
+        for index, page in enumerate(reports):
+            report.nrows1 += page.nrows1
+            report.nrows2 += page.nrows2
+            report.unmatched_rows1 += page.unmatched_rows1
+            report.unmatched_rows2 += page.unmatched_rows2
+            for difference in page.field_differences:
+                if difference not in report.field_differences:
+                    report.field_differences.append(difference)
+            for name, count in page.column_mismatches.items():
+                report.column_mismatches[name] = (
+                    report.column_mismatches.get(name, 0) + count
+                )
+            for row in page.mismatched_rows[: max_rows - len(report.mismatched_rows)]:
+                report.mismatched_rows.append({"page": index, **row})
+            report.messages.extend(
+                f"Page {index}: {message}" for message in page.messages
+            )
+        if report.nrows1 != report.nrows2:
+            report.equal = False
+        return report
+
+    def as_dict(self) -> dict:
+        """Get the report as a JSON serializable dictionary"""
+        return {
+            "query": self.query,
+            "equal": self.equal,
+            "nrows1": self.nrows1,
+            "nrows2": self.nrows2,
+            "row_count_delta": self.row_count_delta,
+            "unmatched_rows1": self.unmatched_rows1,
+            "unmatched_rows2": self.unmatched_rows2,
+            "field_differences": self.field_differences,
+            "column_mismatches": self.column_mismatches,
+            "mismatched_rows": self.mismatched_rows,
+            "messages": self.messages,
+        }
+
+    def to_json(self) -> str:
+        """Get the report as JSON
+
+        Returns:
+            str: The JSON document
+        """
+        return json.dumps(self.as_dict(), indent=2, default=str)
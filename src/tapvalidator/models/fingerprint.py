@@ -0,0 +1,36 @@
+from dataclasses import dataclass, field
+
+__all__ = ["ResultFingerprint"]
+
+
+@dataclass
+class ResultFingerprint:
+    """Fingerprint of a query result, computed while the response is read
+
+    Attributes:
+        fields (list[tuple[str, str]]): The (name, datatype) of each field
+        nrows (int): The number of rows
+        column_hashes (list[str]): A hash of the values of each column
+        row_hash (str): A hash combining the values of each row
+        ordered (bool): Whether the hashes depend on the order of the rows
+        valid (bool): False if the response was not a successful VOTable, in which
+            case the fingerprint cannot be used to compare results
+    """
+
+    fields: list[tuple[str, str]] = field(default_factory=list)
+    nrows: int = 0
+    column_hashes: list[str] = field(default_factory=list)
+    row_hash: str = ""
+    ordered: bool = False
+    valid: bool = True
+
+    def matches(self, other: "ResultFingerprint") -> bool:
+        """Check whether two results have the same fingerprint
+
+        Args:
+            other (ResultFingerprint): The fingerprint of the other result
+
+        Returns:
+            bool: True if both fingerprints are valid and equal
+        """
+        return self.valid and other.valid and self == other
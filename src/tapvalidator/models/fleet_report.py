@@ -0,0 +1,122 @@
+import json
+from dataclasses import dataclass, field
+from tapvalidator.models.result import ValidationResult
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+
+__all__ = ["ServiceReport", "FleetReport"]
+
+
+@dataclass
+class ServiceReport:
+    """Report of the validation of a single TAP Service of a fleet
+
+    Attributes:
+        url (str): The URL of the TAP Service
+        name (str): The name of the TAP Service
+        status (Status): SUCCESS if every validation succeeded, otherwise the
+            status of the first validation that did not
+        validations (dict[str, dict]): The status, messages and failed queries of
+            each validation
+        duration (float): The time the validation took, in seconds
+    """
+
+    url: str
+    name: str = ""
+    status: Status = Status.PENDING
+    validations: dict[str, dict] = field(default_factory=dict)
+    duration: float = 0.0
+
+    @classmethod
+    def from_results(
+        cls,
+        tap_service: TAPService,
+        results: dict[str, ValidationResult],
+        duration: float = 0.0,
+    ) -> "ServiceReport":
+        """Create the report of a TAP Service from the results of its validators
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            results (dict[str, ValidationResult]): The result of each validator
+            duration (float): The time the validation took, in seconds
+
+        Returns:
+            ServiceReport: The report
+        """
+        report = cls(url=tap_service.url, name=tap_service.name, duration=duration)
+        report.status = Status.SUCCESS
+        for name, result in results.items():
+            if report.status is Status.SUCCESS and result.status is not Status.SUCCESS:
+                report.status = result.status
+            report.validations[name] = {
+                "status": str(result.status),
+                "messages": [str(message) for message in result.messages],
+                "failures": [
+                    getattr(failure, "query_text", str(failure))
+                    for failure in result.failures
+                ],
+            }
+        return report
+
+    def as_dict(self) -> dict:
+        """Get the report as a JSON serializable dictionary"""
+        return {
+            "url": self.url,
+            "name": self.name,
+            "status": str(self.status),
+            "duration": round(self.duration, 3),
+            "validations": self.validations,
+        }
+
+
+@dataclass
+class FleetReport:
+    """Consolidated report of the validation of a fleet of TAP Services
+
+    Attributes:
+        services (list[ServiceReport]): The report of each TAP Service
+    """
+
+    services: list[ServiceReport] = field(default_factory=list)
+
+    @property
+    def failed(self) -> list[ServiceReport]:
+        """Get the reports of the TAP Services that did not pass"""
+        return [
+            service for service in self.services if service.status is not Status.SUCCESS
+        ]
+
+    @property
+    def status(self) -> Status:
+        """Get the status of the fleet, SUCCESS if every TAP Service passed"""
+        return Status.FAIL if self.failed else Status.SUCCESS
+
+    @property
+    def summary(self) -> str:
+        """Get a one line summary of the fleet validation
+
+        Returns:
+            str: The summary
+        """
+        passed = len(self.services) - len(self.failed)
+        summary = f"{passed} of {len(self.services)} TAP Services passed"
+        if self.failed:
+            summary += f", failed: {', '.join(service.url for service in self.failed)}"
+        return summary
+
+    def as_dict(self) -> dict:
+        """Get the report as a JSON serializable dictionary"""
+        return {
+            "status": str(self.status),
+            "summary": self.summary,
+            "services": [service.as_dict() for service in self.services],
+        }
+
+    def to_json(self) -> str:
+        """Get the report as JSON
+
+        Returns:
+            str: The JSON document
+        """
+        return json.dumps(self.as_dict(), indent=2, default=str)
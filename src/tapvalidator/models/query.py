@@ -1,7 +1,9 @@
+import asyncio
 from dataclasses import dataclass, field
 from tapvalidator.models.tap_service import TAPService
 from tapvalidator.models.status import Status
 from tapvalidator.models.result import VOTable, Result
+from tapvalidator.models.result_format import ResultFormat
 from dramatiq.message import Message  # type: ignore
 
 
@@ -18,6 +20,9 @@ class Query:
         table_name (str): The table_name used in the query (default "")
         tap_service (TAPService): The TAPService object being queried (default None)
         result (VOTable): The VOTable object for this query (default None)
+        result_format (ResultFormat): The format the result is requested in, if None
+            it is negotiated with the TAP Service when the query is sent
+            (default None)
     """
 
     query_text: str = ""
@@ -25,6 +30,7 @@ class Query:
     table_name: str = ""
     tap_service: TAPService = field(default_factory=TAPService)
     result: VOTable | Result | None = None
+    result_format: ResultFormat | None = None
 
     def update_status(self, status: Status):
         """Update the Status of the query
@@ -46,8 +52,17 @@ class Query:
 
 @dataclass
 class QueryTask:
+    """QueryTask class, pairs a Query with the handle of its execution in the
+    query backend
+
+    Attributes:
+        query (Query): The Query being executed
+        task (Message | asyncio.Task): The dramatiq message, or the asyncio Task
+            running the query, depending on the backend
+    """
+
     query: Query
-    task: Message
+    task: Message | asyncio.Task
 
     def __hash__(self):
         return hash((id(self.query), id(self.task)))
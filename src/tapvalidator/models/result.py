@@ -1,71 +1,198 @@
+import mmap
+import weakref
 from io import BytesIO
 from dataclasses import dataclass, field
+import astropy.table  # type: ignore
 from astropy.io.votable.tree import Table  # type: ignore
-from astropy.io.votable import parse  # type: ignore
+from astropy.io.votable import from_table, parse  # type: ignore
 from tapvalidator.models.status import Status
+from tapvalidator.models.result_format import ResultFormat
 from tapvalidator.logger.logger import logger
 from tapvalidator.utility.xml_parser import XMLParser
+from tapvalidator.utility.spool import ResultSpool
 
 __all__ = ["Result", "VOTable", "ValidationResult", "TableValidationResult"]
 
+# The astropy readers of the formats that are not VOTable documents
+TABLE_READERS = {ResultFormat.PARQUET: "parquet", ResultFormat.CSV: "ascii.csv"}
+# The magic bytes a Parquet file starts with
+PARQUET_MAGIC = b"PAR1"
+
 
 @dataclass
 class Result:
     """Result class, represents the Result of a Query
 
     Attributes:
-        data (str): The data represented as a string (default "")
+        data (str | bytes | mmap.mmap): The data, either as a string, as the raw
+            bytes of a response or as a memory-mapped view of a spooled response
+            (default "")
         status (Status): The Status of the Result (default Status.Pending)
         messages (list): List of messages that need to be stored along with this Result
     """
 
-    data: str = ""
+    data: str | bytes | mmap.mmap = ""
     status: Status = Status.PENDING
     messages: list = field(default_factory=list)
 
+    @property
+    def raw(self) -> bytes | mmap.mmap:
+        """Get the data as bytes (or its memory-mapped view), encoding it only if
+        it is a string"""
+        return self.data.encode("utf-8") if isinstance(self.data, str) else self.data
+
+    @property
+    def text(self) -> str:
+        """Get the data as a string, decoding it only if it is bytes"""
+        if isinstance(self.data, str):
+            return self.data
+        return bytes(self.data).decode("utf-8", errors="replace")
+
 
 @dataclass
 class VOTable(Result):
-    """Implementation of a Result, specifically a VOTable Result"""
+    """Implementation of a Result, specifically a VOTable Result
+
+    The status is determined on creation by scanning the response for the
+    QUERY_STATUS INFO elements, and the table itself is only parsed the first time
+    astropy_table is accessed. PARQUET and CSV results are converted to a VOTable
+    table when parsed, while errors are still reported as VOTable documents
+
+    Attributes:
+        spool (str): The path of the spool file of a spooled response, whose data is
+            then a memory-mapped view of the file (default "")
+        result_format (ResultFormat): The format the result was requested in
+            (default ResultFormat.VOTABLE)
+    """
+
+    _astropy_table: Table | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _parsed: bool = field(default=False, init=False, repr=False, compare=False)
+    spool: str = ""
+    result_format: ResultFormat = ResultFormat.VOTABLE
+
+    @classmethod
+    def from_response(
+        cls,
+        response: bytes | str | dict,
+        result_format: ResultFormat = ResultFormat.VOTABLE,
+    ) -> "VOTable":
+        """Create a VOTable from the response returned by a query backend
+
+        A spooled response is opened as a memory-mapped view of its spool file, and
+        the file is removed once the VOTable is garbage collected
+
+        Args:
+            response (bytes | str | dict): The response, or the descriptor of a
+                spooled response
+            result_format (ResultFormat): The format the result was requested in
+
+        Returns:
+            VOTable: The VOTable
+        """
+        if not isinstance(response, dict):
+            return cls(data=response, result_format=result_format)
+        path = response["spool"]
+        view = ResultSpool.open(path)
+        votable = cls(data=view, spool=path, result_format=result_format)
+        weakref.finalize(votable, ResultSpool.remove, path, view)
+        return votable
+
+    @property
+    def astropy_table(self) -> Table | None:
+        """Get the table of the VOTable, parsing it on first access
+
+        Returns:
+            Table | None: The parsed table or None if there was an issue
+        """
+        if not self._parsed:
+            self._astropy_table = self.parse_votable(self.data)
+            self._parsed = True
+        return self._astropy_table
 
-    astropy_table: Table | None = None
+    @property
+    def is_document(self) -> bool:
+        """Whether the data is a VOTable document, which is also the case for the
+        errors of queries requesting other formats"""
+        if self.result_format.is_votable:
+            return True
+        return self.raw[:256].lstrip().startswith(b"<")
 
-    def parse_votable(self, data: str) -> Table | None:
-        """Parse a VOTable
+    def parse_votable(self, data: str | bytes | mmap.mmap) -> Table | None:
+        """Parse a VOTable, reading it from its spool file if it was spooled, or
+        read a table in another format as a VOTable table
         Args:
-            data (str): VOTable as string
+            data (str | bytes | mmap.mmap): VOTable as string or bytes
         Returns:
             Table | None: The parsed table or None if there was an issue
         """
         astropy_table = None
 
-        if not data:
+        if not data or self.status is Status.FAIL:
             return None
         try:
-            parsed_table = parse(BytesIO(bytes(self.data, "utf-8")))
+            # BytesIO shares the buffer of the bytes, so the data is not copied
+            raw = data.encode("utf-8") if isinstance(data, str) else data
+            source = self.spool or BytesIO(raw)
+            if self.is_document:
+                parsed_table = parse(source)
+            else:
+                table = astropy.table.Table.read(
+                    source, format=TABLE_READERS[self.result_format]
+                )
+                parsed_table = from_table(table)
             astropy_table = parsed_table.get_first_table()
         except Exception as exc:
             logger.error(exc)
             logger.error(
                 f"Unable to parse Table from VOTable, "
-                f"got following response: {self.data}"
+                f"got following response: {self.text}"
             )
-            self.status = Status.FAIL
-            self.astropy_table = None
-
-        if self.status is Status.FAIL:
-            try:
-                votable_error = XMLParser.get_votable_error(self.data)
-            except Exception as exc:
-                logger.error(exc)
-                logger.error("Unable to parse Error from VOTable")
-                votable_error = "Unknown error occured while trying to parse VOTable"
-            self.messages.append(votable_error)
+            self.fail()
         return astropy_table
 
+    def fail(self):
+        """Set the status to FAIL, storing the error reported in the VOTable"""
+        self.status = Status.FAIL
+        try:
+            votable_error = XMLParser.get_votable_error(bytes(self.raw))
+        except Exception as exc:
+            logger.error(exc)
+            logger.error("Unable to parse Error from VOTable")
+            votable_error = "Unknown error occured while trying to parse VOTable"
+        self.messages.append(votable_error)
+
+    def scan_status(self) -> Status:
+        """Determine the status of the query from the QUERY_STATUS INFO elements
+        and the presence of a TABLE, without parsing the VOTable. Results in other
+        formats have no QUERY_STATUS, so they succeed unless they are a VOTable
+        error document, or a Parquet result that is not a Parquet file
+
+        Returns:
+            Status: The status of the query
+        """
+        if not self.data:
+            return Status.SUCCESS
+        if not self.is_document:
+            if (
+                self.result_format is ResultFormat.PARQUET
+                and self.raw[: len(PARQUET_MAGIC)] != PARQUET_MAGIC
+            ):
+                return Status.FAIL
+            return Status.SUCCESS
+        raw = self.raw
+        query_status = XMLParser.scan_query_status(raw)
+        if "ERROR" in query_status or raw.find(b"<TABLE") == -1:
+            return Status.FAIL
+        if "OVERFLOW" in query_status:
+            return Status.TRUNCATED
+        return Status.SUCCESS
+
     def __post_init__(self):
-        self.status = Status.SUCCESS
-        self.astropy_table = self.parse_votable(self.data)
+        self.status = self.scan_status()
+        if self.status is Status.FAIL:
+            self.fail()
 
     def __eq__(self, other):
         if not isinstance(other, VOTable):
@@ -113,14 +240,30 @@ class TableValidationResult(ValidationResult):
     Attributes:
         status (Status): The Status of the Result
         failures (list): The list of failed queries
+        tables (int): The number of tables selected for the validation
+        checked (int): The number of tables checked before the budget of the
+            validation was used up
     """
 
+    tables: int = 0
+    checked: int = 0
+
+    @property
+    def coverage(self) -> float:
+        """Get the fraction of the selected tables that were checked"""
+        return self.checked / self.tables if self.tables else 1.0
+
     def as_string(self, validation_type_str: str = "Table") -> str:
         """Get Table Validation Result as a string"""
         res = (
             f"{validation_type_str + ' ' if validation_type_str else ''}"
             f"Validation result status: [{self.status}]\n"
         )
+        if self.checked < self.tables:
+            res += (
+                f"Checked {self.checked} of {self.tables} tables "
+                f"({self.coverage:.0%}) within the budget\n"
+            )
         if self.status is not Status.SUCCESS:
             res += "The following queries failed:\n"
             for query in self.failures:
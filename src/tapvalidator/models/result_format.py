@@ -0,0 +1,48 @@
+from enum import Enum
+
+__all__ = ["ResultFormat"]
+
+
+class ResultFormat(Enum):
+    """Enum for the formats a query result can be requested in
+
+    VOTABLE is the default format of a service, which is usually TABLEDATA. BINARY2
+    is the binary serialization of a VOTable, which keeps the VOTable metadata. CSV
+    and PARQUET results are converted to a VOTable table once read
+    """
+
+    VOTABLE = "VOTABLE"
+    BINARY2 = "BINARY2"
+    PARQUET = "PARQUET"
+    CSV = "CSV"
+
+    @property
+    def mime_types(self) -> tuple[str, ...]:
+        """Get the MIME types (and short names) a service may advertise this
+        format with, the first one being used when it does not advertise it
+
+        Returns:
+            tuple[str, ...]: The lower case MIME types and short names
+        """
+        return MIME_TYPES[self]
+
+    @property
+    def is_votable(self) -> bool:
+        """Whether results in this format are VOTable documents"""
+        return self in (ResultFormat.VOTABLE, ResultFormat.BINARY2)
+
+
+MIME_TYPES = {
+    ResultFormat.VOTABLE: ("votable", "application/x-votable+xml", "text/xml"),
+    ResultFormat.BINARY2: (
+        "application/x-votable+xml;serialization=binary2",
+        "votable/b2",
+        "votableb2",
+    ),
+    ResultFormat.PARQUET: (
+        "application/vnd.apache.parquet",
+        "application/x-parquet",
+        "parquet",
+    ),
+    ResultFormat.CSV: ("text/csv", "csv", "text/csv;header=present"),
+}
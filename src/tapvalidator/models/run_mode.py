@@ -9,3 +9,5 @@ class Mode(Enum):
     COMPARISON = "COMPARISON"
     VALIDATION = "VALIDATION"
     TABLE_VALIDATION = "TABLE_VALIDATION"
+    FLEET = "FLEET"
+    DAEMON = "DAEMON"
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from tapvalidator.models.budget import ValidationBudget
+from tapvalidator.models.run_mode import Mode as RunMode
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.utility.cron import CronSchedule
+
+__all__ = ["ScheduledCheck"]
+
+
+@dataclass
+class ScheduledCheck:
+    """A validation run periodically by the daemon
+
+    Attributes:
+        name (str): The name of the check
+        tap_service (TAPService): The TAP Service validated
+        mode (str): The run mode, TABLE_VALIDATION or VALIDATION
+            (default: TABLE_VALIDATION)
+        interval (float): The seconds between the start of two runs, if no cron
+            expression is set
+        cron (str): A cron expression for the start of the runs (default: "")
+        jitter (float): The maximum random delay added to the start of each run,
+            in seconds (default: 0)
+        fullscan (bool): Whether to do a full scan of the tables
+        check_columns (bool): Whether to validate the columns of the tables
+        incremental (bool): Whether to only check the tables with the highest
+            priority, within the incremental budget
+        budget (ValidationBudget): The deadline and maximum number of queries of
+            the table validation
+    """
+
+    name: str
+    tap_service: TAPService
+    mode: str = RunMode.TABLE_VALIDATION.value
+    interval: float = 0.0
+    cron: str = ""
+    jitter: float = 0.0
+    fullscan: bool = False
+    check_columns: bool = False
+    incremental: bool = False
+    budget: ValidationBudget = field(default_factory=ValidationBudget)
+    _schedule: CronSchedule | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.mode = self.mode.upper()
+        if self.mode not in (RunMode.TABLE_VALIDATION.value, RunMode.VALIDATION.value):
+            raise ValueError(f"Check [{self.name}] has unsupported mode [{self.mode}]")
+        if self.cron:
+            self._schedule = CronSchedule(self.cron)
+        elif self.interval <= 0:
+            raise ValueError(f"Check [{self.name}] needs an interval or a cron")
+
+    def next_run(self, last_run: datetime | None, now: datetime) -> datetime:
+        """Get the time of the next run, without the jitter
+
+        Runs which take longer than the interval are not overlapped, the next run
+        then starts straight away
+
+        Args:
+            last_run (datetime | None): The start of the last run, None if the check
+                has not run yet
+            now (datetime): The current time
+
+        Returns:
+            datetime: The time of the next run
+        """
+        if self._schedule is not None:
+            return self._schedule.next_after(now)
+        if last_run is None:
+            return now
+        return max(now, last_run + timedelta(seconds=self.interval))
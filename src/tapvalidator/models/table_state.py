@@ -0,0 +1,71 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from tapvalidator.models.status import Status
+
+__all__ = ["TableState"]
+
+
+@dataclass
+class TableState:
+    """The outcome of the last validation of a table
+
+    Attributes:
+        checked_at (float): Timestamp of when the table was last validated
+        status (Status): The status of the last validation
+        latency (float | None): The time the last query to the table took, in
+            seconds (default: None, unknown)
+        columns (str): Signature of the columns of the table in TAP_SCHEMA when it
+            was last validated, empty if they were not loaded (default: "")
+    """
+
+    checked_at: float = 0.0
+    status: Status = Status.PENDING
+    latency: float | None = None
+    columns: str = ""
+
+    @property
+    def failing(self) -> bool:
+        """Check whether the last validation of the table did not succeed"""
+        return self.status not in (Status.SUCCESS, Status.PENDING)
+
+    @staticmethod
+    def signature(columns: dict[str, str] | None) -> str:
+        """Get the signature of the columns of a table
+
+        Args:
+            columns (dict[str, str] | None): Mapping of column name to datatype
+
+        Returns:
+            str: A short digest of the columns, empty if they are unknown
+        """
+        if not columns:
+            return ""
+        text = json.dumps(sorted(columns.items()))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def as_dict(self) -> dict:
+        """Get the state as a JSON serializable dictionary"""
+        return {
+            "checked_at": self.checked_at,
+            "status": self.status.value,
+            "latency": self.latency,
+            "columns": self.columns,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableState":
+        """Create the state from a dictionary produced by as_dict
+
+        Args:
+            data (dict): The dictionary
+
+        Returns:
+            TableState: The state
+        """
+        return cls(
+            checked_at=data.get("checked_at", 0.0),
+            status=Status(data.get("status", Status.PENDING.value)),
+            latency=data.get("latency"),
+            columns=data.get("columns", ""),
+        )
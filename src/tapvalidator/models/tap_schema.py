@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from tapvalidator.models.column_index import ColumnIndex
+
+__all__ = ["TAPSchemaMetadata"]
+
+
+@dataclass
+class TAPSchemaMetadata:
+    """The TAP_SCHEMA metadata discovered for a TAP Service
+
+    Attributes:
+        tables (dict): Mapping of schema name to its table names
+        column_index (ColumnIndex): The columns loaded so far
+        probe (int | None): The value of the change detection probe when the
+            metadata was discovered (default: None)
+        fetched_at (float): Timestamp of when the metadata was discovered
+        checked_at (float): Timestamp of when the metadata was last confirmed to be
+            up to date
+    """
+
+    tables: dict[str, list[str]] = field(default_factory=dict)
+    column_index: ColumnIndex = field(default_factory=ColumnIndex)
+    probe: int | None = None
+    fetched_at: float = 0.0
+    checked_at: float = 0.0
+
+    def as_dict(self) -> dict:
+        """Get the metadata as a JSON serializable dictionary"""
+        columns: dict[str, dict[str, dict[str, str]]] = {}
+        for (
+            schema_name,
+            table_name,
+        ), table_columns in self.column_index.columns.items():
+            columns.setdefault(schema_name, {})[table_name] = table_columns
+        return {
+            "tables": self.tables,
+            "columns": columns,
+            "column_schemas": sorted(self.column_index.schemas),
+            "probe": self.probe,
+            "fetched_at": self.fetched_at,
+            "checked_at": self.checked_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TAPSchemaMetadata":
+        """Create the metadata from a dictionary produced by as_dict
+
+        Args:
+            data (dict): The dictionary
+
+        Returns:
+            TAPSchemaMetadata: The metadata
+        """
+        column_index = ColumnIndex(schemas=set(data.get("column_schemas", [])))
+        for schema_name, tables in data.get("columns", {}).items():
+            for table_name, table_columns in tables.items():
+                for column_name, datatype in table_columns.items():
+                    column_index.add(schema_name, table_name, column_name, datatype)
+        return cls(
+            tables=data.get("tables", {}),
+            column_index=column_index,
+            probe=data.get("probe"),
+            fetched_at=data.get("fetched_at", 0.0),
+            checked_at=data.get("checked_at", 0.0),
+        )
@@ -44,11 +44,14 @@ class TAPService:
         url (str): The URL of the TAP Service
         name (str): A name for the TAP Service (Optional)
         endpoints (TAPEndpoints): The TAPEndpoints object for this TAP Service
+        max_parallel_queries (int): The maximum number of queries in flight to this
+            TAP Service, if 0 settings.max_parallel_tasks is used (default: 0)
     """
 
     url: str = ""
     name: str = ""
     endpoints: TAPEndpoints = field(default_factory=TAPEndpoints)
+    max_parallel_queries: int = 0
 
     def __post_init__(self):
         self.endpoints = TAPEndpoints(self.url)
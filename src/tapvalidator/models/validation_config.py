@@ -2,6 +2,10 @@
 from dataclasses import dataclass, field
 from tapvalidator.services.alerter import Alerter, LogAlerter
 from tapvalidator.models.tap_service import TAPService
+from tapvalidator.models.comparison_options import ComparisonOptions
+from tapvalidator.models.result_format import ResultFormat
+from tapvalidator.models.scheduled_check import ScheduledCheck
+from tapvalidator.services.query_backend import QueryBackend
 
 __all__ = [
     "ValidationConfiguration",
@@ -21,6 +25,15 @@ class ValidationConfiguration:
             (default: None)
         second_service (str): The second TAP Service URL, used if comparing two
             TAP services
+        backend (QueryBackend): The backend used to execute the queries, if not set
+            the backend configured in the settings is used (default: None)
+        comparison_options (ComparisonOptions): The tolerances, columns and key
+            columns used when comparing two TAP Services
+        result_formats (list[ResultFormat]): The result formats negotiated with the
+            TAP Services in order of preference, if not set the formats configured
+            in the settings are used (default: None)
+        services (list[TAPService]): The TAP Services validated in FLEET mode
+        checks (list[ScheduledCheck]): The checks run in DAEMON mode
     """
 
     first_service: TAPService
@@ -28,3 +41,8 @@ class ValidationConfiguration:
     alerter: Alerter = LogAlerter
     alert_destination: str = ""
     second_service: TAPService = field(default_factory=TAPService)
+    backend: QueryBackend | None = None
+    comparison_options: ComparisonOptions = field(default_factory=ComparisonOptions)
+    result_formats: list[ResultFormat] | None = None
+    services: list[TAPService] = field(default_factory=list)
+    checks: list[ScheduledCheck] = field(default_factory=list)
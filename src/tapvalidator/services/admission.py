@@ -0,0 +1,175 @@
+"""
+Admission control for the queries sent to a TAP Service
+
+Each TAP Service gets an AdmissionController, which bounds the number of its
+queries that are in flight (from sending the query until its result is received).
+The limit adapts to how the service is coping: it is halved when queries fail or
+are slow, and raised by one again after a full window of successful queries. While
+queries keep failing, new queries are also held back for an exponentially growing
+back-off period. Queries which are cancelled (e.g. at the deadline of a budgeted
+validation) release their slot without adapting the limit.
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.logger.logger import logger
+from tapvalidator.settings import settings
+
+__all__ = ["AdmissionController", "AdmissionControl"]
+
+
+class AdmissionController:
+    """Adaptive limit on the concurrent in-flight queries of a TAP Service
+
+    Attributes:
+        max_limit (int): The upper bound of the limit
+        min_limit (int): The lower bound of the limit
+        limit (int): The current limit
+        in_flight (int): The number of queries currently in flight
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = self.max_limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+        self._successes = 0
+        self._failures = 0
+        self._last_decrease = 0.0
+        self._backoff_until = 0.0
+
+    @property
+    def backoff(self) -> float:
+        """Get the back-off period after the current run of failed queries
+
+        Returns:
+            float: The back-off in seconds
+        """
+        if not self._failures:
+            return 0.0
+        return min(
+            settings.admission_max_backoff,
+            settings.admission_base_backoff * 2 ** (self._failures - 1),
+        )
+
+    async def acquire(self):
+        """Wait until a query can be admitted"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        delay = self._backoff_until - time.monotonic()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                await self.release(False, 0.0, adapt=False)
+                raise
+
+    async def release(self, success: bool, latency: float, adapt: bool = True):
+        """Release the slot of a completed query, and adapt the limit to its outcome
+
+        Args:
+            success (bool): Whether the query succeeded
+            latency (float): The time the query took, in seconds
+            adapt (bool): Whether to adapt the limit, False for queries which were
+                cancelled before completing (default: True)
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if adapt and success and latency < settings.admission_slow_query:
+                self._on_success()
+            elif adapt:
+                self._on_congestion(success, latency)
+            self._condition.notify_all()
+
+    def _on_success(self):
+        """Raise the limit by one after a full window of successful queries"""
+        self._failures = 0
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes = 0
+
+    def _on_congestion(self, success: bool, latency: float):
+        """Halve the limit (at most once per cooldown period) and back off if the
+        query failed
+
+        Args:
+            success (bool): Whether the query succeeded
+            latency (float): The time the query took, in seconds
+        """
+        now = time.monotonic()
+        self._successes = 0
+        if not success:
+            self._failures += 1
+            self._backoff_until = now + self.backoff
+        if now - self._last_decrease >= settings.admission_cooldown:
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit // 2)
+            logger.warning(
+                f"Reducing concurrent queries to [{self.limit}]",
+                success=success,
+                latency=latency,
+            )
+
+    @asynccontextmanager
+    async def slot(self):
+        """Context manager holding an admission slot for the duration of a query
+
+        The caller reports the outcome with the record function it is given, if
+        it does not the query is considered failed. A cancelled query releases its
+        slot without adapting the limit
+        """
+        outcome = {"success": False}
+        cancelled = False
+
+        def record(success: bool):
+            outcome["success"] = success
+
+        await self.acquire()
+        start_time = time.monotonic()
+        try:
+            yield record
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            await self.release(
+                outcome["success"],
+                time.monotonic() - start_time,
+                adapt=not cancelled,
+            )
+
+
+class AdmissionControl:
+    """Registry of the AdmissionController of each TAP Service"""
+
+    _controllers: dict[str, AdmissionController] = {}
+    _loop: asyncio.AbstractEventLoop | None = None
+
+    @classmethod
+    def for_service(cls, tap_service: TAPService) -> AdmissionController:
+        """Get the AdmissionController of a TAP Service, creating it if needed
+
+        The limit of a service is its max_parallel_queries if set, otherwise
+        settings.max_parallel_tasks
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            AdmissionController: The controller for the service
+        """
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            cls._controllers = {}
+            cls._loop = loop
+        if tap_service.url not in cls._controllers:
+            cls._controllers[tap_service.url] = AdmissionController(
+                max_limit=tap_service.max_parallel_queries
+                or settings.max_parallel_tasks,
+                min_limit=settings.admission_min_parallel_queries,
+            )
+        return cls._controllers[tap_service.url]
@@ -0,0 +1,198 @@
+"""
+Long-running validation of TAP Services on per-service schedules
+
+The checks are read from an INI schedule file, with a section per check:
+
+    [DEFAULT]
+    jitter = 30
+
+    [osa-tables]
+    url = http://tap.roe.ac.uk/osa
+    mode = TABLE_VALIDATION
+    interval = 300
+
+    [osa-nightly]
+    url = http://tap.roe.ac.uk/osa
+    mode = VALIDATION
+    cron = 0 3 * * *
+    fullscan = true
+
+Each check runs after its interval or at the times of its cron expression, delayed
+by a random jitter so the checks of many services do not hit them at the same time.
+The daemon stays in a single event loop, so the query backend and its connection
+pools, the negotiated result formats, the admission control of each service and the
+TAP_SCHEMA metadata cache are reused from one run to the next.
+"""
+import random
+import signal
+import asyncio
+import configparser
+from datetime import datetime
+from typing import TYPE_CHECKING
+from tapvalidator.logger.logger import logger
+from tapvalidator.models.budget import ValidationBudget
+from tapvalidator.models.run_mode import Mode as RunMode
+from tapvalidator.models.scheduled_check import ScheduledCheck
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.settings import settings
+
+if TYPE_CHECKING:
+    from tapvalidator.tap_validator import TAPValidator
+
+__all__ = ["ScheduleLoader", "Daemon"]
+
+
+class ScheduleLoader:
+    """Reads the checks of the daemon from a schedule file"""
+
+    @staticmethod
+    def from_text(text: str) -> list[ScheduledCheck]:
+        """Read the checks of a schedule file
+
+        Args:
+            text (str): The content of the file, in INI format with a section per
+                check. Values of the DEFAULT section apply to every check
+
+        Returns:
+            list[ScheduledCheck]: The checks
+        """
+        config = configparser.ConfigParser()
+        config.read_string(text)
+        checks = []
+        for name in config.sections():
+            section = config[name]
+            if not section.get("url"):
+                raise ValueError(f"Check [{name}] has no url")
+            checks.append(
+                ScheduledCheck(
+                    name=name,
+                    tap_service=TAPService(
+                        url=section["url"].strip().rstrip("/"),
+                        name=section.get("name", name),
+                        max_parallel_queries=section.getint(
+                            "max_parallel_queries", fallback=0
+                        ),
+                    ),
+                    mode=section.get("mode", RunMode.TABLE_VALIDATION.value),
+                    interval=section.getfloat("interval", fallback=0.0),
+                    cron=section.get("cron", ""),
+                    jitter=section.getfloat("jitter", fallback=settings.daemon_jitter),
+                    fullscan=section.getboolean("fullscan", fallback=False),
+                    check_columns=section.getboolean("check_columns", fallback=False),
+                    incremental=section.getboolean("incremental", fallback=False),
+                    budget=ValidationBudget(
+                        deadline=section.getfloat("deadline", fallback=0.0),
+                        max_queries=section.getint("max_queries", fallback=0),
+                    ),
+                )
+            )
+        return checks
+
+    @staticmethod
+    def load(path: str) -> list[ScheduledCheck]:
+        """Read the checks of a schedule file
+
+        Args:
+            path (str): The path of the file
+
+        Returns:
+            list[ScheduledCheck]: The checks
+        """
+        with open(path, "r") as file:
+            return ScheduleLoader.from_text(file.read())
+
+
+class Daemon:
+    """Runs scheduled checks until it is stopped
+
+    Attributes:
+        tap_validator (TAPValidator): The validator running the checks, and sending
+            the notifications of their results
+        checks (list[ScheduledCheck]): The checks
+        runs (dict[str, int]): The number of completed runs of each check
+    """
+
+    def __init__(self, tap_validator: "TAPValidator", checks: list[ScheduledCheck]):
+        self.tap_validator = tap_validator
+        self.checks = checks
+        self.runs: dict[str, int] = {check.name: 0 for check in checks}
+        self._stopping: asyncio.Event | None = None
+
+    def stop(self):
+        """Stop the daemon, once the checks which are running have completed"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run_check(self, check: ScheduledCheck):
+        """Run a check once
+
+        Args:
+            check (ScheduledCheck): The check
+        """
+        if check.mode == RunMode.VALIDATION.value:
+            await self.tap_validator.validate_tap_service(
+                check.fullscan,
+                check.check_columns,
+                tap_service=check.tap_service,
+                incremental=check.incremental,
+                budget=check.budget,
+            )
+        else:
+            await self.tap_validator.validate_tables(
+                check.fullscan,
+                check.check_columns,
+                tap_service=check.tap_service,
+                incremental=check.incremental,
+                budget=check.budget,
+            )
+
+    async def _wait(self, delay: float) -> bool:
+        """Wait for a delay, or until the daemon is stopped
+
+        Returns:
+            bool: Whether the daemon was stopped
+        """
+        assert self._stopping is not None
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=max(delay, 0))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _schedule(self, check: ScheduledCheck):
+        """Run a check on its schedule until the daemon is stopped"""
+        last_run = None
+        while True:
+            now = datetime.now()
+            next_run = check.next_run(last_run, now)
+            delay = (next_run - now).total_seconds()
+            if await self._wait(delay + random.uniform(0, check.jitter)):
+                return
+            last_run = datetime.now()
+            logger.info(f"Running check [{check.name}]", mode=check.mode)
+            try:
+                await self.run_check(check)
+            except Exception as exc:
+                logger.error(f"Check [{check.name}] raised an error", error=str(exc))
+            self.runs[check.name] += 1
+
+    async def run(self):
+        """Run the checks until the daemon is stopped, or receives SIGINT or SIGTERM"""
+        if not self.checks:
+            raise ValueError("No checks to schedule")
+        self._stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        handled = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+                handled.append(signum)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+        logger.info(f"Daemon started with {len(self.checks)} checks")
+        try:
+            await asyncio.gather(*(self._schedule(check) for check in self.checks))
+        finally:
+            for signum in handled:
+                loop.remove_signal_handler(signum)
+            logger.info("Daemon stopped", runs=self.runs)
@@ -0,0 +1,134 @@
+"""
+Loading the list of TAP Services of a fleet
+
+The services can be listed in a text file, with the URL and optionally a name on
+each line (lines starting with # are ignored), in a JSON file holding a list of
+URLs or of objects with a url, name and max_parallel_queries, or in a VOTable
+exported from a registry (i.e. the result of a RegTAP query), whose access_url
+column holds the URLs and res_title or ivoid the names.
+"""
+import os
+import json
+import numpy as np
+from tapvalidator.models.result import VOTable
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+
+__all__ = ["FleetLoader"]
+
+VOTABLE_EXTENSIONS = (".xml", ".vot", ".votable")
+
+
+class FleetLoader:
+    """Reads the TAP Services of a fleet from a services file"""
+
+    @staticmethod
+    def _service(url: str, name: str = "", max_parallel_queries: int = 0):
+        """Create a TAP Service from a listed URL, without a trailing slash"""
+        return TAPService(
+            url=url.strip().rstrip("/"),
+            name=name.strip(),
+            max_parallel_queries=max_parallel_queries,
+        )
+
+    @staticmethod
+    def from_text(text: str) -> list[TAPService]:
+        """Read the services of a text file, one URL and optional name per line
+
+        Args:
+            text (str): The content of the file
+
+        Returns:
+            list[TAPService]: The services
+        """
+        services = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            url, _, name = line.partition(" ")
+            services.append(FleetLoader._service(url, name))
+        return services
+
+    @staticmethod
+    def from_json(text: str) -> list[TAPService]:
+        """Read the services of a JSON file
+
+        Args:
+            text (str): The content of the file, a list of URLs or of objects with a
+                url and optionally a name and max_parallel_queries
+
+        Returns:
+            list[TAPService]: The services
+        """
+        services = []
+        for entry in json.loads(text):
+            if isinstance(entry, str):
+                services.append(FleetLoader._service(entry))
+            else:
+                services.append(
+                    FleetLoader._service(
+                        entry["url"],
+                        entry.get("name", ""),
+                        int(entry.get("max_parallel_queries", 0)),
+                    )
+                )
+        return services
+
+    @staticmethod
+    def from_votable(data: bytes) -> list[TAPService]:
+        """Read the services of a registry export
+
+        Args:
+            data (bytes): The VOTable, with an access_url column
+
+        Returns:
+            list[TAPService]: The services
+        """
+        votable = VOTable(data=data)
+        table = votable.astropy_table if votable.status is Status.SUCCESS else None
+        if table is None:
+            raise ValueError(f"Unable to read the registry export: {votable.messages}")
+        names = table.array.dtype.names
+        if "access_url" not in names:
+            raise ValueError("The registry export has no access_url column")
+        name_column = next(
+            (name for name in ("res_title", "short_name", "ivoid") if name in names),
+            None,
+        )
+        services = []
+        for row in table.array:
+            name = row[name_column] if name_column else ""
+            services.append(
+                FleetLoader._service(
+                    str(row["access_url"]),
+                    "" if np.ma.is_masked(name) else str(name),
+                )
+            )
+        return services
+
+    @staticmethod
+    def load(path: str) -> list[TAPService]:
+        """Read the services of a services file, dropping duplicate URLs
+
+        Args:
+            path (str): The path of a text, JSON or VOTable file
+
+        Returns:
+            list[TAPService]: The services, in the order they are listed
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".json":
+            services = FleetLoader.from_json(data.decode("utf-8"))
+        elif extension in VOTABLE_EXTENSIONS:
+            services = FleetLoader.from_votable(data)
+        else:
+            services = FleetLoader.from_text(data.decode("utf-8"))
+
+        unique: dict[str, TAPService] = {}
+        for service in services:
+            if service.url:
+                unique.setdefault(service.url, service)
+        return list(unique.values())
@@ -0,0 +1,167 @@
+"""
+Negotiation of the result format of the queries sent to a TAP Service
+
+The output formats of a service are read from the outputFormat elements of its
+/capabilities document, and the first format of the preference list that the
+service advertises is requested with the MIME type (or alias) the service gave
+for it. VOTABLE is always supported, and is used when the capabilities cannot be
+read. The formats of each service are looked up once, and kept for later queries.
+
+PARQUET results can only be read if pyarrow is installed, otherwise the format is
+never negotiated.
+"""
+import asyncio
+import importlib.util
+from xml.etree import ElementTree
+import httpx
+from tapvalidator.constants.tap_params import STANDARD_PARAMS
+from tapvalidator.models.result_format import ResultFormat
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.http_sessions import EndpointClient
+from tapvalidator.logger.logger import logger
+from tapvalidator.settings import settings
+
+__all__ = ["FormatNegotiator"]
+
+
+def _normalize(mime_type: str) -> str:
+    """Normalize a MIME type or alias, so that it can be compared"""
+    return "".join(mime_type.split()).replace('"', "").replace("'", "").lower()
+
+
+class FormatNegotiator:
+    """Registry of the result formats supported by each TAP Service"""
+
+    _formats: dict[str, dict[ResultFormat, str]] = {}
+    _lookups: dict[str, asyncio.Future] = {}
+    _loop: asyncio.AbstractEventLoop | None = None
+
+    @staticmethod
+    def is_readable(result_format: ResultFormat) -> bool:
+        """Check whether results in a format can be read
+
+        Args:
+            result_format (ResultFormat): The format
+
+        Returns:
+            bool: False for PARQUET if pyarrow is not installed, otherwise True
+        """
+        if result_format is ResultFormat.PARQUET:
+            return importlib.util.find_spec("pyarrow") is not None
+        return True
+
+    @staticmethod
+    def get_output_formats(capabilities: str | bytes) -> dict[ResultFormat, str]:
+        """Get the known formats advertised in a capabilities document
+
+        Args:
+            capabilities (str | bytes): The capabilities document
+
+        Returns:
+            dict[ResultFormat, str]: Mapping of each advertised format to the MIME
+                type (or alias) it is requested with
+        """
+        output_formats: dict[ResultFormat, str] = {}
+        root = ElementTree.fromstring(capabilities)
+        for element in root.iter():
+            if element.tag.rsplit("}", 1)[-1] != "outputFormat":
+                continue
+            names = [
+                (child.text or "").strip()
+                for child in element
+                if child.tag.rsplit("}", 1)[-1] in ("mime", "alias")
+            ]
+            for name in filter(None, names):
+                for result_format in ResultFormat:
+                    if _normalize(name) in result_format.mime_types:
+                        output_formats.setdefault(result_format, name)
+                        break
+        output_formats[ResultFormat.VOTABLE] = STANDARD_PARAMS["FORMAT"]
+        return output_formats
+
+    @classmethod
+    async def get_formats(cls, tap_service: TAPService) -> dict[ResultFormat, str]:
+        """Get the formats supported by a TAP Service, reading its capabilities
+        the first time. Concurrent queries to a service share a single lookup
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            dict[ResultFormat, str]: Mapping of each supported format to the MIME
+                type (or alias) it is requested with
+        """
+        if tap_service.url in cls._formats:
+            return cls._formats[tap_service.url]
+        loop = asyncio.get_running_loop()
+        if cls._loop is not loop:
+            cls._lookups = {}
+            cls._loop = loop
+        if tap_service.url not in cls._lookups:
+            cls._lookups[tap_service.url] = asyncio.ensure_future(
+                cls._read_formats(tap_service)
+            )
+        return await asyncio.shield(cls._lookups[tap_service.url])
+
+    @classmethod
+    async def _read_formats(cls, tap_service: TAPService) -> dict[ResultFormat, str]:
+        """Read the formats supported by a TAP Service from its capabilities
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            dict[ResultFormat, str]: The supported formats, only VOTABLE if the
+                capabilities cannot be read
+        """
+        output_formats = {ResultFormat.VOTABLE: STANDARD_PARAMS["FORMAT"]}
+        try:
+            response = await EndpointClient.get(tap_service.endpoints.capabilities)
+            response.raise_for_status()
+            output_formats = cls.get_output_formats(response.content)
+        except (httpx.HTTPError, ElementTree.ParseError) as error:
+            logger.warning(
+                "Unable to read the output formats, using VOTABLE",
+                tap_service=tap_service.url,
+                error=str(error),
+            )
+        cls._formats[tap_service.url] = output_formats
+        return output_formats
+
+    @classmethod
+    async def negotiate(
+        cls,
+        tap_service: TAPService,
+        preference: list[ResultFormat] | None = None,
+    ) -> tuple[ResultFormat, str]:
+        """Choose the result format of the queries to a TAP Service
+
+        The capabilities are only read if a format other than VOTABLE is preferred
+        before VOTABLE
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            preference (list[ResultFormat]): The formats in order of preference
+                (default: settings.result_formats)
+
+        Returns:
+            tuple[ResultFormat, str]: The format, and the value of the FORMAT
+                parameter requesting it
+        """
+        if preference is None:
+            preference = [ResultFormat(name) for name in settings.result_formats]
+        for result_format in preference:
+            if result_format is ResultFormat.VOTABLE:
+                break
+            if not cls.is_readable(result_format):
+                continue
+            output_formats = await cls.get_formats(tap_service)
+            if result_format in output_formats:
+                return result_format, output_formats[result_format]
+        return ResultFormat.VOTABLE, STANDARD_PARAMS["FORMAT"]
+
+    @classmethod
+    def clear(cls):
+        """Forget the formats of all services"""
+        cls._formats = {}
+        cls._lookups = {}
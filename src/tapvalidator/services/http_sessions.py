@@ -0,0 +1,143 @@
+"""
+Pooled HTTP sessions
+
+HTTPSessionPool holds the sessions of the dramatiq workers. Each TAP host gets a
+long-lived httpx Client, so the connections (and their TLS sessions) are kept alive
+and reused by the queries a worker runs, instead of a new connection being set up
+for every query. A client holds as many connections as the
+worker has threads, so every thread can have a query in flight to the same host.
+
+Responses are requested with gzip/deflate compression, which httpx decodes
+transparently. HTTP/2 is used if enabled in the settings and the h2 package is
+installed, otherwise HTTP/1.1 is used.
+
+EndpointClient is the non-blocking client used on the event loop for the VOSI
+endpoints of the TAP Services (/availability, /capabilities and /tables).
+"""
+import asyncio
+import importlib.util
+import threading
+from urllib.parse import urlsplit
+import httpx
+from tapvalidator.settings import settings
+
+__all__ = ["HTTPSessionPool", "EndpointClient"]
+
+
+class HTTPSessionPool:
+    """Long-lived HTTP clients, one per TAP host, shared by the threads of a worker
+
+    Attributes:
+        max_connections (int): The connections kept by each client
+            (default: settings.worker_threads)
+        http2 (bool): Whether HTTP/2 is used, when h2 is installed
+            (default: settings.http2)
+        transport (httpx.BaseTransport): An optional transport for the clients
+            (default: None)
+    """
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        http2: bool | None = None,
+        transport: httpx.BaseTransport | None = None,
+    ):
+        self.max_connections = max_connections or settings.worker_threads
+        self.http2 = (settings.http2 if http2 is None else http2) and (
+            self.http2_available()
+        )
+        self.transport = transport
+        self._clients: dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def http2_available() -> bool:
+        """Check whether HTTP/2 can be used, which needs the h2 package
+
+        Returns:
+            bool: True if h2 is installed
+        """
+        return importlib.util.find_spec("h2") is not None
+
+    def get(self, url: str) -> httpx.Client:
+        """Get the client for the host of a URL, creating it if needed
+
+        Args:
+            url (str): The URL being requested
+
+        Returns:
+            httpx.Client: The client of the host
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if host not in self._clients:
+                self._clients[host] = httpx.Client(
+                    transport=self.transport,
+                    http2=self.http2,
+                    timeout=settings.http_timeout,
+                    headers={"Accept-Encoding": "gzip, deflate"},
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                        keepalive_expiry=settings.keepalive_expiry,
+                    ),
+                )
+            return self._clients[host]
+
+    def close(self):
+        """Close the clients and their pooled connections"""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+
+class EndpointClient:
+    """Shared AsyncClient for requesting the VOSI endpoints of the TAP Services
+
+    Attributes:
+        transport (httpx.AsyncBaseTransport): An optional transport for the client
+            (default: None)
+    """
+
+    transport: httpx.AsyncBaseTransport | None = None
+    _client: httpx.AsyncClient | None = None
+    _loop: asyncio.AbstractEventLoop | None = None
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        """Get the shared client, creating it for the running event loop if needed
+
+        Returns:
+            httpx.AsyncClient: The client
+        """
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._loop is not loop:
+            cls._client = httpx.AsyncClient(
+                transport=cls.transport,
+                http2=settings.http2 and HTTPSessionPool.http2_available(),
+                timeout=settings.http_timeout,
+                follow_redirects=True,
+            )
+            cls._loop = loop
+        return cls._client
+
+    @classmethod
+    async def get(cls, url: str) -> httpx.Response:
+        """Send a GET request
+
+        Args:
+            url (str): The URL
+
+        Returns:
+            httpx.Response: The response
+        """
+        return await cls.client().get(url)
+
+    @classmethod
+    async def close(cls):
+        """Close the shared client"""
+        if cls._client is not None:
+            client, cls._client, cls._loop = cls._client, None, None
+            await client.aclose()
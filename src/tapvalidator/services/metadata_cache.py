@@ -0,0 +1,115 @@
+"""
+On-disk cache of the TAP_SCHEMA metadata of TAP Services
+
+The metadata of each service is stored in a JSON file, keyed by the service URL.
+An entry is used as is while it is younger than the cache ttl. Once older, it is
+only reused if a cheap change detection probe (the row count of
+TAP_SCHEMA.columns) still returns the value recorded when the metadata was
+discovered, and entries older than the max_age are always rediscovered.
+"""
+import os
+import json
+import time
+from tapvalidator.models.tap_schema import TAPSchemaMetadata
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.logger.logger import logger
+from tapvalidator.settings import settings
+
+__all__ = ["MetadataCache", "metadata_cache"]
+
+
+class MetadataCache:
+    """Cache of TAPSchemaMetadata, persisted to a JSON file
+
+    Attributes:
+        path (str): The path of the cache file, if empty nothing is persisted
+        ttl (float): Seconds for which an entry is used without probing the service
+        max_age (float): Seconds after which an entry is always rediscovered
+    """
+
+    def __init__(
+        self,
+        path: str = settings.metadata_cache_path,
+        ttl: float = settings.metadata_cache_ttl,
+        max_age: float = settings.metadata_cache_max_age,
+    ):
+        self.path = os.path.expanduser(path) if path else ""
+        self.ttl = ttl
+        self.max_age = max_age
+        self._entries: dict[str, TAPSchemaMetadata] | None = None
+
+    @property
+    def entries(self) -> dict[str, TAPSchemaMetadata]:
+        """Get the cached entries, reading the cache file on first access
+
+        Returns:
+            dict[str, TAPSchemaMetadata]: Mapping of service URL to its metadata
+        """
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as file:
+                        data = json.load(file)
+                    self._entries = {
+                        url: TAPSchemaMetadata.from_dict(entry)
+                        for url, entry in data.items()
+                    }
+                except (OSError, ValueError) as exc:
+                    logger.warning(f"Unable to read metadata cache: {exc}")
+        return self._entries
+
+    def get(self, tap_service: TAPService) -> TAPSchemaMetadata | None:
+        """Get the cached metadata of a TAP Service
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            TAPSchemaMetadata | None: The metadata, or None if it is not cached or
+                older than the max_age
+        """
+        metadata = self.entries.get(tap_service.url)
+        if metadata and time.time() - metadata.fetched_at < self.max_age:
+            return metadata
+        return None
+
+    def is_fresh(self, metadata: TAPSchemaMetadata) -> bool:
+        """Check if metadata can be used without probing the TAP Service
+
+        Args:
+            metadata (TAPSchemaMetadata): The metadata
+
+        Returns:
+            bool: True if the metadata was checked within the ttl
+        """
+        return time.time() - metadata.checked_at < self.ttl
+
+    def put(self, tap_service: TAPService, metadata: TAPSchemaMetadata):
+        """Store the metadata of a TAP Service, and persist the cache
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            metadata (TAPSchemaMetadata): The metadata
+        """
+        self.entries[tap_service.url] = metadata
+        self.save()
+
+    def save(self):
+        """Write the cache to its file"""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(
+                    {url: entry.as_dict() for url, entry in self.entries.items()},
+                    file,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning(f"Unable to write metadata cache: {exc}")
+
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,701 @@
+"""
+Execution backends for running TAP queries
+
+A backend takes care of submitting a query to the synchronous endpoint of a TAP
+Service and handing back the response once it is available. Two implementations
+are provided:
+
+DRAMATIQ sends each query to the run_sync_query_task actor through the Redis
+broker, which is useful for distributing the load across several workers. Results
+are awaited with a blocking pop on the result key, so they are delivered as soon as
+the worker stores them
+HTTPX runs the queries in-process on the event loop, using a shared connection
+pool with keep-alive and a concurrency limit per TAP host
+UWS also runs in-process, but submits each query as an asynchronous job and polls
+it until it ends, so long queries are not bounded by the synchronous timeout
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, AsyncIterator, Protocol
+from urllib.parse import urljoin, urlsplit
+import httpx
+from dramatiq.message import Message  # type: ignore
+from tapvalidator.constants.tap_params import STANDARD_PARAMS
+from tapvalidator.logger.logger import logger
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.http_sessions import HTTPSessionPool
+from tapvalidator.settings import settings
+from tapvalidator.utility.spool import AsyncSpoolWriter, ResultSpool
+
+__all__ = [
+    "BackendType",
+    "QueryBackend",
+    "DramatiqBackend",
+    "HTTPXBackend",
+    "UWSBackend",
+    "QueryBackendResolver",
+]
+
+STREAM_CHUNK_SIZE = 1 << 16
+# Seconds between checks for a result that is not waited for by blocking
+RESULT_POLL_INTERVAL = 0.5
+# Shortest blocking wait for a result, in milliseconds
+MIN_RESULT_WAIT = 1000
+UWS_FINAL_PHASES = {"COMPLETED", "ERROR", "ABORTED"}
+
+
+class BackendType(Enum):
+    """Enum defining the available query execution backends"""
+
+    DRAMATIQ = "DRAMATIQ"
+    HTTPX = "HTTPX"
+    UWS = "UWS"
+
+
+class QueryBackend(Protocol):
+    """Protocol class defining the methods expected from a query execution
+    backend"""
+
+    async def submit(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> Any:
+        """Submit a query, returning a handle that can be used to fetch the result.
+        The result is requested in result_format (the value of the FORMAT
+        parameter)"""
+        ...
+
+    async def fetch(self, handle: Any, block: bool = False) -> bytes | str | dict:
+        """Wait for the response body of a submitted query, or the descriptor of
+        its spool file if it was spooled to disk.
+        Raises TimeoutError if the response was not received in time"""
+        ...
+
+    def stream(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> AsyncIterator[bytes]:
+        """Run a query, yielding the response body in chunks as it is received.
+        Raises TimeoutError if the response was not received in time"""
+        ...
+
+    async def close(self):
+        """Release any resources held by the backend"""
+        ...
+
+
+class DramatiqBackend:
+    """Query backend which runs queries on the dramatiq workers
+
+    Waiting for a result is done with a blocking call to the result backend, which
+    for Redis is a blocking pop that returns as soon as the worker stores the
+    result. The blocking calls are run on a dedicated thread pool, so that the
+    event loop is not blocked while waiting. The pool has a thread for each query
+    that can be outstanding (see max_waiters), and any further wait (e.g. with
+    several daemon checks running at once) polls the result backend instead of
+    queueing behind the blocked threads
+    """
+
+    def __init__(self):
+        self._executor: ThreadPoolExecutor | None = None
+        self._waiting = 0
+
+    @property
+    def max_waiters(self) -> int:
+        """Get the number of results that can be waited for at once by blocking
+
+        Each validation runs up to settings.max_parallel_tasks queries, and a
+        comparison waits for the results of both services, for up to
+        settings.fleet_max_parallel_services validations at once
+
+        Returns:
+            int: The number of threads of the pool
+        """
+        return settings.max_parallel_tasks * 2 * settings.fleet_max_parallel_services
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool used for waiting on results, creating it if needed
+
+        Returns:
+            ThreadPoolExecutor: The thread pool
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_waiters,
+                thread_name_prefix="result-waiter",
+            )
+        return self._executor
+
+    async def submit(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> Any:
+        """Send the query to the run_sync_query task of the dramatiq tasks
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            Message: The dramatiq message of the task
+        """
+        # Imported here so that the broker is only set up when this backend is used
+        from tapvalidator.tasks import run_sync_query_task
+
+        return run_sync_query_task.send(
+            query_text=query_text,
+            tap_service_url=tap_service.endpoints.synchronous,
+            result_format=result_format,
+        )
+
+    async def fetch(self, handle: Any, block: bool = False) -> bytes | str | dict:
+        """Wait for the result of a dramatiq task, deleting it from the result
+        backend once received. Compressed results are decompressed by the
+        ResultEncoder of the result backend
+
+        The result is waited for in blocking calls of at most
+        settings.result_wait_interval (and at least a second), so if the fetch is
+        cancelled (e.g. at the deadline of a budgeted validation) its thread is free
+        again within that interval. The task itself keeps running on the worker, and its result
+        expires after settings.result_ttl. If every thread is already waiting for
+        another result, the result backend is polled every RESULT_POLL_INTERVAL
+        instead
+
+        Args:
+            handle (Message): The dramatiq message of the task
+            block (bool): Whether to give up after settings.http_timeout, otherwise
+                waits until the result is available
+
+        Returns:
+            bytes | str | dict: The response of the query, or the descriptor of its
+                spool file
+        """
+        from dramatiq.results.errors import (  # type: ignore
+            ResultMissing,
+            ResultTimeout,
+        )
+
+        loop = asyncio.get_running_loop()
+        # The Redis result backend waits for whole seconds, and a wait under a
+        # second would not block at all
+        wait_for_result = functools.partial(
+            handle.get_result,
+            block=True,
+            timeout=max(
+                int(min(settings.result_wait_interval, settings.http_timeout) * 1000),
+                MIN_RESULT_WAIT,
+            ),
+        )
+
+        poll_result = functools.partial(handle.get_result, block=False)
+
+        start_time = time.monotonic()
+        while True:
+            try:
+                if self._waiting < self.max_waiters:
+                    self._waiting += 1
+                    try:
+                        result = await loop.run_in_executor(
+                            self.executor, wait_for_result
+                        )
+                    finally:
+                        self._waiting -= 1
+                else:
+                    result = await asyncio.to_thread(poll_result)
+                break
+            except (ResultMissing, ResultTimeout) as timeout_error:
+                if block and time.monotonic() - start_time >= settings.http_timeout:
+                    raise TimeoutError(
+                        "Timeout waiting for query result"
+                    ) from timeout_error
+                if isinstance(timeout_error, ResultMissing):
+                    await asyncio.sleep(RESULT_POLL_INTERVAL)
+        if isinstance(handle, Message):
+            await asyncio.to_thread(self._forget, handle)
+        return result
+
+    @staticmethod
+    def _forget(message: Message):
+        """Delete the stored result of a task, ignoring any error
+
+        Args:
+            message (Message): The dramatiq message of the task
+        """
+        from redis import RedisError
+        from tapvalidator.tasks import forget_result
+
+        try:
+            forget_result(message)
+        except RedisError as error:
+            logger.warning("Unable to delete the query result", error=str(error))
+
+    async def stream(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> AsyncIterator[bytes]:
+        """Run a query on the dramatiq workers, yielding its response in chunks
+
+        The workers store the whole response (or its spool file) in the result
+        backend, so it is only split up once received. A spool file is read in a
+        thread, so that disk I/O does not block the event loop
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            AsyncIterator[bytes]: The chunks of the response
+        """
+        message = await self.submit(query_text, tap_service, result_format)
+        response = await self.fetch(message, block=True)
+        if isinstance(response, dict):
+            try:
+                file = await asyncio.to_thread(open, response["spool"], "rb")
+                try:
+                    while chunk := await asyncio.to_thread(
+                        file.read, STREAM_CHUNK_SIZE
+                    ):
+                        yield chunk
+                finally:
+                    await asyncio.to_thread(file.close)
+            finally:
+                await asyncio.to_thread(ResultSpool.remove, response["spool"])
+            return
+        if isinstance(response, str):
+            response = response.encode("utf-8")
+        for start in range(0, len(response), STREAM_CHUNK_SIZE):
+            end = start + STREAM_CHUNK_SIZE
+            yield response[start:end]
+
+    async def close(self):
+        """Shut down the thread pool used for waiting on results"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class HTTPXBackend:
+    """Query backend which runs queries in-process, using an httpx AsyncClient
+
+    The client is shared by all queries, so connections to a TAP Service are kept
+    alive and reused. The number of concurrent requests to a single host is bounded
+    by settings.max_connections_per_host
+
+    Attributes:
+        transport (httpx.AsyncBaseTransport): An optional transport for the client
+            (default: None)
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared AsyncClient, creating it for the running event loop if
+        needed
+
+        Returns:
+            httpx.AsyncClient: The client
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                transport=self.transport,
+                http2=settings.http2 and HTTPSessionPool.http2_available(),
+                timeout=settings.http_timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive_connections,
+                    keepalive_expiry=settings.keepalive_expiry,
+                ),
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore bounding the concurrent requests to the host of a URL
+
+        Args:
+            url (str): The URL being requested
+
+        Returns:
+            asyncio.Semaphore: The semaphore for the host
+        """
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(
+                settings.max_connections_per_host
+            )
+        return self._host_limits[host]
+
+    async def _download(self, url: str, **kwargs) -> bytes | dict:
+        """Download the body of a GET request, spooling it to disk if it is large.
+        The spool file is written in a thread, so that disk I/O does not block the
+        event loop
+
+        Args:
+            url (str): The URL
+            kwargs: Other arguments of the request, i.e. params
+
+        Returns:
+            bytes | dict: The body, or the descriptor of its spool file
+        """
+        client = self.client
+        writer = AsyncSpoolWriter()
+        async with self._host_limit(url):
+            try:
+                async with client.stream("GET", url, **kwargs) as response:
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        await writer.write(chunk)
+            except BaseException:
+                await asyncio.shield(writer.discard())
+                raise
+        return await writer.close()
+
+    async def _run_query(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> bytes | str | dict:
+        """Run a synchronous query against a TAP Service
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            bytes | str | dict: the body of the synchronous Query response as bytes
+                (or the descriptor of its spool file if it is large), or the error
+                as a string if the request failed
+        """
+        params = {
+            **STANDARD_PARAMS,
+            "FORMAT": result_format,
+            "QUERY": query_text,
+        }
+        try:
+            return await self._download(
+                tap_service.endpoints.synchronous, params=params
+            )
+        except httpx.TimeoutException as timeout_error:
+            raise TimeoutError(str(timeout_error)) from timeout_error
+        except httpx.HTTPError as http_error:
+            logger.error(str(http_error), query=query_text)
+            return str(http_error)
+
+    async def stream(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> AsyncIterator[bytes]:
+        """Run a synchronous query, yielding the response body as it is received
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            AsyncIterator[bytes]: The chunks of the response, or the error encoded
+                as bytes if the request failed
+        """
+        params = {
+            **STANDARD_PARAMS,
+            "FORMAT": result_format,
+            "QUERY": query_text,
+        }
+        client = self.client
+        url = tap_service.endpoints.synchronous
+        async with self._host_limit(url):
+            try:
+                async with client.stream("GET", url, params=params) as response:
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        yield chunk
+            except httpx.TimeoutException as timeout_error:
+                raise TimeoutError(str(timeout_error)) from timeout_error
+            except httpx.HTTPError as http_error:
+                logger.error(str(http_error), query=query_text)
+                yield str(http_error).encode("utf-8")
+
+    async def submit(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> Any:
+        """Start running a query on the event loop
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            asyncio.Task: The task running the query
+        """
+        return asyncio.create_task(
+            self._run_query(query_text, tap_service, result_format)
+        )
+
+    async def fetch(self, handle: Any, block: bool = False) -> bytes | str | dict:
+        """Wait for a query task to complete
+
+        Args:
+            handle (asyncio.Task): The task running the query
+            block (bool): Whether to bound the wait by settings.http_timeout
+
+        Returns:
+            bytes | str | dict: The response of the query
+        """
+        timeout = settings.http_timeout if block else None
+        try:
+            return await asyncio.wait_for(handle, timeout=timeout)
+        except asyncio.TimeoutError as timeout_error:
+            raise TimeoutError("Timeout waiting for query result") from timeout_error
+
+    async def close(self):
+        """Close the shared client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+class UWSBackend(HTTPXBackend):
+    """Query backend which runs queries as asynchronous (UWS) jobs, using an httpx
+    AsyncClient
+
+    A job is created and started on the asynchronous endpoint of the TAP Service,
+    its phase is polled with an exponential back-off until it ends, and the result
+    of a COMPLETED job (or the error of a failed one) is then fetched. Jobs are
+    deleted once their result has been fetched, and aborted if the query is
+    cancelled. Many jobs can be run concurrently from the event loop, as none of
+    them holds a connection while it is executing
+    """
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, within the concurrency limit of its host
+
+        Args:
+            method (str): The HTTP method
+            url (str): The URL
+
+        Returns:
+            httpx.Response: The response
+        """
+        client = self.client
+        async with self._host_limit(url):
+            try:
+                return await client.request(method, url, **kwargs)
+            except httpx.TimeoutException as timeout_error:
+                raise TimeoutError(str(timeout_error)) from timeout_error
+
+    async def _abort(self, job_url: str):
+        """Abort a job, ignoring any error
+
+        Args:
+            job_url (str): The URL of the job
+        """
+        try:
+            await self._request("POST", f"{job_url}/phase", data={"PHASE": "ABORT"})
+        except (httpx.HTTPError, TimeoutError) as error:
+            logger.warning(f"Unable to abort job [{job_url}]", error=str(error))
+
+    async def _delete(self, job_url: str):
+        """Delete a job, ignoring any error
+
+        Args:
+            job_url (str): The URL of the job
+        """
+        try:
+            await self._request("DELETE", job_url)
+        except (httpx.HTTPError, TimeoutError) as error:
+            logger.warning(f"Unable to delete job [{job_url}]", error=str(error))
+
+    async def _discard(self, job_url: str):
+        """Abort and delete a job, ignoring any error
+
+        Args:
+            job_url (str): The URL of the job
+        """
+        await self._abort(job_url)
+        await self._delete(job_url)
+
+    async def _wait_for_job(
+        self, query_text: str, tap_service: TAPService, result_format: str
+    ) -> tuple:
+        """Create and start a job, and wait for it to end
+
+        If the wait fails (cancelled, timed out or a request failed), the job is
+        aborted and deleted so that it is not left running on the service
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            tuple[str, str]: The URL of the job and its final phase
+        """
+        async_url = tap_service.endpoints.asynchronous
+        response = await self._request(
+            "POST",
+            async_url,
+            data={
+                **STANDARD_PARAMS,
+                "FORMAT": result_format,
+                "QUERY": query_text,
+                "PHASE": "RUN",
+            },
+        )
+        if "location" in response.headers:
+            job_url = urljoin(async_url, response.headers["location"]).rstrip("/")
+        else:
+            response.raise_for_status()
+            job_url = str(response.url).rstrip("/")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.uws_timeout
+        delay = settings.uws_poll_interval
+        try:
+            while True:
+                response = await self._request("GET", f"{job_url}/phase")
+                response.raise_for_status()
+                phase = response.text.strip().upper()
+                if phase in UWS_FINAL_PHASES:
+                    return job_url, phase
+                if loop.time() + delay > deadline:
+                    raise TimeoutError(f"Job [{job_url}] did not complete in time")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.uws_max_poll_interval)
+        except (asyncio.CancelledError, TimeoutError, httpx.HTTPError):
+            await asyncio.shield(self._discard(job_url))
+            raise
+
+    async def _run_query(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> bytes | str | dict:
+        """Run a query as an asynchronous job
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            bytes | str | dict: the result of the job as bytes (or the descriptor of
+                its spool file), its error document if it did not complete, or the
+                error as a string if a request failed
+        """
+        job_url = ""
+        try:
+            job_url, phase = await self._wait_for_job(
+                query_text, tap_service, result_format
+            )
+            endpoint = "results/result" if phase == "COMPLETED" else "error"
+            content = await self._download(f"{job_url}/{endpoint}")
+        except httpx.TimeoutException as timeout_error:
+            raise TimeoutError(str(timeout_error)) from timeout_error
+        except httpx.HTTPError as http_error:
+            logger.error(str(http_error), query=query_text)
+            return str(http_error)
+        finally:
+            if job_url:
+                await asyncio.shield(self._delete(job_url))
+        return content or f"Job ended in phase [{phase}]"
+
+    async def stream(
+        self,
+        query_text: str,
+        tap_service: TAPService,
+        result_format: str = STANDARD_PARAMS["FORMAT"],
+    ) -> AsyncIterator[bytes]:
+        """Run a query as an asynchronous job, yielding its result as it is
+        received
+
+        Args:
+            query_text (str): The query to be run
+            tap_service (TAPService): The TAP Service
+            result_format (str): The value of the FORMAT parameter
+
+        Returns:
+            AsyncIterator[bytes]: The chunks of the result, or of the error
+        """
+        job_url = ""
+        try:
+            job_url, phase = await self._wait_for_job(
+                query_text, tap_service, result_format
+            )
+            endpoint = "results/result" if phase == "COMPLETED" else "error"
+            async with self._host_limit(job_url):
+                async with self.client.stream(
+                    "GET", f"{job_url}/{endpoint}"
+                ) as response:
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        yield chunk
+        except httpx.TimeoutException as timeout_error:
+            raise TimeoutError(str(timeout_error)) from timeout_error
+        except httpx.HTTPError as http_error:
+            logger.error(str(http_error), query=query_text)
+            yield str(http_error).encode("utf-8")
+        finally:
+            if job_url:
+                await asyncio.shield(self._delete(job_url))
+
+    async def fetch(self, handle: Any, block: bool = False) -> bytes | str | dict:
+        """Wait for a job task to complete. Jobs are bounded by settings.uws_timeout
+        rather than settings.http_timeout
+
+        Args:
+            handle (asyncio.Task): The task running the job
+            block (bool): Unused, the wait is always bounded by the job timeout
+
+        Returns:
+            bytes | str | dict: The result of the job
+        """
+        return await handle
+
+
+class QueryBackendResolver:
+    """Allows to get a QueryBackend given a BackendType as a string"""
+
+    @staticmethod
+    def get_backend(backend_type: str) -> QueryBackend:
+        """Get a query backend, given a BackendType value
+
+        Args:
+            backend_type (str): The backend type as a string
+        Returns:
+            QueryBackend: A new instance of the equivalent backend
+        """
+        match backend_type.upper():
+            case BackendType.HTTPX.value:
+                return HTTPXBackend()
+            case BackendType.UWS.value:
+                return UWSBackend()
+            case _:
+                return DramatiqBackend()
@@ -0,0 +1,179 @@
+"""
+Splitting of large queries into key-range pages
+
+The rows of a query are counted and the range of a numeric key column is found
+with a single aggregate query on each of the compared TAP Services, and the query is
+then split into pages covering equal sub-ranges of the union of their key ranges,
+each expected to hold about page_size rows. Each page is the original query wrapped
+in a subquery, restricted to its key range:
+
+    SELECT * FROM (<query>) AS q WHERE key >= lower AND key < upper
+
+Rows with a null key are compared in an extra page, if any service has them. Pages
+are only as even as the distribution of the key.
+"""
+import math
+import asyncio
+import numpy as np
+from tapvalidator.models.query import Query
+from tapvalidator.models.result import VOTable
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.logger.logger import logger
+
+__all__ = ["QueryPaginator"]
+
+
+class QueryPaginator:
+    """Splits a query into pages over the range of a key column"""
+
+    @staticmethod
+    def get_range_query(query_text: str, key: str, tap_service: TAPService) -> Query:
+        """Get the query counting the rows of a query and the range of its key
+
+        Args:
+            query_text (str): The query being paginated
+            key (str): The key column
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            Query: The query returning the number of rows, the number of rows with
+                a key, and the minimum and maximum key
+        """
+        q = (
+            f"SELECT COUNT(*) AS nrows, COUNT(q.{key}) AS nkeys, "
+            f"MIN(q.{key}) AS lower, MAX(q.{key}) AS upper "
+            f"FROM ({query_text.strip().rstrip(';')}) AS q"
+        )
+        return Query(query_text=q, tap_service=tap_service)
+
+    @staticmethod
+    def get_page_queries(
+        query_text: str, key: str, lower, upper, pages: int
+    ) -> list[str]:
+        """Split a query into pages over equal sub-ranges of its key
+
+        Args:
+            query_text (str): The query being paginated
+            key (str): The key column
+            lower: The minimum value of the key
+            upper: The maximum value of the key
+            pages (int): The number of pages
+
+        Returns:
+            list[str]: The query of each page
+        """
+        edges = np.linspace(lower, upper, pages + 1)
+        if isinstance(lower, (int, np.integer)) and isinstance(
+            upper, (int, np.integer)
+        ):
+            edges = np.unique(np.ceil(edges).astype(np.int64))
+        edges[0], edges[-1] = lower, upper
+        subquery = query_text.strip().rstrip(";")
+        page_queries = []
+        for index in range(len(edges) - 1):
+            start, end = edges[index].item(), edges[index + 1].item()
+            operator = "<=" if index == len(edges) - 2 else "<"
+            page_queries.append(
+                f"SELECT * FROM ({subquery}) AS q "
+                f"WHERE q.{key} >= {start!r} AND q.{key} {operator} {end!r}"
+            )
+        return page_queries
+
+    @staticmethod
+    def get_null_page_query(query_text: str, key: str) -> str:
+        """Get the page of the rows of a query with a null key
+
+        Args:
+            query_text (str): The query being paginated
+            key (str): The key column
+
+        Returns:
+            str: The query of the page
+        """
+        subquery = query_text.strip().rstrip(";")
+        return f"SELECT * FROM ({subquery}) AS q WHERE q.{key} IS NULL"
+
+    @staticmethod
+    async def get_range(query_text: str, key: str, tap_service: TAPService):
+        """Count the rows of a query on a TAP Service and find the range of its key
+
+        Args:
+            query_text (str): The query being paginated
+            key (str): The key column
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            tuple | None: The number of rows, the number of rows with a key, and the
+                minimum and maximum key (masked if no row has a key), or None if
+                the range query failed
+        """
+        range_query = QueryPaginator.get_range_query(query_text, key, tap_service)
+        result = await QueryRunner.run_query(range_query)
+        table = None
+        if isinstance(result, VOTable) and result.status is Status.SUCCESS:
+            table = result.astropy_table
+        if table is None or not len(table.array):
+            logger.warning(
+                "Unable to get the key range",
+                query=query_text,
+                key=key,
+                tap_service=str(tap_service),
+            )
+            return None
+        return tuple(value for value in table.array[0])
+
+    @staticmethod
+    async def paginate(
+        query_text: str, key: str, tap_services: list[TAPService], page_size: int
+    ) -> list[str] | None:
+        """Split a query into pages of about page_size rows, covering the rows of
+        the query on every TAP Service
+
+        Args:
+            query_text (str): The query being paginated
+            key (str): The numeric key column
+            tap_services (list[TAPService]): The compared TAP Services
+            page_size (int): The expected number of rows of each page
+
+        Returns:
+            list[str] | None: The query of each page, or None if the query cannot be
+                paginated or fits in a single page
+        """
+        ranges = await asyncio.gather(
+            *[
+                QueryPaginator.get_range(query_text, key, tap_service)
+                for tap_service in tap_services
+            ]
+        )
+        if any(key_range is None for key_range in ranges):
+            return None
+
+        bounds = [
+            (lower, upper)
+            for _, _, lower, upper in ranges
+            if not np.ma.is_masked(lower) and not np.ma.is_masked(upper)
+        ]
+        if not bounds:
+            return None
+        if not all(
+            isinstance(lower, np.number) and isinstance(upper, np.number)
+            for lower, upper in bounds
+        ):
+            logger.warning("Key is not numeric", query=query_text, key=key)
+            return None
+        lower = min(lower for lower, _ in bounds)
+        upper = max(upper for _, upper in bounds)
+
+        nrows = max(int(key_range[0]) for key_range in ranges)
+        pages = math.ceil(nrows / max(1, page_size))
+        if pages <= 1 or lower == upper:
+            return None
+        logger.info(f"Splitting query into [{pages}] pages", query=query_text, key=key)
+        page_queries = QueryPaginator.get_page_queries(
+            query_text, key, lower.item(), upper.item(), pages
+        )
+        if any(int(nrows) > int(nkeys) for nrows, nkeys, _, _ in ranges):
+            page_queries.append(QueryPaginator.get_null_page_query(query_text, key))
+        return page_queries
@@ -0,0 +1,187 @@
+"""
+Selection of the tables checked by an incremental validation
+
+Instead of every table (fullscan) or a random table per schema, an incremental
+validation checks the tables in order of priority, until its budget is used up:
+
+1. Tables whose last validation failed
+2. Tables that are new, or whose columns in TAP_SCHEMA have changed since they
+   were last validated
+3. The other tables, least recently validated first
+
+The budget is a maximum number of queries and an estimate of the time the queries
+take, from the latency recorded for each table. Successive runs move on to the
+tables not checked for the longest time, so the whole service is covered over a
+number of cheap runs.
+"""
+import time
+from tapvalidator.models.table_state import TableState
+from tapvalidator.models.tap_schema import TAPSchemaMetadata
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.table_state import TableStateStore, table_state
+from tapvalidator.logger.logger import logger
+from tapvalidator.settings import settings
+
+__all__ = ["TableSampler"]
+
+# Latency assumed for tables never queried, if none are known for the service
+DEFAULT_LATENCY = 1.0
+
+
+class TableSampler:
+    """Selects the tables of a TAP Service checked by an incremental validation"""
+
+    @staticmethod
+    def priority(state: TableState | None, columns: str) -> tuple[int, float]:
+        """Get the priority of a table, lowest first
+
+        Args:
+            state (TableState | None): The state of the table, None if it has never
+                been validated
+            columns (str): The signature of its current columns, empty if unknown
+
+        Returns:
+            tuple[int, float]: The rank of the table, and when it was last checked
+        """
+        if state is None:
+            return 1, 0.0
+        if state.failing:
+            return 0, state.checked_at
+        if columns and state.columns and columns != state.columns:
+            return 1, state.checked_at
+        return 2, state.checked_at
+
+    @staticmethod
+    def _candidates(
+        states: dict[str, TableState],
+        metadata: TAPSchemaMetadata,
+        tables: list[tuple[str, str]],
+    ) -> list[tuple[tuple[int, float], str, str]]:
+        """Get the priority of each table, sorted by priority
+
+        Args:
+            states (dict[str, TableState]): The state of the tables of the service
+            metadata (TAPSchemaMetadata): The TAP_SCHEMA metadata of the service
+            tables (list[tuple[str, str]]): The schema and table name of the tables
+
+        Returns:
+            list[tuple[tuple[int, float], str, str]]: The priority, schema name and
+                table name of each table
+        """
+        candidates = []
+        for schema_name, table_name in tables:
+            state = states.get(TableStateStore.key(schema_name, table_name))
+            columns = TableState.signature(
+                metadata.column_index.get(schema_name, table_name)
+            )
+            candidates.append(
+                (TableSampler.priority(state, columns), schema_name, table_name)
+            )
+        candidates.sort(key=lambda candidate: candidate[0])
+        return candidates
+
+    @staticmethod
+    def order(
+        tap_service: TAPService,
+        metadata: TAPSchemaMetadata,
+        tables: list[tuple[str, str]],
+        store: TableStateStore = table_state,
+    ) -> list[tuple[str, str]]:
+        """Sort tables in the order they should be checked, without a budget
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            metadata (TAPSchemaMetadata): The TAP_SCHEMA metadata of the service
+            tables (list[tuple[str, str]]): The schema and table name of the tables
+            store (TableStateStore): The store of the table states
+
+        Returns:
+            list[tuple[str, str]]: The tables, highest priority first
+        """
+        return [
+            (schema_name, table_name)
+            for _, schema_name, table_name in TableSampler._candidates(
+                store.get(tap_service), metadata, tables
+            )
+        ]
+
+    @staticmethod
+    def select(
+        tap_service: TAPService,
+        metadata: TAPSchemaMetadata,
+        max_queries: int | None = None,
+        max_duration: float | None = None,
+        store: TableStateStore = table_state,
+    ) -> list[tuple[str, str]]:
+        """Select the tables to check, in the order they should be checked
+
+        At least one table is selected, even if it does not fit the budget
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            metadata (TAPSchemaMetadata): The TAP_SCHEMA metadata of the service
+            max_queries (int): The maximum number of tables, 0 for no limit
+                (default: None, settings.incremental_max_queries)
+            max_duration (float): The estimated time the queries may take in
+                seconds, 0 for no limit
+                (default: None, settings.incremental_max_duration)
+            store (TableStateStore): The store of the table states
+
+        Returns:
+            list[tuple[str, str]]: The schema and table name of the selected tables
+        """
+        if max_queries is None:
+            max_queries = settings.incremental_max_queries
+        if max_duration is None:
+            max_duration = settings.incremental_max_duration
+        states = store.get(tap_service)
+        latencies = [
+            state.latency for state in states.values() if state.latency is not None
+        ]
+        default_latency = (
+            sum(latencies) / len(latencies) if latencies else DEFAULT_LATENCY
+        )
+        concurrency = min(
+            tap_service.max_parallel_queries or settings.max_parallel_tasks,
+            settings.max_parallel_tasks,
+        )
+
+        candidates = TableSampler._candidates(
+            states,
+            metadata,
+            [
+                (schema_name, table_name)
+                for schema_name, table_names in metadata.tables.items()
+                for table_name in table_names
+            ],
+        )
+
+        selected: list[tuple[str, str]] = []
+        duration = 0.0
+        for _, schema_name, table_name in candidates:
+            if max_queries and len(selected) >= max_queries:
+                break
+            state = states.get(TableStateStore.key(schema_name, table_name))
+            latency = (
+                state.latency
+                if state and state.latency is not None
+                else default_latency
+            )
+            # The queries run concurrently, bounded by the service
+            step = latency / max(concurrency, 1)
+            if selected and max_duration and duration + step > max_duration:
+                break
+            duration += step
+            selected.append((schema_name, table_name))
+
+        overdue_since = time.time() - settings.incremental_coverage_period
+        overdue = sum(
+            1 for (_, checked_at), _, _ in candidates if checked_at < overdue_since
+        )
+        if overdue > len(selected):
+            logger.info(
+                f"{overdue} tables were not checked within the coverage period, "
+                f"{len(selected)} are checked in this run",
+                tap_service=str(tap_service),
+            )
+        return selected
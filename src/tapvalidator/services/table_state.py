@@ -0,0 +1,107 @@
+"""
+On-disk store of the outcome of the last validation of each table
+
+The state of the tables of each service is stored in a JSON file, keyed by the
+service URL and the schema and table names, and is used to decide which tables an
+incremental validation checks first.
+"""
+import os
+import json
+from tapvalidator.models.table_state import TableState
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.logger.logger import logger
+from tapvalidator.settings import settings
+
+__all__ = ["TableStateStore", "table_state"]
+
+
+class TableStateStore:
+    """Store of TableState, persisted to a JSON file
+
+    Attributes:
+        path (str): The path of the store file, if empty nothing is persisted
+    """
+
+    def __init__(self, path: str = settings.table_state_path):
+        self.path = os.path.expanduser(path) if path else ""
+        self._entries: dict[str, dict[str, TableState]] | None = None
+
+    @staticmethod
+    def key(schema_name: str, table_name: str) -> str:
+        """Get the key of a table in the store"""
+        return f"{schema_name}/{table_name}"
+
+    @property
+    def entries(self) -> dict[str, dict[str, TableState]]:
+        """Get the stored states, reading the store file on first access
+
+        Returns:
+            dict[str, dict[str, TableState]]: Mapping of service URL to the state
+                of each of its tables
+        """
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, "r") as file:
+                        data = json.load(file)
+                    self._entries = {
+                        url: {
+                            key: TableState.from_dict(entry)
+                            for key, entry in tables.items()
+                        }
+                        for url, tables in data.items()
+                    }
+                except (OSError, ValueError) as exc:
+                    logger.warning(f"Unable to read table state: {exc}")
+        return self._entries
+
+    def get(self, tap_service: TAPService) -> dict[str, TableState]:
+        """Get the state of the tables of a TAP Service
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            dict[str, TableState]: Mapping of table key to its state
+        """
+        return self.entries.setdefault(tap_service.url, {})
+
+    def record(
+        self,
+        tap_service: TAPService,
+        schema_name: str,
+        table_name: str,
+        state: TableState,
+    ):
+        """Record the outcome of the validation of a table, without persisting it
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            schema_name (str): The schema name
+            table_name (str): The table name
+            state (TableState): The state of the table
+        """
+        self.get(tap_service)[self.key(schema_name, table_name)] = state
+
+    def save(self):
+        """Write the store to its file"""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(
+                    {
+                        url: {key: state.as_dict() for key, state in tables.items()}
+                        for url, tables in self.entries.items()
+                    },
+                    file,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logger.warning(f"Unable to write table state: {exc}")
+
+
+table_state = TableStateStore()
@@ -1,11 +1,13 @@
-import time
-import asyncio
-from dramatiq.results.errors import ResultTimeout, ResultMissing  # type: ignore
 from tapvalidator.models.result import VOTable, Result
+from tapvalidator.models.result_format import ResultFormat
+from tapvalidator.models.fingerprint import ResultFingerprint
 from tapvalidator.models.query import Query
 from tapvalidator.models.status import Status
-from tapvalidator.tasks import run_sync_query_task
 from tapvalidator.models.query import QueryTask
+from tapvalidator.services.query_backend import QueryBackend, QueryBackendResolver
+from tapvalidator.services.admission import AdmissionControl
+from tapvalidator.services.format_negotiator import FormatNegotiator
+from tapvalidator.utility.fingerprint import Fingerprinter
 from tapvalidator.logger.logger import logger
 from tapvalidator.settings import settings
 
@@ -14,14 +16,39 @@ __all__ = ["QueryRunner"]
 
 class QueryRunner:
     """Query Runner Service
-    Handles running a TAP query"""
+    Handles running a TAP query, using the configured QueryBackend
+
+    The result of each query is requested in the first of the preferred result
+    formats that its TAP Service supports, unless the query sets its format"""
+
+    backend: QueryBackend = QueryBackendResolver.get_backend(settings.query_backend)
+    result_formats: list[ResultFormat] | None = None
 
     def __init__(self):
         pass
 
-    @staticmethod
-    async def send_query(query: Query):
-        """Sends out a query to the run_sync_query task of the dramatiq tasks
+    @classmethod
+    def set_backend(cls, backend: QueryBackend):
+        """Set the backend used for executing queries
+
+        Args:
+            backend (QueryBackend): The query backend
+        """
+        cls.backend = backend
+
+    @classmethod
+    def set_result_formats(cls, result_formats: list[ResultFormat] | None):
+        """Set the result formats negotiated with the TAP Services
+
+        Args:
+            result_formats (list[ResultFormat]): The formats in order of preference,
+                None for settings.result_formats
+        """
+        cls.result_formats = result_formats
+
+    @classmethod
+    async def send_query(cls, query: Query):
+        """Sends out a query to the query backend
 
         Args:
             query (Query): The TAP query to be executed.
@@ -36,16 +63,25 @@ class QueryRunner:
             query=query.query_text,
         )
 
-        task = run_sync_query_task.send(
+        preference = [query.result_format] if query.result_format else None
+        query.result_format, format_param = await FormatNegotiator.negotiate(
+            query.tap_service, preference or cls.result_formats
+        )
+        task = await cls.backend.submit(
             query_text=query.query_text,
-            tap_service_url=query.tap_service.endpoints.synchronous,
+            tap_service=query.tap_service,
+            result_format=format_param,
         )
         return QueryTask(query, task)
 
-    @staticmethod
-    async def get_result(query_task: QueryTask, block=False) -> VOTable | Result:
+    @classmethod
+    async def get_result(cls, query_task: QueryTask, block=False) -> VOTable | Result:
         """Get the result of a query task, as a VOTable
 
+        The backends return the error as a string if the request failed (e.g. the
+        service could not be reached), which is a failed Result whatever the format
+        of the query, as the error text could otherwise pass for a CSV result
+
         Args:
             query_task (QueryTask): The Query Task
             block (bool): Whether to get as a blocking call or not
@@ -53,34 +89,30 @@ class QueryRunner:
         Returns:
             VOtable | Result: The VOTable or Result object
         """
-        start_time = time.time()
-        timeout = settings.http_timeout
         query_error = None
         query_votable = VOTable(data="")
 
-        while True:
-            try:
-                result = query_task.task.get_result(block=block, timeout=timeout)
-                query_votable = VOTable(data=result)
-                break  # Exit the loop if the result is obtained successfully
-            except ResultTimeout:
-                elapsed_time = time.time() - start_time
-                if block and timeout is not None and elapsed_time >= timeout:
-                    logger.warning(
-                        "Timeout waiting for query result",
-                        table=query_task.query.table_name,
-                        query=query_task.query.query_text,
-                    )
-                    query_error = Result(
-                        data="",
-                        status=Status.FAIL,
-                        messages=["Timeout waiting for query result"],
-                    )
-                    break  # Exit the loop on timeout
-                else:
-                    await asyncio.sleep(1)
-            except ResultMissing:
-                await asyncio.sleep(1)
+        try:
+            result = await cls.backend.fetch(query_task.task, block=block)
+            if isinstance(result, str):
+                query_error = Result(data=result, status=Status.FAIL, messages=[result])
+            else:
+                query_votable = VOTable.from_response(
+                    result,
+                    result_format=query_task.query.result_format
+                    or ResultFormat.VOTABLE,
+                )
+        except TimeoutError:
+            logger.warning(
+                "Timeout waiting for query result",
+                table=query_task.query.table_name,
+                query=query_task.query.query_text,
+            )
+            query_error = Result(
+                data="",
+                status=Status.FAIL,
+                messages=["Timeout waiting for query result"],
+            )
 
         query_result = query_votable if not query_error else query_error
         query_task.query.result = query_result
@@ -92,3 +124,62 @@ class QueryRunner:
         )
 
         return query_result
+
+    @classmethod
+    async def run_query(cls, query: Query, block=False) -> VOTable | Result:
+        """Run a query and wait for its result, holding an admission slot of its
+        TAP Service for the whole time the query is in flight
+
+        Args:
+            query (Query): The TAP query to be executed
+            block (bool): Whether to get as a blocking call or not
+
+        Returns:
+            VOtable | Result: The VOTable or Result object
+        """
+        admission = AdmissionControl.for_service(query.tap_service)
+        async with admission.slot() as record:
+            query_task = await cls.send_query(query)
+            result = await cls.get_result(query_task, block=block)
+            record(result.status is not Status.FAIL)
+        return result
+
+    @classmethod
+    async def fingerprint(
+        cls, query: Query, ordered: bool = False
+    ) -> ResultFingerprint:
+        """Run a query and compute the fingerprint of its result while the response
+        is read, without keeping the result itself. The result is always requested
+        as a VOTable, as only TABLEDATA can be read while it is received
+
+        Args:
+            query (Query): The TAP query to be executed
+            ordered (bool): Whether the fingerprint depends on the order of the rows
+
+        Returns:
+            ResultFingerprint: The fingerprint of the result
+        """
+        fingerprinter = Fingerprinter(ordered=ordered)
+        admission = AdmissionControl.for_service(query.tap_service)
+        async with admission.slot() as record:
+            logger.info(
+                f"Fingerprinting query to [{query.table_name}]",
+                table=query.table_name,
+                query=query.query_text,
+            )
+            try:
+                async for chunk in cls.backend.stream(
+                    query_text=query.query_text,
+                    tap_service=query.tap_service,
+                ):
+                    fingerprinter.feed(chunk)
+            except TimeoutError:
+                logger.warning(
+                    "Timeout waiting for query result",
+                    table=query.table_name,
+                    query=query.query_text,
+                )
+                fingerprinter.valid = False
+            fingerprint = fingerprinter.close()
+            record(fingerprint.valid)
+        return fingerprint
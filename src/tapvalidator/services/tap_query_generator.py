@@ -1,10 +1,18 @@
+import time
 import random
+import asyncio
 from typing import AsyncGenerator
 from tapvalidator.models.query import Query
-from tapvalidator.models.result import VOTable
+from tapvalidator.models.result import VOTable, Result
+from tapvalidator.models.status import Status
+from tapvalidator.models.column_index import ColumnIndex
+from tapvalidator.models.tap_schema import TAPSchemaMetadata
 from tapvalidator.models.tap_service import TAPService
 from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.services.metadata_cache import metadata_cache
+from tapvalidator.services.table_sampler import TableSampler
 from tapvalidator.utility.string_processor import StringProcessor
+from tapvalidator.logger.logger import logger
 
 __all__ = ["QueryGenerator"]
 
@@ -17,73 +25,245 @@ class QueryGenerator:
         pass
 
     @staticmethod
-    async def generate_queries(
-        tap_service: TAPService, fullscan: bool
-    ) -> AsyncGenerator:
-        """Generator, used for fetching queries to be tested for the TAP Service
-        Gets a list of TAP_SCHEMA schemas (i.e. databases), and the generator
-        iterates through the list of databases and fetches a "SELECT TOP 1 * FROM
-        Table" for each table if fullscan is True, otherwise just picks a random
-        table from the Schema (Database)
+    def _rows(result: VOTable | Result | None) -> list:
+        """Get the rows of a query result
+
+        Args:
+            result (VOTable | Result | None): The result of the query
+
+        Returns:
+            list: The rows of the result, or an empty list if there are none
+        """
+        return (
+            list(result.astropy_table.array)
+            if isinstance(result, VOTable) and result.astropy_table
+            else []
+        )
+
+    @staticmethod
+    async def discover_tables(tap_service: TAPService) -> dict[str, list[str]]:
+        """Discover the tables of a TAP Service, grouped by schema
+
+        The schema and table names are fetched from TAP_SCHEMA.tables with a single
+        query. If that fails, the schemas are fetched from TAP_SCHEMA.schemas and
+        the tables of each schema are looked up concurrently, bounded by the
+        admission control of the TAP Service
 
         Args:
             tap_service (TAPService): The TAP Service
-            fullscan (bool): Whether to do a full table scan
 
         Returns:
-            AsyncGenerator[Query]: AsyncGenerator object, with iter yield type
-                being a Query
+            dict[str, list[str]]: Mapping of schema name to its table names
         """
+        tables: dict[str, list[str]] = {}
 
-        def _get_table_query(table_obj: tuple, schema_str: str):
-            """Get the table query
+        all_tables_query = QueryGenerator.get_all_tables_query(tap_service=tap_service)
+        all_tables_result = await QueryRunner.run_query(all_tables_query, block=True)
+
+        rows = QueryGenerator._rows(all_tables_result)
+        if all_tables_query.status is Status.SUCCESS and rows:
+            for schema_name, table_name in rows:
+                tables.setdefault(str(schema_name), []).append(str(table_name))
+            return tables
+
+        logger.warning(
+            "Unable to fetch all tables from TAP_SCHEMA, looking up tables per schema",
+            tap_service=str(tap_service),
+        )
+
+        schemas_query = QueryGenerator.get_schemas_query(tap_service=tap_service)
+        schemas_result = await QueryRunner.run_query(schemas_query, block=True)
+        schema_names = [
+            str(schema[0]) for schema in QueryGenerator._rows(schemas_result)
+        ]
+
+        async def _get_tables(schema_name: str) -> list[str]:
+            """Get the table names of a schema
 
             Args:
-                table_obj (tuple): The Table object
-                schema_str (str): The schema name
+                schema_name (str): The schema name
 
             Returns:
-                Query: A "Select top 1 *.." Query object for that schema_name and table
+                list[str]: The table names
             """
-            table_name = table_obj[0]
-            return QueryGenerator.get_top_1_query(
-                table_name=table_name, tap_service=tap_service, schema_name=schema_str
+            table_query = QueryGenerator.get_tables_query(
+                schema_name=schema_name, tap_service=tap_service
             )
+            tables_result = await QueryRunner.run_query(table_query, block=True)
+            return [str(table[0]) for table in QueryGenerator._rows(tables_result)]
 
-        # This method is probably too complicated, and may not quite follow the
-        # single-responsibility rule. Needs Refactoring
+        schema_tables = await asyncio.gather(
+            *[_get_tables(schema_name) for schema_name in schema_names]
+        )
+        for schema_name, table_names in zip(schema_names, schema_tables):
+            tables[schema_name] = table_names
+        return tables
 
-        schemas_query = QueryGenerator.get_schemas_query(tap_service=tap_service)
-        query_task = await QueryRunner.send_query(query=schemas_query)
-        schemas_result = await QueryRunner.get_result(query_task=query_task, block=True)
+    @staticmethod
+    async def probe_tap_schema(tap_service: TAPService) -> int | None:
+        """Run the change detection probe of the TAP_SCHEMA of a TAP Service
 
-        schemas = (
-            schemas_result.astropy_table.array
-            if isinstance(schemas_result, VOTable) and schemas_result.astropy_table
-            else []
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            int | None: The number of rows in TAP_SCHEMA.columns, or None if the
+                probe failed
+        """
+        probe_query = QueryGenerator.get_probe_query(tap_service=tap_service)
+        rows = QueryGenerator._rows(
+            await QueryRunner.run_query(probe_query, block=True)
         )
+        try:
+            return int(rows[0][0])
+        except (IndexError, TypeError, ValueError):
+            return None
 
-        for schema in schemas:
-            schema_name = schema[0]
-            table_query = QueryGenerator.get_tables_query(
-                schema_name=schema_name, tap_service=tap_service
+    @staticmethod
+    async def get_metadata(tap_service: TAPService) -> TAPSchemaMetadata:
+        """Get the TAP_SCHEMA metadata of a TAP Service, from the metadata cache if
+        it is still valid, otherwise discovering it and updating the cache
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            TAPSchemaMetadata: The metadata
+        """
+        metadata = metadata_cache.get(tap_service)
+        if metadata and metadata_cache.is_fresh(metadata):
+            return metadata
+
+        if metadata:
+            probe = await QueryGenerator.probe_tap_schema(tap_service=tap_service)
+            if probe is not None and probe == metadata.probe:
+                metadata.checked_at = time.time()
+                metadata_cache.put(tap_service, metadata)
+                return metadata
+            logger.info("TAP_SCHEMA has changed", tap_service=str(tap_service))
+
+        tables, probe = await asyncio.gather(
+            QueryGenerator.discover_tables(tap_service=tap_service),
+            QueryGenerator.probe_tap_schema(tap_service=tap_service),
+        )
+        now = time.time()
+        metadata = TAPSchemaMetadata(
+            tables=tables, probe=probe, fetched_at=now, checked_at=now
+        )
+        if tables:
+            metadata_cache.put(tap_service, metadata)
+        return metadata
+
+    @staticmethod
+    async def load_schema_columns(
+        schema_name: str, tap_service: TAPService, column_index: ColumnIndex
+    ) -> bool:
+        """Load the columns of every table in a schema into a ColumnIndex, with a
+        single query to TAP_SCHEMA.columns
+
+        The schema is only marked as loaded if the query succeeded, so a failed
+        load can be retried
+
+        Args:
+            schema_name (str): The schema name
+            tap_service (TAPService): The TAP Service
+            column_index (ColumnIndex): The index the columns are added to
+
+        Returns:
+            bool: Whether the columns were loaded
+        """
+        columns_query = QueryGenerator.get_schema_columns_query(
+            schema_name=schema_name, tap_service=tap_service
+        )
+        columns_result = await QueryRunner.run_query(columns_query, block=True)
+        if columns_result.status is not Status.SUCCESS:
+            logger.warning(
+                f"Unable to load the columns of schema [{schema_name}]",
+                tap_service=str(tap_service),
             )
-            tables_task = await QueryRunner.send_query(table_query)
-            tables_result = await QueryRunner.get_result(
-                query_task=tables_task, block=True
+            return False
+        for table_name, column_name, datatype in QueryGenerator._rows(columns_result):
+            column_index.add(
+                schema_name, str(table_name), str(column_name), str(datatype)
             )
+        column_index.schemas.add(schema_name)
+        return True
 
-            tables = (
-                tables_result.astropy_table.array
-                if isinstance(tables_result, VOTable) and tables_result.astropy_table
-                else []
+    @staticmethod
+    def select_tables(
+        tap_service: TAPService,
+        metadata: TAPSchemaMetadata,
+        fullscan: bool,
+        incremental: bool = False,
+        prioritise: bool = False,
+    ) -> list[tuple[str, str]]:
+        """Select the tables to be checked: every table if fullscan is True,
+        the tables picked by the TableSampler if incremental is True, otherwise a
+        random table of each Schema (Database)
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            metadata (TAPSchemaMetadata): The TAP_SCHEMA metadata of the service
+            fullscan (bool): Whether to do a full table scan
+            incremental (bool): Whether to check the tables picked by the
+                TableSampler (default: False)
+            prioritise (bool): Whether to sort the tables by priority, so the most
+                valuable are checked first (default: False)
+
+        Returns:
+            list[tuple[str, str]]: The schema and table name of the tables
+        """
+        if incremental and not fullscan:
+            return TableSampler.select(tap_service, metadata)
+
+        tables: list[tuple[str, str]] = []
+        for schema_name, table_names in metadata.tables.items():
+            if not table_names:
+                continue
+            if not fullscan:
+                table_names = [random.choice(table_names)]
+            tables.extend((schema_name, table_name) for table_name in table_names)
+        if prioritise:
+            tables = TableSampler.order(tap_service, metadata, tables)
+        return tables
+
+    @staticmethod
+    async def generate_queries(
+        tap_service: TAPService,
+        fullscan: bool,
+        incremental: bool = False,
+        tables: list[tuple[str, str]] | None = None,
+    ) -> AsyncGenerator:
+        """Generator, used for fetching queries to be tested for the TAP Service
+        Gets the tables of each TAP_SCHEMA schema (i.e. database), from the metadata
+        cache or by discovering them, and the
+        generator iterates through the tables selected by select_tables and
+        fetches a "SELECT TOP 1 * FROM Table" for each of them
+
+        Args:
+            tap_service (TAPService): The TAP Service
+            fullscan (bool): Whether to do a full table scan
+            incremental (bool): Whether to check the tables picked by the
+                TableSampler (default: False)
+            tables (list[tuple[str, str]]): The schema and table name of the tables
+                to check (default: None, selected from the metadata)
+
+        Returns:
+            AsyncGenerator[Query]: AsyncGenerator object, with iter yield type
+                being a Query
+        """
+        if tables is None:
+            metadata = await QueryGenerator.get_metadata(tap_service=tap_service)
+            tables = QueryGenerator.select_tables(
+                tap_service, metadata, fullscan, incremental
             )
 
-            if fullscan:
-                for table in tables:
-                    yield _get_table_query(table, schema_str=schema_name)
-            else:
-                yield _get_table_query(random.choice(tables), schema_str=schema_name)
+        for schema_name, table_name in tables:
+            yield QueryGenerator.get_top_1_query(
+                table_name=table_name,
+                tap_service=tap_service,
+                schema_name=schema_name,
+            )
 
     @staticmethod
     def get_schemas_query(tap_service: TAPService) -> Query:
@@ -103,6 +283,42 @@ class QueryGenerator:
             tap_service=tap_service,
         )
 
+    @staticmethod
+    def get_all_tables_query(tap_service: TAPService) -> Query:
+        """Get the query that fetches the tables of all schemas in a TAP Service
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            Query: The query that fetches the schema and table names
+        """
+        q = "SELECT schema_name, table_name FROM TAP_SCHEMA.tables"
+        return Query(
+            query_text=q,
+            schema_name="TAP_SCHEMA",
+            table_name="tables",
+            tap_service=tap_service,
+        )
+
+    @staticmethod
+    def get_probe_query(tap_service: TAPService) -> Query:
+        """Get the query used to detect changes in TAP_SCHEMA
+
+        Args:
+            tap_service (TAPService): The TAP Service
+
+        Returns:
+            Query: The query that counts the rows of TAP_SCHEMA.columns
+        """
+        q = "SELECT COUNT(*) FROM TAP_SCHEMA.columns"
+        return Query(
+            query_text=q,
+            schema_name="TAP_SCHEMA",
+            table_name="columns",
+            tap_service=tap_service,
+        )
+
     @staticmethod
     def get_tables_query(schema_name: str, tap_service: TAPService) -> Query:
         """Get the query that can fetch the tables of a Schema in a TAP Service
@@ -171,3 +387,28 @@ class QueryGenerator:
             table_name="columns",
             tap_service=tap_service,
         )
+
+    @staticmethod
+    def get_schema_columns_query(schema_name: str, tap_service: TAPService) -> Query:
+        """Get the query that will select the columns of all Tables in a Schema
+
+        Args:
+            schema_name (str): The Schema name
+            tap_service (TAPService): The TAP Service that is being queried
+
+        Returns:
+            Query: The query that allows getting the columns of every table in the
+                schema
+        """
+        q = (
+            f"SELECT c.table_name, c.column_name, c.datatype "
+            f"FROM TAP_SCHEMA.columns AS c "
+            f"JOIN TAP_SCHEMA.tables AS t ON c.table_name = t.table_name "
+            f"WHERE t.schema_name = '{schema_name}'"
+        )
+        return Query(
+            query_text=q,
+            schema_name=schema_name,
+            table_name="columns",
+            tap_service=tap_service,
+        )
@@ -0,0 +1,88 @@
+"""
+Concurrent execution of validators
+
+Validators are added to the scheduler with the names of the validators they depend
+on. Every validator starts as soon as its dependencies have succeeded, so
+independent validators run at the same time and a run takes about as long as its
+slowest chain of validators. A validator whose dependency did not succeed is
+skipped, and fails with a message naming the dependency. The result of each
+validator is handed to a callback as soon as it completes.
+"""
+import asyncio
+from typing import Awaitable, Callable
+from tapvalidator.models.result import ValidationResult
+from tapvalidator.models.status import Status
+from tapvalidator.logger.logger import logger
+from tapvalidator.validators.protocol import Validator
+
+__all__ = ["ValidatorScheduler"]
+
+
+class ValidatorScheduler:
+    """Runs validators concurrently, respecting the dependencies between them"""
+
+    def __init__(self):
+        self._validators: dict[str, Validator] = {}
+        self._dependencies: dict[str, list[str]] = {}
+
+    def add(self, name: str, validator: Validator, depends_on: tuple[str, ...] = ()):
+        """Add a validator
+
+        Args:
+            name (str): The name of the validator
+            validator (Validator): The validator
+            depends_on (tuple[str, ...]): The names of the validators which must
+                succeed before this one is run, which must already be added
+        """
+        if name in self._validators:
+            raise ValueError(f"Validator [{name}] is already scheduled")
+        for dependency in depends_on:
+            if dependency not in self._validators:
+                raise ValueError(f"Unknown dependency [{dependency}] of [{name}]")
+        self._validators[name] = validator
+        self._dependencies[name] = list(depends_on)
+
+    async def run(
+        self,
+        on_result: Callable[[str, ValidationResult], Awaitable] | None = None,
+    ) -> dict[str, ValidationResult]:
+        """Run the validators
+
+        Args:
+            on_result (Callable): Coroutine function called with the name and the
+                result of each validator as soon as it completes (default: None)
+
+        Returns:
+            dict[str, ValidationResult]: The result of each validator, in the order
+                the validators were added
+        """
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def _run(name: str) -> ValidationResult:
+            result = None
+            for dependency in self._dependencies[name]:
+                if (await tasks[dependency]).status is not Status.SUCCESS:
+                    result = ValidationResult(
+                        status=Status.FAIL,
+                        messages=[f"Skipped, as the [{dependency}] validation failed"],
+                    )
+                    break
+            if result is None:
+                try:
+                    result = await self._validators[name].validate()
+                except Exception as exc:
+                    logger.error(f"Validator [{name}] raised an error", error=str(exc))
+                    result = ValidationResult(status=Status.FAIL, messages=[str(exc)])
+            if on_result is not None:
+                await on_result(name, result)
+            return result
+
+        # Dependencies are added first, so their tasks exist before they are awaited
+        for name in self._validators:
+            tasks[name] = asyncio.create_task(_run(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return {name: task.result() for name, task in tasks.items()}
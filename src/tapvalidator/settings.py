@@ -34,6 +34,102 @@ class Settings:
                 del os.environ["PYTHONASYNCIODEBUG"]
         self.redis_url = config.get("Redis", "url")
 
+        self.fleet_max_parallel_services = config.getint(
+            "Tasks", "max_parallel_services", fallback=8
+        )
+        self.worker_threads = config.getint("Tasks", "worker_threads", fallback=4)
+
+        self.result_ttl = config.getfloat("Results", "ttl", fallback=600)
+        self.result_wait_interval = config.getfloat(
+            "Results", "wait_interval", fallback=5
+        )
+        self.result_compression = config.get("Results", "compression", fallback="zstd")
+        self.result_compression_threshold = config.getint(
+            "Results", "compression_threshold", fallback=65536
+        )
+        self.result_compression_level = config.getint(
+            "Results", "compression_level", fallback=3
+        )
+
+        self.query_backend = config.get("Backend", "engine", fallback="DRAMATIQ")
+
+        self.comparison_chunk_size = config.getint(
+            "Comparison", "chunk_size", fallback=10000
+        )
+        self.comparison_report_rows = config.getint(
+            "Comparison", "report_rows", fallback=10
+        )
+        self.comparison_atol = config.getfloat("Comparison", "atol", fallback=0.0)
+        self.comparison_rtol = config.getfloat("Comparison", "rtol", fallback=0.0)
+        self.comparison_page_size = config.getint("Comparison", "page_size", fallback=0)
+
+        self.result_formats = [
+            name.strip().upper()
+            for name in config.get(
+                "Format", "preference", fallback="BINARY2,VOTABLE"
+            ).split(",")
+            if name.strip()
+        ]
+
+        self.spool_threshold = config.getint("Spool", "threshold", fallback=16777216)
+        self.spool_directory = config.get(
+            "Spool", "directory", fallback="~/.cache/tapvalidator/spool"
+        )
+
+        self.metadata_cache_path = config.get(
+            "Cache", "metadata_path", fallback="~/.cache/tapvalidator/metadata.json"
+        )
+        self.metadata_cache_ttl = config.getfloat(
+            "Cache", "metadata_ttl", fallback=3600
+        )
+        self.metadata_cache_max_age = config.getfloat(
+            "Cache", "metadata_max_age", fallback=86400
+        )
+
+        self.table_state_path = config.get(
+            "Incremental", "state_path", fallback="~/.cache/tapvalidator/tables.json"
+        )
+        self.incremental_max_queries = config.getint(
+            "Incremental", "max_queries", fallback=50
+        )
+        self.incremental_max_duration = config.getfloat(
+            "Incremental", "max_duration", fallback=60
+        )
+        self.incremental_coverage_period = config.getfloat(
+            "Incremental", "coverage_period", fallback=86400
+        )
+
+        self.uws_poll_interval = config.getfloat("UWS", "poll_interval", fallback=0.5)
+        self.uws_max_poll_interval = config.getfloat(
+            "UWS", "max_poll_interval", fallback=30
+        )
+        self.uws_timeout = config.getfloat("UWS", "timeout", fallback=3600)
+        self.max_connections = config.getint("HTTP", "max_connections", fallback=100)
+        self.max_keepalive_connections = config.getint(
+            "HTTP", "max_keepalive_connections", fallback=20
+        )
+        self.keepalive_expiry = config.getfloat("HTTP", "keepalive_expiry", fallback=30)
+        self.max_connections_per_host = config.getint(
+            "HTTP", "max_connections_per_host", fallback=10
+        )
+        self.http2 = config.getboolean("HTTP", "http2", fallback=False)
+
+        self.admission_min_parallel_queries = config.getint(
+            "Admission", "min_parallel_queries", fallback=1
+        )
+        self.admission_slow_query = config.getfloat(
+            "Admission", "slow_query", fallback=60
+        )
+        self.admission_cooldown = config.getfloat("Admission", "cooldown", fallback=5)
+        self.admission_base_backoff = config.getfloat(
+            "Admission", "base_backoff", fallback=1
+        )
+        self.admission_max_backoff = config.getfloat(
+            "Admission", "max_backoff", fallback=60
+        )
+
+        self.daemon_jitter = config.getfloat("Daemon", "jitter", fallback=30)
+
         self.id = "".join(
             random.choice(string.ascii_uppercase + string.digits) for _ in range(6)
         )
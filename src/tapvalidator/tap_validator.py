@@ -10,24 +10,44 @@ TABLE_VALIDATION can be used for healthchecking a TAP Service and
 its underlying SQL Database
 VALIDATION does a test of various parts of the TAP Service
 COMPARISON compares two TAP Services with a list of queries
+FLEET validates a list of TAP Services concurrently, with a consolidated report
+DAEMON stays resident, validating TAP Services on per-service schedules
 """
+import json
+import time
 import asyncio
 import click
 
+from tapvalidator.models.budget import ValidationBudget
 from tapvalidator.models.status import Status
 from tapvalidator.models.tap_service import TAPService
 from tapvalidator.logger.logger import logger
 from tapvalidator.services.tap_query import QueryRunner
-from tapvalidator.models.result import ValidationResult
+from tapvalidator.models.result import Result, ValidationResult, VOTable
 from tapvalidator.models.query import Query
+from tapvalidator.models.comparison_report import ComparisonReport
+from tapvalidator.models.fleet_report import FleetReport, ServiceReport
+from tapvalidator.models.comparison_options import ComparisonOptions
+from tapvalidator.models.result_format import ResultFormat
 from tapvalidator.models.run_mode import Mode as RunMode
 from tapvalidator.services.alerter import AlerterResolver, AlerterService
+from tapvalidator.services.daemon import Daemon, ScheduleLoader
+from tapvalidator.services.fleet import FleetLoader
+from tapvalidator.services.http_sessions import EndpointClient
+from tapvalidator.services.query_backend import QueryBackendResolver
+from tapvalidator.services.query_paginator import QueryPaginator
+from tapvalidator.services.validator_scheduler import ValidatorScheduler
+from tapvalidator.settings import settings
 from tapvalidator.validators.availability_validator import AvailabilityValidator
 from tapvalidator.validators.capabilities_validator import CapabilitiesValidator
 from tapvalidator.validators.table_validator import TableValidator
-from tapvalidator.comparators.votable import VOTableComparator
+from tapvalidator.comparators.votable import (
+    StreamingVOTableComparator,
+    VOTableComparator,
+)
 from tapvalidator.validators.vosi_validator import VOSIValidator
 from tapvalidator.utility.string_processor import StringProcessor
+from tapvalidator.utility.pipeline import Pipeline
 from tapvalidator.exceptions.invalid_mode import InvalidRunMode
 from tapvalidator.models.validation_config import ValidationConfiguration
 
@@ -41,10 +61,16 @@ class TAPValidator:
 
     def __init__(self, config: ValidationConfiguration):
         self.config = config
+        if self.config.backend:
+            QueryRunner.set_backend(self.config.backend)
+        if self.config.result_formats:
+            QueryRunner.set_result_formats(self.config.result_formats)
         self.run_actions = {
             RunMode.COMPARISON.value: self.compare_tap_services,
             RunMode.VALIDATION.value: self.validate_tap_service,
             RunMode.TABLE_VALIDATION.value: self.validate_tables,
+            RunMode.FLEET.value: self.validate_fleet,
+            RunMode.DAEMON.value: self.run_daemon,
         }
 
     async def run(self, mode, **kwargs):
@@ -57,45 +83,184 @@ class TAPValidator:
         """
         if mode.upper() not in self.run_actions:
             raise InvalidRunMode(mode)
-        await self.run_actions[mode.upper()](**kwargs)
+        try:
+            await self.run_actions[mode.upper()](**kwargs)
+        finally:
+            await QueryRunner.backend.close()
+            await EndpointClient.close()
 
-    async def validate_tables(self, fullscan: bool = False):
+    async def validate_tables(
+        self,
+        fullscan: bool = False,
+        check_columns: bool = False,
+        tap_service: TAPService | None = None,
+        incremental: bool = False,
+        budget: ValidationBudget | None = None,
+    ) -> ValidationResult:
         """
         Validate the tables of a TAP Service
         Args:
             fullscan (bool): Whether to do a full scan
+            check_columns (bool): Whether to validate the columns of the tables
+            tap_service (TAPService): The TAP Service to validate
+                (default: None, the first service of the configuration)
+            incremental (bool): Whether to only check the tables with the highest
+                priority, within the incremental budget (default: False)
+            budget (ValidationBudget): The deadline and maximum number of queries of
+                the table validation (default: None, no limit)
+
+        Returns:
+            ValidationResult: The result of the validation
         """
+        tap_service = tap_service or self.config.first_service
         validation_task = asyncio.create_task(
-            TableValidator(self.config.first_service, fullscan=fullscan).validate()
+            TableValidator(
+                tap_service,
+                fullscan=fullscan,
+                check_columns=check_columns,
+                incremental=incremental,
+                budget=budget,
+            ).validate()
         )
         result = await validation_task
-        await self.handle_notifications(result)
+        await self.handle_notifications(result, tap_service)
+        return result
 
-    async def validate_tap_service(self, fullscan: bool = False):
+    async def validate_tap_service(
+        self,
+        fullscan: bool = False,
+        check_columns: bool = False,
+        tap_service: TAPService | None = None,
+        incremental: bool = False,
+        budget: ValidationBudget | None = None,
+    ) -> dict[str, ValidationResult]:
         """
         Validate the service with a list of queries
+
+        The validators run concurrently, except for the tables which are only
+        validated once the service is available, and a notification is sent as
+        soon as each validator completes
         Args:
             fullscan (bool): Whether to do a full scan
+            check_columns (bool): Whether to validate the columns of the tables
+            tap_service (TAPService): The TAP Service to validate
+                (default: None, the first service of the configuration)
+            incremental (bool): Whether to only check the tables with the highest
+                priority, within the incremental budget (default: False)
+            budget (ValidationBudget): The deadline and maximum number of queries of
+                the table validation (default: None, no limit)
+
+        Returns:
+            dict[str, ValidationResult]: The result of each validator
+        """
+        tap_service = tap_service or self.config.first_service
+        scheduler = ValidatorScheduler()
+        scheduler.add("availability", AvailabilityValidator(tap_service))
+        scheduler.add("capabilities", CapabilitiesValidator(tap_service))
+        scheduler.add("vosi", VOSIValidator(tap_service))
+        scheduler.add(
+            "tables",
+            TableValidator(tap_service, fullscan, check_columns, incremental, budget),
+            depends_on=("availability",),
+        )
+
+        return await scheduler.run(
+            on_result=lambda name, result: self.handle_notifications(
+                result, tap_service
+            )
+        )
+
+    async def validate_fleet(
+        self,
+        fullscan: bool = False,
+        check_columns: bool = False,
+        report: str = "",
+        incremental: bool = False,
+        budget: ValidationBudget | None = None,
+    ) -> FleetReport:
+        """Validate the TAP Services of the configuration concurrently
+
+        Up to settings.fleet_max_parallel_services services are validated at the
+        same time, and the queries to each service are bounded by its admission
+        control. The services share the query backend, its connection pools and the
+        metadata cache
+
+        Args:
+            fullscan (bool): Whether to do a full scan of the tables
+            check_columns (bool): Whether to validate the columns of the tables
+            report (str): Path of a file the consolidated report is written to as
+                JSON (default: "", no file is written)
+            incremental (bool): Whether to only check the tables of each service
+                with the highest priority, within the incremental budget
+                (default: False)
+            budget (ValidationBudget): The deadline and maximum number of queries of
+                the table validation of each service (default: None, no limit)
+
+        Returns:
+            FleetReport: The consolidated report of the services
+        """
+        if not self.config.services:
+            raise ValueError("No TAP Services to validate")
+
+        async def _validate(tap_service: TAPService) -> ServiceReport:
+            start_time = time.monotonic()
+            results = await self.validate_tap_service(
+                fullscan,
+                check_columns,
+                tap_service=tap_service,
+                incremental=incremental,
+                budget=budget,
+            )
+            service_report = ServiceReport.from_results(
+                tap_service, results, time.monotonic() - start_time
+            )
+            logger.info(
+                f"{tap_service} [{service_report.status}]",
+                duration=service_report.duration,
+            )
+            return service_report
+
+        fleet_report = FleetReport(
+            services=await Pipeline.map(
+                self.config.services,
+                _validate,
+                concurrency=settings.fleet_max_parallel_services,
+            )
+        )
+        if fleet_report.status is Status.SUCCESS:
+            logger.info(fleet_report.summary)
+        else:
+            logger.error(fleet_report.summary)
+        if report:
+            with open(report, "w") as file:
+                file.write(fleet_report.to_json())
+        return fleet_report
 
+    async def run_daemon(self) -> Daemon:
+        """Run the checks of the configuration on their schedules until stopped
+
+        The query backend and the HTTP clients are kept open between runs, and
+        closed when the daemon stops
+
+        Returns:
+            Daemon: The stopped daemon
         """
-        validators = [
-            TableValidator(self.config.first_service, fullscan),
-            VOSIValidator(self.config.first_service),
-            AvailabilityValidator(self.config.first_service),
-            CapabilitiesValidator(self.config.first_service),
-        ]
-
-        for validator in validators:
-            validation_task = asyncio.create_task(validator.validate())
-            result = await validation_task
-            await self.handle_notifications(result)
-
-    async def handle_notifications(self, validation_result: ValidationResult):
+        daemon = Daemon(self, self.config.checks)
+        await daemon.run()
+        return daemon
+
+    async def handle_notifications(
+        self,
+        validation_result: ValidationResult,
+        tap_service: TAPService | None = None,
+    ):
         """Handle sending out notification if this functionality is enabled
 
         Args:
             validation_result (ValidationResult): Validation result for the
             notification message
+            tap_service (TAPService): The validated TAP Service
+                (default: None, the first service of the configuration)
         """
         if not self.config.alerter:
             return
@@ -103,40 +268,219 @@ class TAPValidator:
         if validation_result.status is not Status.SUCCESS:
             msg = StringProcessor.generate_alert_message(
                 validation_result=validation_result,
-                tap_service=self.config.first_service,
+                tap_service=tap_service or self.config.first_service,
             )
 
-            AlerterService.send_alert(
+            # Alerters send the notification with blocking calls
+            await asyncio.to_thread(
+                AlerterService.send_alert,
                 msg=msg,
                 destination=self.config.alert_destination,
                 alerter=self.config.alerter,
             )
 
-    async def compare_tap_services(self):
-        """Runs the comparison for SQL queries stored in a text file."""
-        if self.config.queries:
-            with open(self.config.queries, "r") as file:
-                queries = file.readlines()
+    async def compare_query(
+        self, query_text: str, fingerprint: bool = False, ordered: bool = False
+    ) -> ComparisonReport:
+        """Compare the results of a query on the two TAP Services
+
+        If a page size and key columns are set in the comparison options, the query
+        is split into pages over the range of the first key column, and the pages
+        are compared concurrently
+
+        Args:
+            query_text (str): The query to be run
+            fingerprint (bool): Whether to compare the fingerprints of the results
+                first, only downloading the full results if they differ
+            ordered (bool): Whether the fingerprints depend on the order of the rows
+
+        Returns:
+            ComparisonReport: The report of the differences between the results
+        """
+        options = self.config.comparison_options
+        if options.page_size and options.key_columns:
+            pages = await QueryPaginator.paginate(
+                query_text,
+                key=options.key_columns[0],
+                tap_services=[self.config.first_service, self.config.second_service],
+                page_size=options.page_size,
+            )
+            if pages:
+                reports = await Pipeline.map(
+                    pages,
+                    lambda page: self.compare_results(page, fingerprint, ordered),
+                    concurrency=settings.max_parallel_tasks,
+                )
+                return ComparisonReport.combine(
+                    query_text, reports, max_rows=settings.comparison_report_rows
+                )
+        return await self.compare_results(query_text, fingerprint, ordered)
+
+    async def compare_results(
+        self, query_text: str, fingerprint: bool = False, ordered: bool = False
+    ) -> ComparisonReport:
+        """Compare the results of a query on the two TAP Services, which are queried
+        at the same time
+
+        Args:
+            query_text (str): The query to be run
+            fingerprint (bool): Whether to compare the fingerprints of the results
+                first, only downloading the full results if they differ
+            ordered (bool): Whether the fingerprints depend on the order of the rows
+
+        Returns:
+            ComparisonReport: The report of the differences between the results
+        """
+        if fingerprint:
+            fingerprint1, fingerprint2 = await asyncio.gather(
+                QueryRunner.fingerprint(
+                    Query(query_text=query_text, tap_service=self.config.first_service),
+                    ordered=ordered,
+                ),
+                QueryRunner.fingerprint(
+                    Query(
+                        query_text=query_text, tap_service=self.config.second_service
+                    ),
+                    ordered=ordered,
+                ),
+            )
+            if fingerprint1.matches(fingerprint2):
+                return ComparisonReport(
+                    query=query_text,
+                    nrows1=fingerprint1.nrows,
+                    nrows2=fingerprint2.nrows,
+                )
+            logger.info("Fingerprints differ, comparing full results", query=query_text)
+
+        q1 = Query(query_text=query_text, tap_service=self.config.first_service)
+        q2 = Query(query_text=query_text, tap_service=self.config.second_service)
+        result1, result2 = await asyncio.gather(
+            QueryRunner.run_query(q1), QueryRunner.run_query(q2)
+        )
+
+        options = self.config.comparison_options
+        if self.spooled(result1, result2) and not options.key_columns:
+            # Spooled results are first compared from their memory-mapped views,
+            # and only parsed in full to report their differences
+            try:
+                if StreamingVOTableComparator.compare(
+                    result1.raw, result2.raw, options=options
+                ):
+                    return ComparisonReport(query=query_text)
+            except ValueError:
+                # Results that are not TABLEDATA are only compared once parsed
+                pass
+        report = VOTableComparator.diff(result1, result2, options=options)
+        report.query = query_text
+        return report
+
+    @staticmethod
+    def spooled(*results: VOTable | Result) -> bool:
+        """Check whether any of the results was spooled to disk
+
+        Args:
+            results (VOTable | Result): The results
+
+        Returns:
+            bool: True if any result is spooled and all of them are successful
+                VOTable documents
+        """
+        return any(
+            isinstance(result, VOTable) and result.spool for result in results
+        ) and all(
+            result.status is not Status.FAIL
+            and (not isinstance(result, VOTable) or result.is_document)
+            for result in results
+        )
+
+    async def compare_tap_services(
+        self, fingerprint: bool = False, ordered: bool = False, report: str = ""
+    ) -> list[ComparisonReport]:
+        """Runs the comparison for SQL queries stored in a text file.
 
-            for query in queries:
-                q1 = Query(query_text=query, tap_service=self.config.first_service)
-                qtask = await QueryRunner.send_query(query=q1)
-                await QueryRunner.get_result(qtask)
+        Many queries are compared at the same time, while the number of queries in
+        flight to each TAP Service is bounded by its admission control
 
-                q2 = Query(query_text=query, tap_service=self.config.second_service)
-                qtask = await QueryRunner.send_query(query=q1)
-                await QueryRunner.get_result(qtask)
+        Args:
+            fingerprint (bool): Whether to compare the fingerprints of the results
+                first, only downloading the full results if they differ
+            ordered (bool): Whether the fingerprints depend on the order of the rows
+            report (str): Path of a file the comparison reports are written to as
+                JSON (default: "", no file is written)
+
+        Returns:
+            list[ComparisonReport]: The report of each query, in the order of the
+                queries file
+        """
+        if self.config.queries:
+            with open(self.config.queries, "r") as file:
+                queries = [line.strip() for line in file if line.strip()]
 
-                if VOTableComparator.compare(q1.result, q2.result):
+            async def _compare(query: str) -> ComparisonReport:
+                query_report = await self.compare_query(query, fingerprint, ordered)
+                if query_report.equal:
                     logger.info(f"{query} [OK]")
                 else:
-                    logger.error(f"{query} [OK]")
+                    logger.error(f"{query} [FAIL] {query_report.summary}")
+                return query_report
+
+            reports = await Pipeline.map(
+                queries, _compare, concurrency=settings.max_parallel_tasks
+            )
+
+            if report:
+                with open(report, "w") as file:
+                    json.dump(
+                        [item.as_dict() for item in reports],
+                        file,
+                        indent=2,
+                        default=str,
+                    )
+            return reports
         else:
             raise NotImplementedError(
                 "Can only use function with a known set of queries currently"
             )
 
 
+def _parse_result_formats(
+    ctx: click.Context, param: click.Parameter, value: str
+) -> list[ResultFormat]:
+    """Parse the comma separated result formats of the --result_formats option
+
+    Raises:
+        click.BadParameter: If a format is not a ResultFormat
+    """
+    result_formats = []
+    for name in value.split(","):
+        if not name.strip():
+            continue
+        try:
+            result_formats.append(ResultFormat(name.strip().upper()))
+        except ValueError as error:
+            raise click.BadParameter(
+                f"Unknown result format [{name.strip()}], expected one of "
+                + ", ".join(result_format.value for result_format in ResultFormat)
+            ) from error
+    return result_formats
+
+
+def _parse_tolerances(
+    ctx: click.Context, param: click.Parameter, value: tuple[str, ...]
+) -> tuple[str, ...]:
+    """Check the column tolerances of the --tolerance option
+
+    Raises:
+        click.BadParameter: If a tolerance is not name:atol:rtol
+    """
+    for tolerance in value:
+        try:
+            ComparisonOptions.parse_tolerance(tolerance)
+        except ValueError as error:
+            raise click.BadParameter(str(error)) from error
+    return value
+
+
 @click.command()
 @click.option("--mode", help="Mode for TAP Validator")
 @click.option(
@@ -160,6 +504,13 @@ class TAPValidator:
     required=False,
     default="",
 )
+@click.option(
+    "--services",
+    help="Path of the list of TAP services validated in FLEET mode (a text file "
+    "of URLs, a JSON list or a registry VOTable export)",
+    required=False,
+    default="",
+)
 @click.option(
     "--notification_method",
     help="The notification method for the validation",
@@ -173,14 +524,159 @@ class TAPValidator:
     required=False,
     default=False,
 )
+@click.option(
+    "--check_columns",
+    is_flag=True,
+    help="Whether to validate the columns of the tables against TAP_SCHEMA",
+    required=False,
+    default=False,
+)
+@click.option(
+    "--fingerprint",
+    is_flag=True,
+    help="Whether to compare fingerprints of the results before the full results",
+    required=False,
+    default=False,
+)
+@click.option(
+    "--ordered",
+    is_flag=True,
+    help="Whether the result fingerprints depend on the order of the rows",
+    required=False,
+    default=False,
+)
+@click.option(
+    "--report",
+    help="Path of a JSON file the comparison or fleet reports are written to",
+    required=False,
+    default="",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Only validate the tables with the highest priority (previously failing, "
+    "changed or least recently checked), within the incremental budget",
+    required=False,
+    default=False,
+)
+@click.option(
+    "--deadline",
+    help="Seconds the table validation may take, the tables are checked in order "
+    "of priority and the queries still running at the deadline are cancelled "
+    "(0 for no limit)",
+    required=False,
+    default=0.0,
+    type=float,
+)
+@click.option(
+    "--max_queries",
+    help="The maximum number of tables queried by the table validation "
+    "(0 for no limit)",
+    required=False,
+    default=0,
+    type=int,
+)
+@click.option(
+    "--schedule",
+    help="Path of an INI file with the scheduled checks run in DAEMON mode",
+    required=False,
+    default="",
+)
+@click.option(
+    "--atol",
+    help="The absolute tolerance when comparing numeric values",
+    required=False,
+    default=settings.comparison_atol,
+    type=float,
+)
+@click.option(
+    "--rtol",
+    help="The relative tolerance when comparing numeric values",
+    required=False,
+    default=settings.comparison_rtol,
+    type=float,
+)
+@click.option(
+    "--tolerance",
+    help="The tolerance of a column as name:atol:rtol, can be repeated",
+    required=False,
+    multiple=True,
+    callback=_parse_tolerances,
+)
+@click.option(
+    "--include",
+    help="Comma separated list of the columns to compare",
+    required=False,
+    default="",
+)
+@click.option(
+    "--exclude",
+    help="Comma separated list of the columns not to compare",
+    required=False,
+    default="",
+)
+@click.option(
+    "--key_columns",
+    help="Comma separated list of columns used to match rows when comparing",
+    required=False,
+    default="",
+)
+@click.option(
+    "--page_size",
+    help="Split comparison queries into pages of this many rows over the range of "
+    "the first key column (0 to disable)",
+    required=False,
+    default=settings.comparison_page_size,
+    type=int,
+)
+@click.option(
+    "--backend",
+    help="The backend used for running the queries (DRAMATIQ, HTTPX or UWS)",
+    required=False,
+    default=settings.query_backend,
+)
+@click.option(
+    "--result_formats",
+    help="Comma separated result formats to request, in order of preference "
+    "(VOTABLE, BINARY2, PARQUET or CSV)",
+    required=False,
+    default=",".join(settings.result_formats),
+    callback=_parse_result_formats,
+)
+@click.option(
+    "--max_parallel_queries",
+    help="The maximum number of queries in flight to each TAP service",
+    required=False,
+    default=0,
+    type=int,
+)
 def main(
     mode: str,
     tap_service: str,
     slack_webhook: str = "",
     queries: str = "",
+    services: str = "",
     fullscan: bool = False,
+    check_columns: bool = False,
+    incremental: bool = False,
+    deadline: float = 0.0,
+    max_queries: int = 0,
+    fingerprint: bool = False,
+    ordered: bool = False,
+    report: str = "",
+    schedule: str = "",
+    atol: float = settings.comparison_atol,
+    rtol: float = settings.comparison_rtol,
+    tolerance: tuple[str, ...] = (),
+    include: str = "",
+    exclude: str = "",
+    key_columns: str = "",
+    page_size: int = settings.comparison_page_size,
     notification_method: str = "LOG",
     secondary_tap_service: str = "",
+    backend: str = settings.query_backend,
+    result_formats: list[ResultFormat] | None = None,
+    max_parallel_queries: int = 0,
 ):
     """TAP Validation tool, allows you to run validate that a TAP Service is
     operating as expected
@@ -191,15 +687,60 @@ def main(
 
     notification_method = "SLACK" if slack_webhook is not None else notification_method
     config = ValidationConfiguration(
-        first_service=TAPService(url=tap_service),
-        second_service=TAPService(url=secondary_tap_service),
+        first_service=TAPService(
+            url=tap_service or "", max_parallel_queries=max_parallel_queries
+        ),
+        second_service=TAPService(
+            url=secondary_tap_service, max_parallel_queries=max_parallel_queries
+        ),
         alerter=AlerterResolver.get_alerter(notification_method),
         alert_destination=slack_webhook,
         queries=queries,
+        backend=QueryBackendResolver.get_backend(backend),
+        comparison_options=ComparisonOptions.from_strings(
+            atol=atol,
+            rtol=rtol,
+            tolerances=tolerance,
+            include=include,
+            exclude=exclude,
+            key_columns=key_columns,
+            page_size=page_size,
+        ),
+        result_formats=result_formats,
     )
 
+    if services:
+        config.services = FleetLoader.load(services)
+        for service in config.services:
+            service.max_parallel_queries = (
+                service.max_parallel_queries or max_parallel_queries
+            )
+
+    if schedule:
+        config.checks = ScheduleLoader.load(schedule)
+
+    if mode and mode.upper() == RunMode.COMPARISON.value:
+        options = {"fingerprint": fingerprint, "ordered": ordered, "report": report}
+    elif mode and mode.upper() == RunMode.FLEET.value:
+        options = {
+            "fullscan": fullscan,
+            "check_columns": check_columns,
+            "report": report,
+            "incremental": incremental,
+            "budget": ValidationBudget(deadline, max_queries),
+        }
+    elif mode and mode.upper() == RunMode.DAEMON.value:
+        options = {}
+    else:
+        options = {
+            "fullscan": fullscan,
+            "check_columns": check_columns,
+            "incremental": incremental,
+            "budget": ValidationBudget(deadline, max_queries),
+        }
+
     tap_validator = TAPValidator(config)
-    asyncio.run(tap_validator.run(mode=mode, fullscan=fullscan))
+    asyncio.run(tap_validator.run(mode=mode, **options))
 
 
 if __name__ == "__main__":
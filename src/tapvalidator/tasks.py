@@ -2,53 +2,92 @@
 Dramatiq Tasks and Configuration
 """
 import os
-import requests
-from requests import HTTPError
+import atexit
+import httpx
 import dramatiq  # type: ignore
+from dramatiq.message import Message  # type: ignore
 from dramatiq.brokers.redis import RedisBroker  # type: ignore
 from dramatiq.brokers.stub import StubBroker  # type: ignore
 from dramatiq.results.backends import RedisBackend  # type: ignore
 from dramatiq.results import Results  # type: ignore
 from tapvalidator.constants.tap_params import STANDARD_PARAMS
+from tapvalidator.services.http_sessions import HTTPSessionPool
 from tapvalidator.settings import settings
 from tapvalidator.logger.logger import logger
+from tapvalidator.utility.result_encoder import ResultEncoder
+from tapvalidator.utility.spool import SpoolWriter
 
-result_backend = RedisBackend(url=settings.redis_url)
+result_backend = RedisBackend(url=settings.redis_url, encoder=ResultEncoder())
 if os.getenv("UNIT_TESTS") == "1":
     broker = StubBroker()
     broker.emit_after("process_boot")
 else:
     broker = RedisBroker(url=settings.redis_url)
 
-broker.add_middleware(Results(backend=result_backend))
+broker.add_middleware(
+    Results(backend=result_backend, result_ttl=int(settings.result_ttl * 1000))
+)
 dramatiq.set_broker(broker)
 
+# Connections to the TAP Services are kept alive across the queries of a worker
+sessions = HTTPSessionPool()
+atexit.register(sessions.close)
+
 
 @dramatiq.actor(store_results=True)
-def run_sync_query_task(query_text: str, tap_service_url: str) -> str:
+def run_sync_query_task(
+    query_text: str,
+    tap_service_url: str,
+    result_format: str = STANDARD_PARAMS["FORMAT"],
+) -> bytes | str | dict:
     """Run a synchronous query
 
+    The query is sent with the pooled client of its TAP host, reusing its
+    connections. Large responses are spooled to disk, so that only their descriptor
+    is stored in the result backend
+
     Args:
         query_text (str): The query to be run
         tap_service_url (str): The URL of the TAP Service
+        result_format (str): The value of the FORMAT parameter
 
     Returns:
-        str: the result of the synchronous Query, as a string
+        bytes | str | dict: the body of the synchronous Query response as bytes (or
+            the descriptor of its spool file), or the error as a string if the
+            request failed
 
     """
     params = {
         **STANDARD_PARAMS,
+        "FORMAT": result_format,
         "QUERY": query_text,
     }
 
+    client = sessions.get(tap_service_url)
+    writer = SpoolWriter()
     try:
-        response = requests.get(
-            tap_service_url,
-            params=params,
-            timeout=settings.http_timeout,
-        )
-    except HTTPError as http_error:
+        with client.stream("GET", tap_service_url, params=params) as response:
+            for chunk in response.iter_bytes(chunk_size=1 << 16):
+                writer.write(chunk)
+    except httpx.TimeoutException:
+        writer.discard()
+        raise
+    except httpx.HTTPError as http_error:
+        writer.discard()
         logger.error(str(http_error), query=query_text)
         return str(http_error)
+    except BaseException:
+        writer.discard()
+        raise
+
+    return writer.close()
+
 
-    return response.text
+def forget_result(message: Message):
+    """Delete the stored result of a message once it has been fetched, instead of
+    keeping it in Redis until its TTL expires
+
+    Args:
+        message (Message): The message of the task
+    """
+    result_backend.client.delete(result_backend.build_message_key(message))
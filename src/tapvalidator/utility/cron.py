@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+__all__ = ["CronSchedule"]
+
+# The (lowest, highest) value of the minute, hour, day, month and weekday fields
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+class CronSchedule:
+    """A cron-like schedule, with the five fields minute, hour, day of month, month
+    and day of week (0 or 7 is Sunday). Each field is *, a value, a range a-b, a
+    step */n or a-b/n, or a comma separated list of these
+
+    As in cron, if both the day of month and the day of week are restricted, a day
+    matches if either of them does
+
+    Attributes:
+        expression (str): The cron expression
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression [{expression}]")
+        values = [
+            self._parse_field(field, low, high)
+            for field, (low, high) in zip(fields, FIELD_RANGES)
+        ]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set[int]:
+        """Get the values matched by a field
+
+        Args:
+            field (str): The field
+            low (int): The lowest value of the field
+            high (int): The highest value of the field
+
+        Returns:
+            set[int]: The matched values
+        """
+        values: set[int] = set()
+        for part in field.split(","):
+            part_range, _, step = part.partition("/")
+            if part_range == "*":
+                start, end = low, high
+            elif "-" in part_range:
+                start, end = (int(value) for value in part_range.split("-", 1))
+            else:
+                start = end = int(part_range)
+                if step:
+                    end = high
+            if start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron field [{field}]")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _matches_day(self, moment: datetime) -> bool:
+        """Check whether the day of a moment matches the schedule"""
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Get the first time matching the schedule after a moment
+
+        Args:
+            moment (datetime): The moment
+
+        Returns:
+            datetime: The next matching minute
+        """
+        next_time = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while next_time <= limit:
+            if next_time.month not in self.months:
+                month_start = next_time.replace(day=1, hour=0, minute=0)
+                next_time = (month_start + timedelta(days=32)).replace(day=1)
+            elif not self._matches_day(next_time):
+                next_time = next_time.replace(hour=0, minute=0) + timedelta(days=1)
+            elif next_time.hour not in self.hours:
+                next_time = next_time.replace(minute=0) + timedelta(hours=1)
+            elif next_time.minute not in self.minutes:
+                next_time += timedelta(minutes=1)
+            else:
+                return next_time
+        raise ValueError(f"Cron expression [{self.expression}] never matches")
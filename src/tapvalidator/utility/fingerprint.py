@@ -0,0 +1,168 @@
+"""
+Streaming fingerprints of VOTable results
+
+The rows of a VOTable are hashed as the response is fed in, so two large results
+can be compared without holding either of them in memory. Each cell is reduced to a
+64 bit hash, and the hashes are combined per column and per row. By default the
+combination is a sum, which does not depend on the order of the rows; an ordered
+fingerprint instead runs the hashes of each column through a digest.
+"""
+import hashlib
+from xml.etree import ElementTree
+import numpy as np
+from tapvalidator.models.fingerprint import ResultFingerprint
+from tapvalidator.utility.votable_stream import VOTableRowReader
+
+__all__ = ["Fingerprinter"]
+
+MASK64 = (1 << 64) - 1
+NULL_HASH = np.uint64(0x6E756C6C6E756C6C)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Scramble 64 bit values with the splitmix64 finaliser
+
+    Args:
+        values (np.ndarray): Array of uint64 values
+
+    Returns:
+        np.ndarray: The scrambled values
+    """
+    with np.errstate(over="ignore"):
+        z = values + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _text_hash(value) -> int:
+    """Hash a value which is not numeric, using its text"""
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _cell_hashes(column: np.ndarray) -> np.ndarray:
+    """Hash each cell of a column
+
+    Numbers are hashed by value, so different representations of the same number
+    have the same hash, with all NaN values hashed alike. Null values get a hash of
+    their own
+
+    Args:
+        column (np.ndarray): The column, as returned by VOTableRowReader.to_columns
+
+    Returns:
+        np.ndarray: The uint64 hash of each cell
+    """
+    mask = np.ma.getmaskarray(column)
+    data = np.ma.getdata(column)
+    if data.dtype.kind == "f":
+        # Adding zero turns -0.0 into 0.0
+        bits = np.where(np.isnan(data), np.nan, data + 0.0).view(np.uint64)
+    elif data.dtype.kind == "i":
+        bits = data.view(np.uint64)
+    else:
+        bits = np.fromiter(
+            (_text_hash(value) for value in data), dtype=np.uint64, count=len(data)
+        )
+    return np.where(mask, NULL_HASH, _mix(bits))
+
+
+class Fingerprinter:
+    """Builds the fingerprint of a TABLEDATA VOTable from chunks of its response
+
+    Attributes:
+        ordered (bool): Whether the fingerprint depends on the order of the rows
+    """
+
+    def __init__(self, ordered: bool = False):
+        self.ordered = ordered
+        self.reader = VOTableRowReader()
+        self.nrows = 0
+        self.valid = True
+        self._column_sums: list[int] = []
+        self._column_digests: list = []
+        self._row_sum = 0
+        self._row_digest = hashlib.blake2b(digest_size=16)
+
+    def feed(self, data: bytes):
+        """Feed the next chunk of the response
+
+        Args:
+            data (bytes): The chunk of the response
+        """
+        if not self.valid:
+            return
+        try:
+            self._add_rows(self.reader.feed(data))
+        except ElementTree.ParseError:
+            self.valid = False
+
+    def close(self) -> ResultFingerprint:
+        """Signal the end of the response and get the fingerprint
+
+        Returns:
+            ResultFingerprint: The fingerprint of the result
+        """
+        if self.valid:
+            try:
+                self._add_rows(self.reader.close())
+            except ElementTree.ParseError:
+                self.valid = False
+
+        fields = [(field.name, field.datatype) for field in self.reader.fields]
+        if self.ordered:
+            column_hashes = [digest.hexdigest() for digest in self._column_digests]
+            row_hash = self._row_digest.hexdigest()
+        else:
+            column_hashes = [f"{value:016x}" for value in self._column_sums]
+            row_hash = f"{self._row_sum:016x}"
+
+        return ResultFingerprint(
+            fields=fields,
+            nrows=self.nrows,
+            column_hashes=column_hashes,
+            row_hash=row_hash,
+            ordered=self.ordered,
+            valid=self.valid
+            and bool(fields)
+            and self.reader.is_tabledata
+            and "ERROR" not in self.reader.query_status,
+        )
+
+    def _add_rows(self, rows: list[tuple]):
+        """Add the hashes of a batch of rows to the fingerprint
+
+        Args:
+            rows (list[tuple]): The rows read from the response
+        """
+        if not rows:
+            return
+        if not self._column_sums:
+            # All the fields have been read once the first row is complete
+            self._column_sums = [0] * len(self.reader.fields)
+            self._column_digests = [
+                hashlib.blake2b(digest_size=16) for _ in self.reader.fields
+            ]
+
+        self.nrows += len(rows)
+        row_hashes = np.zeros(len(rows), dtype=np.uint64)
+        columns = self.reader.to_columns(rows).values()
+        for index, column in enumerate(columns):
+            hashes = _cell_hashes(column)
+            with np.errstate(over="ignore"):
+                row_hashes = _mix(row_hashes ^ hashes)
+            if self.ordered:
+                self._column_digests[index].update(hashes.tobytes())
+            else:
+                column_sum = int(hashes.sum(dtype=np.uint64))
+                self._column_sums[index] = (
+                    self._column_sums[index] + column_sum
+                ) & MASK64
+
+        if self.ordered:
+            self._row_digest.update(row_hashes.tobytes())
+        else:
+            self._row_sum = (
+                self._row_sum + int(row_hashes.sum(dtype=np.uint64))
+            ) & MASK64
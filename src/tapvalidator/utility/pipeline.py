@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable
+
+__all__ = ["Pipeline"]
+
+
+class Pipeline:
+    """Producer / consumer pipeline, feeding the items of an async iterable to a
+    bounded pool of workers"""
+
+    @staticmethod
+    async def run(
+        source: AsyncIterable,
+        worker: Callable[[Any], Awaitable],
+        concurrency: int,
+    ):
+        """Process the items of an async iterable concurrently
+
+        Items are pulled from the source only when a worker is free to take them,
+        so at most 2 x concurrency items are held in memory at any time,
+        regardless of how many items the source yields. If the pipeline is
+        cancelled, the workers are cancelled and waited for
+
+        Args:
+            source (AsyncIterable): The items to process
+            worker (Callable): Coroutine function which processes a single item
+            concurrency (int): The number of items processed at the same time
+        """
+        concurrency = max(1, concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        done = object()
+
+        async def _produce():
+            async for item in source:
+                await queue.put(item)
+            for _ in range(concurrency):
+                await queue.put(done)
+
+        async def _consume():
+            while (item := await queue.get()) is not done:
+                await worker(item)
+
+        tasks = [asyncio.create_task(_produce())] + [
+            asyncio.create_task(_consume()) for _ in range(concurrency)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled workers clean up (e.g. abort their jobs) before returning
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def map(
+        items: Iterable,
+        worker: Callable[[Any], Awaitable],
+        concurrency: int,
+    ) -> list:
+        """Process a list of items concurrently, collecting the results
+
+        Args:
+            items (Iterable): The items to process
+            worker (Callable): Coroutine function which processes a single item
+            concurrency (int): The number of items processed at the same time
+
+        Returns:
+            list: The result of each item, in the order of the items
+        """
+        items = list(items)
+        results: list = [None] * len(items)
+
+        async def _source():
+            for item in enumerate(items):
+                yield item
+
+        async def _worker(item: tuple[int, Any]):
+            index, value = item
+            results[index] = await worker(value)
+
+        await Pipeline.run(_source(), _worker, concurrency)
+        return results
@@ -0,0 +1,90 @@
+import gzip
+import importlib
+import importlib.util
+from typing import cast
+from dramatiq.encoder import Encoder, JSONEncoder, MessageData  # type: ignore
+from tapvalidator.settings import settings
+
+__all__ = ["ResultEncoder"]
+
+RAW_BYTES = b"\x00"
+GZIP_BYTES = b"\x01"
+ZSTD_BYTES = b"\x02"
+
+
+class ResultEncoder(Encoder):
+    """Encoder for the dramatiq result backend, which stores bytes results (i.e.
+    query responses) as they are instead of transcoding them to JSON strings.
+    Any other result is encoded as JSON
+
+    Bytes results larger than the threshold are compressed, with zstd if the
+    zstandard package is installed and otherwise with gzip, and are decompressed
+    when they are decoded
+
+    Attributes:
+        compression (str): The compression, one of zstd, gzip or none
+            (default: settings.result_compression)
+        threshold (int): The size above which results are compressed, in bytes
+            (default: settings.result_compression_threshold)
+        level (int): The compression level (default: settings.result_compression_level)
+    """
+
+    def __init__(
+        self,
+        compression: str | None = None,
+        threshold: int | None = None,
+        level: int | None = None,
+    ):
+        self.json_encoder = JSONEncoder()
+        self.compression = (compression or settings.result_compression).lower()
+        self.threshold = (
+            settings.result_compression_threshold if threshold is None else threshold
+        )
+        self.level = settings.result_compression_level if level is None else level
+        self._zstd = None
+        if importlib.util.find_spec("zstandard") is not None:
+            self._zstd = importlib.import_module("zstandard")
+        elif self.compression == "zstd":
+            self.compression = "gzip"
+
+    def encode(self, data: MessageData) -> bytes:
+        """Encode a result
+
+        Args:
+            data (MessageData): The result
+
+        Returns:
+            bytes: The encoded result
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            return self.json_encoder.encode(data)
+        data = bytes(data)
+        if self.compression == "none" or len(data) <= self.threshold:
+            return RAW_BYTES + data
+        if self.compression == "zstd" and self._zstd is not None:
+            compressor = self._zstd.ZstdCompressor(level=self.level)
+            return ZSTD_BYTES + compressor.compress(data)
+        return GZIP_BYTES + gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def decode(self, data: bytes) -> MessageData:
+        """Decode a result
+
+        Args:
+            data (bytes): The encoded result
+
+        Returns:
+            MessageData: The result
+        """
+        prefix = data[:1]
+        if prefix == RAW_BYTES:
+            return cast(MessageData, data[1:])
+        if prefix == GZIP_BYTES:
+            return cast(MessageData, gzip.decompress(data[1:]))
+        if prefix == ZSTD_BYTES:
+            if self._zstd is None:
+                raise ValueError(
+                    "Result is compressed with zstd, which is not installed"
+                )
+            decompressor = self._zstd.ZstdDecompressor().decompressobj()
+            return cast(MessageData, decompressor.decompress(data[1:]))
+        return self.json_encoder.decode(data)
@@ -0,0 +1,188 @@
+"""
+Spooling of large query responses to disk
+
+A response is buffered in memory while it is received, and moved to a spool file on
+local disk once it grows beyond settings.spool_threshold. A spooled response is
+then handed around as a small descriptor ({"spool": path, "size": size}), which is
+also what the dramatiq workers store in the result backend, and it is read through
+a memory-mapped view of the file. Query backends return either the bytes of a
+response or the descriptor of its spool file, so a dict response is a descriptor.
+
+The spool directory must be shared by the workers and the validator when using the
+DRAMATIQ backend. On the event loop, AsyncSpoolWriter writes to the spool file in a
+thread so that disk I/O does not block other queries.
+"""
+import os
+import mmap
+import asyncio
+import tempfile
+from typing import IO
+from tapvalidator.settings import settings
+
+__all__ = ["SpoolWriter", "AsyncSpoolWriter", "ResultSpool"]
+
+# The amount of data handed to a thread at once when writing a spool file
+SPOOL_WRITE_SIZE = 1024 * 1024
+
+
+class SpoolWriter:
+    """Collects the chunks of a response, spooling it to disk if it is large
+
+    Attributes:
+        threshold (int): The size above which the response is spooled, in bytes,
+            0 to never spool (default: settings.spool_threshold)
+        directory (str): The directory of the spool files
+            (default: settings.spool_directory)
+    """
+
+    def __init__(self, threshold: int | None = None, directory: str | None = None):
+        self.threshold = settings.spool_threshold if threshold is None else threshold
+        self.directory = os.path.expanduser(directory or settings.spool_directory)
+        self.size = 0
+        self._chunks: list[bytes] = []
+        self._file: IO[bytes] | None = None
+
+    def spools(self, size: int) -> bool:
+        """Check whether writing more data would go to the spool file
+
+        Args:
+            size (int): The size of the data, in bytes
+
+        Returns:
+            bool: Whether the data would be written to disk
+        """
+        return self._file is not None or bool(
+            self.threshold and self.size + size > self.threshold
+        )
+
+    def write(self, chunk: bytes):
+        """Add a chunk of the response
+
+        Args:
+            chunk (bytes): The chunk
+        """
+        self.size += len(chunk)
+        if self._file is None and self.threshold and self.size > self.threshold:
+            os.makedirs(self.directory, exist_ok=True)
+            spool_file = tempfile.NamedTemporaryFile(
+                mode="wb", dir=self.directory, suffix=".vot", delete=False
+            )
+            spool_file.writelines(self._chunks)
+            self._chunks = []
+            self._file = spool_file
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._chunks.append(chunk)
+
+    def close(self) -> bytes | dict:
+        """Finish writing the response
+
+        Returns:
+            bytes | dict: The response as bytes, or the descriptor of its spool
+                file if it was spooled
+        """
+        if self._file is None:
+            return b"".join(self._chunks)
+        self._file.close()
+        return {"spool": self._file.name, "size": self.size}
+
+    def discard(self):
+        """Discard the response, removing its spool file if there is one"""
+        self._chunks = []
+        if self._file is not None:
+            self._file.close()
+            ResultSpool.remove(self._file.name)
+
+
+class AsyncSpoolWriter:
+    """Collects the chunks of a response on the event loop, writing to the spool
+    file in a thread
+
+    Chunks kept in memory are added at once, while chunks going to disk are
+    batched up to SPOOL_WRITE_SIZE before being written
+
+    Attributes:
+        writer (SpoolWriter): The underlying writer
+    """
+
+    def __init__(self, writer: SpoolWriter | None = None):
+        self.writer = writer or SpoolWriter()
+        self._pending: list[bytes] = []
+        self._pending_size = 0
+
+    def _write_all(self, chunks: list[bytes]):
+        """Write chunks to the underlying writer"""
+        for chunk in chunks:
+            self.writer.write(chunk)
+
+    async def _flush(self):
+        """Write the pending chunks in a thread"""
+        if self._pending:
+            pending, self._pending, self._pending_size = self._pending, [], 0
+            await asyncio.to_thread(self._write_all, pending)
+
+    async def write(self, chunk: bytes):
+        """Add a chunk of the response
+
+        Args:
+            chunk (bytes): The chunk
+        """
+        if not self._pending and not self.writer.spools(len(chunk)):
+            self.writer.write(chunk)
+            return
+        self._pending.append(chunk)
+        self._pending_size += len(chunk)
+        if self._pending_size >= SPOOL_WRITE_SIZE:
+            await self._flush()
+
+    async def close(self) -> bytes | dict:
+        """Finish writing the response
+
+        Returns:
+            bytes | dict: The response as bytes, or the descriptor of its spool
+                file if it was spooled
+        """
+        await self._flush()
+        return await asyncio.to_thread(self.writer.close)
+
+    async def discard(self):
+        """Discard the response, removing its spool file if there is one"""
+        self._pending, self._pending_size = [], 0
+        await asyncio.to_thread(self.writer.discard)
+
+
+class ResultSpool:
+    """Access to spooled responses"""
+
+    @staticmethod
+    def open(path: str) -> mmap.mmap | bytes:
+        """Get a read-only memory-mapped view of a spool file
+
+        Args:
+            path (str): The path of the spool file
+
+        Returns:
+            mmap.mmap | bytes: The view of the file, or empty bytes if the file is
+                empty (which cannot be memory-mapped)
+        """
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            # The mapping stays valid once the file is closed
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def remove(path: str, view: mmap.mmap | bytes | None = None):
+        """Release a spooled response, closing its view and removing its file
+
+        Args:
+            path (str): The path of the spool file
+            view (mmap.mmap | bytes): The memory-mapped view of the file, if open
+        """
+        if isinstance(view, mmap.mmap):
+            view.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
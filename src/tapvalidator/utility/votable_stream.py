@@ -0,0 +1,214 @@
+"""
+Incremental reading of TABLEDATA VOTables
+
+The rows of a VOTable are read with a pull parser, so a response can be
+processed in chunks of rows while it is being read, without building the whole
+document (or an astropy table) in memory.
+"""
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+import mmap
+from xml.etree import ElementTree
+import numpy as np
+
+__all__ = ["VOTableField", "VOTableRowReader"]
+
+INTEGER_TYPES = {"unsignedByte", "short", "int", "long"}
+SERIALIZATIONS = {"TABLEDATA", "BINARY", "BINARY2", "FITS"}
+FLOAT_TYPES = {"float", "double"}
+
+
+@dataclass
+class VOTableField:
+    """A FIELD of a VOTable
+
+    Attributes:
+        name (str): The name of the field
+        datatype (str): The VOTable datatype
+        arraysize (str): The arraysize, empty for scalar fields
+    """
+
+    name: str
+    datatype: str
+    arraysize: str = ""
+
+    @property
+    def dtype(self):
+        """Get the numpy dtype the values of this field are converted to"""
+        if not self.arraysize and self.datatype in INTEGER_TYPES:
+            return np.int64
+        if not self.arraysize and self.datatype in FLOAT_TYPES:
+            return np.float64
+        return object
+
+
+def _local_name(tag: str) -> str:
+    """Get the name of an XML tag without its namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read_blocks(source: bytes | mmap.mmap | BinaryIO, read_size: int) -> Iterator:
+    """Read the data of a VOTable in blocks
+
+    Args:
+        source (bytes | mmap.mmap | BinaryIO): The VOTable as bytes, a memory-mapped
+            view or a binary file
+        read_size (int): The number of bytes of each block
+
+    Returns:
+        Iterator[bytes]: The blocks of data
+    """
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        for start in range(0, len(source), read_size):
+            end = start + read_size
+            yield source[start:end]
+        return
+    while data := source.read(read_size):
+        yield data
+
+
+class VOTableRowReader:
+    """Incremental reader of the rows of a TABLEDATA VOTable
+
+    Data is fed to the reader as it is received, and the rows completed by each
+    chunk of data are returned as tuples of the cell texts (None for empty cells)
+
+    Attributes:
+        fields (list[VOTableField]): The fields of the first table
+        query_status (list[str]): The values of the QUERY_STATUS INFO elements
+        serialization (str): The serialization of the data of the first table
+            (TABLEDATA, BINARY, BINARY2 or FITS), empty until its data is read
+    """
+
+    def __init__(self):
+        self.fields: list[VOTableField] = []
+        self.query_status: list[str] = []
+        self.serialization = ""
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._tabledata: ElementTree.Element | None = None
+        self._tables = 0
+
+    def feed(self, data: bytes) -> list[tuple]:
+        """Feed data to the reader
+
+        Args:
+            data (bytes): The next chunk of the VOTable
+
+        Returns:
+            list[tuple]: The rows completed by this chunk
+        """
+        self._parser.feed(data)
+        return self._read_events()
+
+    def close(self) -> list[tuple]:
+        """Signal the end of the data
+
+        Returns:
+            list[tuple]: The remaining rows
+        """
+        self._parser.close()
+        return self._read_events()
+
+    def _read_events(self) -> list[tuple]:
+        """Process the parser events, collecting the rows of the first table
+
+        Returns:
+            list[tuple]: The completed rows
+        """
+        rows = []
+        for event, element in self._parser.read_events():
+            name = _local_name(element.tag)
+            if event == "start":
+                if name == "TABLE":
+                    self._tables += 1
+                elif name in SERIALIZATIONS and self._tables == 1:
+                    self.serialization = name
+                    if name == "TABLEDATA":
+                        self._tabledata = element
+                continue
+            if name == "INFO" and element.get("name") == "QUERY_STATUS":
+                self.query_status.append(element.get("value", "").upper())
+            if self._tables != 1:
+                continue
+            if name == "FIELD":
+                self.fields.append(
+                    VOTableField(
+                        name=element.get("name", ""),
+                        datatype=element.get("datatype", ""),
+                        arraysize=element.get("arraysize", ""),
+                    )
+                )
+            elif name == "TR":
+                rows.append(tuple(cell.text for cell in element))
+        # Drop the rows that were read, so memory does not grow with the table
+        if self._tabledata is not None:
+            self._tabledata.clear()
+        return rows
+
+    @property
+    def is_tabledata(self) -> bool:
+        """Whether the rows of the first table can be read, which is only the case
+        for TABLEDATA (or a table without data)"""
+        return self.serialization in ("", "TABLEDATA")
+
+    def to_columns(self, rows: list[tuple]) -> dict[str, np.ndarray]:
+        """Convert rows read from the VOTable to typed columns
+
+        Numeric scalar fields are converted to numpy masked arrays, with empty
+        cells masked, and any other field is kept as text
+
+        Args:
+            rows (list[tuple]): The rows
+
+        Returns:
+            dict[str, np.ndarray]: Mapping of field name to its column
+        """
+        columns = {}
+        for index, field in enumerate(self.fields):
+            values = [row[index] if index < len(row) else None for row in rows]
+            if field.dtype is object:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+                columns[field.name] = column
+                continue
+            mask = np.array([not value for value in values], dtype=bool)
+            filled = ["0" if not value else value.strip() for value in values]
+            try:
+                data = np.array(filled, dtype=field.dtype)
+            except ValueError:
+                data = np.empty(len(values), dtype=object)
+                data[:] = values
+            columns[field.name] = np.ma.array(data, mask=mask)
+        return columns
+
+    @staticmethod
+    def iter_chunks(
+        source: bytes | mmap.mmap | BinaryIO,
+        chunk_size: int,
+        read_size: int = 1 << 16,
+    ) -> Iterator[tuple["VOTableRowReader", list[tuple]]]:
+        """Read the rows of a VOTable in chunks
+
+        Args:
+            source (bytes | mmap.mmap | BinaryIO): The VOTable as bytes, a
+                memory-mapped view or a binary file
+            chunk_size (int): The number of rows in each chunk
+            read_size (int): The number of bytes read from the source at a time
+
+        Returns:
+            Iterator: Yields the reader (giving access to the fields) and a chunk
+                of at most chunk_size rows. The last chunk is always yielded once
+                the whole VOTable has been read, even if it is empty
+        """
+        reader = VOTableRowReader()
+        pending: list[tuple] = []
+        for data in _read_blocks(source, read_size):
+            pending.extend(reader.feed(data))
+            while len(pending) > chunk_size:
+                yield reader, pending[:chunk_size]
+                pending = pending[chunk_size:]
+        pending.extend(reader.close())
+        while len(pending) > chunk_size:
+            yield reader, pending[:chunk_size]
+            pending = pending[chunk_size:]
+        yield reader, pending
@@ -1,14 +1,21 @@
+import re
+import mmap
 from xml.etree import ElementTree
 
 __all__ = ["XMLParser"]
 
+QUERY_STATUS_INFO = re.compile(
+    rb"<INFO\b[^>]*\bname\s*=\s*[\"']QUERY_STATUS[\"'][^>]*>"
+)
+INFO_VALUE = re.compile(rb"\bvalue\s*=\s*[\"']([^\"']*)[\"']")
+
 
 class XMLParser:
     @staticmethod
-    def get_votable_error(xml_string: str) -> str | None:
+    def get_votable_error(xml_string: str | bytes) -> str | None:
         """Get the error message from a failed query VOTable result
         Args:
-            xml_string (str): The XML as a string
+            xml_string (str | bytes): The XML as a string or bytes
 
         Returns:
             str: The error message
@@ -27,6 +34,28 @@ class XMLParser:
         else:
             return None
 
+    @staticmethod
+    def scan_query_status(xml_string: str | bytes | mmap.mmap) -> list[str]:
+        """Get the values of the QUERY_STATUS INFO elements of a VOTable, by
+        scanning the text without parsing the document
+
+        Args:
+            xml_string (str | bytes | mmap.mmap): The XML as a string, bytes or a
+                memory-mapped view
+
+        Returns:
+            list[str]: The QUERY_STATUS values (i.e. OK, ERROR, OVERFLOW), in the
+                order they appear
+        """
+        if isinstance(xml_string, str):
+            xml_string = xml_string.encode("utf-8")
+        values = []
+        for info in QUERY_STATUS_INFO.finditer(xml_string):
+            value = INFO_VALUE.search(info.group(0))
+            if value:
+                values.append(value.group(1).decode("utf-8", errors="replace").upper())
+        return values
+
     @staticmethod
     def check_element_exists(xml_string: str, element: str, ns: str = "") -> bool:
         """Check if a tables
@@ -1,3 +1,4 @@
+import time
 import asyncio
 from typing import List
 
@@ -5,11 +6,17 @@ from tapvalidator.models.tap_service import TAPService
 from tapvalidator.models.status import Status
 from tapvalidator.models.query import Query
 from tapvalidator.models.result import TableValidationResult
+from tapvalidator.models.budget import ValidationBudget
+from tapvalidator.models.column_index import ColumnIndex
+from tapvalidator.models.table_state import TableState
 from tapvalidator.services.tap_query_generator import QueryGenerator
 from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.services.metadata_cache import metadata_cache
+from tapvalidator.services.table_state import table_state
 from tapvalidator.logger.logger import logger
 from tapvalidator.comparators.columns import ColumnComparator
 from tapvalidator.settings import settings
+from tapvalidator.utility.pipeline import Pipeline
 from tapvalidator.validators.protocol import Validator
 
 
@@ -19,10 +26,22 @@ class TableValidator(Validator):
     Implements validation methods to validate the Tables of a TAP Service
     """
 
-    def __init__(self, tap_service: TAPService, fullscan: bool = False):
+    def __init__(
+        self,
+        tap_service: TAPService,
+        fullscan: bool = False,
+        check_columns: bool = False,
+        incremental: bool = False,
+        budget: ValidationBudget | None = None,
+    ):
         self.tap_service = tap_service
         self.fullscan = fullscan
-        self.semaphore = asyncio.Semaphore(settings.max_parallel_tasks)
+        self.check_columns = check_columns
+        self.incremental = incremental
+        self.budget = budget or ValidationBudget()
+        self.column_index = ColumnIndex()
+        self._column_loads: dict[str, asyncio.Task] = {}
+        self._failed_schemas: set[str] = set()
 
     @staticmethod
     async def handle_errors(query: Query, validation_result: TableValidationResult):
@@ -58,59 +77,188 @@ class TableValidator(Validator):
             if validation_result.status is Status.PENDING:
                 validation_result.status = Status.SUCCESS
 
+    async def get_expected_columns(self, q: Query) -> dict[str, str] | None:
+        """Get the columns of the table of a query, as listed in TAP_SCHEMA
+        The columns of all tables of a schema are loaded into the column index with
+        a single query, the first time a table of that schema is checked. If the
+        load fails, the next table of the schema tries again
+
+        Args:
+            q (Query): The Query whose table we want the columns for
+
+        Returns:
+            dict[str, str] | None: Mapping of column name to datatype, or None if
+                the columns of the schema could not be loaded
+        """
+        if q.schema_name in self.column_index.schemas:
+            return self.column_index.get(q.schema_name, q.table_name) or {}
+        if q.schema_name not in self._column_loads:
+            self._column_loads[q.schema_name] = asyncio.create_task(
+                QueryGenerator.load_schema_columns(
+                    schema_name=q.schema_name,
+                    tap_service=self.tap_service,
+                    column_index=self.column_index,
+                )
+            )
+        load = self._column_loads[q.schema_name]
+        if not await load:
+            self._failed_schemas.add(q.schema_name)
+            if self._column_loads.get(q.schema_name) is load:
+                del self._column_loads[q.schema_name]
+            return None
+        self._failed_schemas.discard(q.schema_name)
+        return self.column_index.get(q.schema_name, q.table_name) or {}
+
     async def validate_columns(self, q: Query):
         """Validates that the columns of a query are correct
+        The columns are not validated if they could not be loaded from TAP_SCHEMA
+
         Args:
             q (Query): The Query to validate
         """
-        expected_columns_query = QueryGenerator.get_columns_query(
-            tap_service=self.tap_service,
-            table_name=q.table_name,
-            schema_name=q.schema_name,
-        )
-        query_task = await QueryRunner.send_query(expected_columns_query)
-        await QueryRunner.get_result(query_task)
+        expected = await self.get_expected_columns(q)
+        if expected is None:
+            logger.warning(
+                f"Columns of [{q.table_name}] not validated, as TAP_SCHEMA could not "
+                "be queried",
+                schema=q.schema_name,
+            )
+            return
 
         column_validation_success = ColumnComparator.compare(
             actual=q.result,
-            expected=expected_columns_query.result,
+            expected=expected,
         )
 
         if not column_validation_success:
             q.update_status(Status.COLUMN_VALIDATION_FAIL)
 
-    # Define a function to send tasks in parallel
     @staticmethod
     async def send_queries_parallel(queries: List[Query]):
         """Send a list of queries in Parallel
+        The number of queries in flight to each TAP Service is bounded by its
+        admission control
 
         Args:
             queries (List[Query]): The list of queries
         """
-
-        semaphore = asyncio.Semaphore(settings.max_parallel_tasks)
-
-        async def send_query_with_semaphore(query):
-            async with semaphore:
-                return await QueryRunner.send_query(query)
-
-        tasks = [send_query_with_semaphore(query) for query in queries]
-        results = await asyncio.gather(*tasks)
-        [await QueryRunner.get_result(task) for task in results]
+        await asyncio.gather(*[QueryRunner.run_query(query) for query in queries])
 
     async def validate(self) -> TableValidationResult:
         """Validate the Tables of a TAP Service
 
+        The generated queries are streamed to a pool of settings.max_parallel_tasks
+        workers, and each result is handled as soon as its query completes. If
+        check_columns is set, the columns of each table are also validated against
+        TAP_SCHEMA
+
+        The outcome of each table is recorded in the table state store, which
+        incremental validations use to pick the tables they check. Incremental
+        validations load the columns of the tables from TAP_SCHEMA whether or not
+        check_columns is set, so that changed tables can be detected. If the budget
+        is limited, the tables are checked in order of priority, at most
+        max_queries are queried, and the queries still running at the deadline are
+        cancelled. The result then records how many of the tables were checked
+
         Returns:
             ValidationResult: The Validation Result object
         """
 
         validation_result = TableValidationResult(status=Status.SUCCESS)
-        query_gen = QueryGenerator.generate_queries(self.tap_service, self.fullscan)
-        queries = [query async for query in query_gen]
+        metadata = None
+
+        async def _validate_query(query: Query):
+            """Run a query and handle its result
 
-        await self.send_queries_parallel(queries)
-        for query in queries:
+            Args:
+                query (Query): The query to validate
+            """
+            start_time = time.monotonic()
+            await QueryRunner.run_query(query)
+            latency = time.monotonic() - start_time
+            if self.check_columns and query.status is Status.SUCCESS:
+                await self.validate_columns(query)
             await self.handle_errors(query=query, validation_result=validation_result)
+            validation_result.checked += 1
+            table_state.record(
+                self.tap_service,
+                query.schema_name,
+                query.table_name,
+                TableState(
+                    checked_at=time.time(),
+                    status=query.status,
+                    latency=latency,
+                    columns=TableState.signature(
+                        self.column_index.get(query.schema_name, query.table_name)
+                    ),
+                ),
+            )
+
+        deadline = asyncio.timeout(self.budget.deadline or None)
+        try:
+            async with deadline:
+                metadata = await QueryGenerator.get_metadata(self.tap_service)
+                self.column_index = metadata.column_index
+                if self.incremental:
+                    # The columns are only missing once TAP_SCHEMA has been
+                    # rediscovered, and are loaded first (even without
+                    # check_columns) so the sampler sees which tables have changed
+                    await asyncio.gather(
+                        *[
+                            QueryGenerator.load_schema_columns(
+                                schema_name=schema_name,
+                                tap_service=self.tap_service,
+                                column_index=self.column_index,
+                            )
+                            for schema_name in metadata.tables
+                            if schema_name not in self.column_index.schemas
+                        ]
+                    )
+                tables = QueryGenerator.select_tables(
+                    self.tap_service,
+                    metadata,
+                    self.fullscan,
+                    self.incremental,
+                    prioritise=self.budget.is_limited,
+                )
+                validation_result.tables = len(tables)
+                if self.budget.max_queries:
+                    tables = tables[: self.budget.max_queries]
+
+                await Pipeline.run(
+                    source=QueryGenerator.generate_queries(
+                        self.tap_service, self.fullscan, tables=tables
+                    ),
+                    worker=_validate_query,
+                    concurrency=settings.max_parallel_tasks,
+                )
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            logger.warning(
+                "The deadline of the table validation was reached",
+                tap_service=str(self.tap_service),
+                deadline=self.budget.deadline,
+            )
+            if metadata is None:
+                validation_result.status = Status.FAIL
+                validation_result.messages.append(
+                    "The deadline was reached before the tables were discovered"
+                )
+
+        if validation_result.checked < validation_result.tables:
+            coverage = (
+                f"Checked {validation_result.checked} of {validation_result.tables} "
+                f"tables ({validation_result.coverage:.0%}) within the budget"
+            )
+            logger.info(coverage, tap_service=str(self.tap_service))
+            validation_result.messages.append(coverage)
+        if metadata and (self.check_columns or self.incremental) and metadata.tables:
+            # Schemas whose columns could not be loaded are not cached, so the
+            # next run loads them again
+            for schema_name in self._failed_schemas:
+                metadata.column_index.discard(schema_name)
+            metadata_cache.put(self.tap_service, metadata)
+        table_state.save()
 
         return validation_result
@@ -1,8 +1,9 @@
-import requests
+import httpx
 from xml.etree.ElementTree import ParseError
 from tapvalidator.models.tap_service import TAPService
 from tapvalidator.models.result import VOSIValidationResult
 from tapvalidator.models.status import Status
+from tapvalidator.services.http_sessions import EndpointClient
 from tapvalidator.utility.xml_parser import XMLParser
 from tapvalidator.utility.string_processor import StringProcessor
 from tapvalidator.logger.logger import logger
@@ -28,13 +29,13 @@ class VOSIValidator(Validator):
 
         try:
             if self.tap_service.endpoints:
-                response = requests.get(self.tap_service.endpoints.tables)
+                response = await EndpointClient.get(self.tap_service.endpoints.tables)
                 if not XMLParser.check_element_exists(
                     StringProcessor.clean_text(response.text), "schema"
                 ):
                     raise ValueError("Schema element does not exist in XML file")
 
-        except (ParseError, ValueError) as exc:
+        except (ParseError, ValueError, httpx.HTTPError) as exc:
             logger.error(exc)
             validation_result.messages.append(
                 f"Unable to parse /tables endpoint. " f"Error was: {str(exc)}"
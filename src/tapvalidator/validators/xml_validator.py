@@ -1,8 +1,9 @@
-import requests
+import httpx
 from xml.etree.ElementTree import ParseError
 from tapvalidator.models.tap_service import TAPService
 from tapvalidator.models.result import ValidationResult
 from tapvalidator.models.status import Status
+from tapvalidator.services.http_sessions import EndpointClient
 from tapvalidator.utility.xml_parser import XMLParser
 from tapvalidator.utility.string_processor import StringProcessor
 from tapvalidator.logger.logger import logger
@@ -35,7 +36,9 @@ class XMLValidator(Validator):
 
         try:
             if self.tap_service.endpoints:
-                response = requests.get(self.tap_service.endpoints[self.endpoint_name])
+                response = await EndpointClient.get(
+                    self.tap_service.endpoints[self.endpoint_name]
+                )
                 xml_str = StringProcessor.clean_text(response.text)
                 for element in self.expected_elements:
                     if not XMLParser.check_element_exists(
@@ -45,7 +48,7 @@ class XMLValidator(Validator):
                             f"{element} element does not exist in XML " f"file"
                         )
 
-        except (ParseError, ValueError) as exc:
+        except (ParseError, ValueError, httpx.HTTPError) as exc:
             logger.error(exc)
             validation_result.messages.append(
                 f"Unable to parse /{self.endpoint_name} endpoint. "
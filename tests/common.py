@@ -1,8 +1,10 @@
 import os
 import platform
+from io import BytesIO
 from contextlib import contextmanager
 import pika  # type: ignore
 import pytest  # type: ignore
+from astropy.io.votable import parse  # type: ignore
 from dramatiq import Worker  # type: ignore
 from dramatiq.threading import is_gevent_active  # type: ignore
 
@@ -41,3 +43,42 @@ RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD", "guest")
 RABBITMQ_CREDENTIALS = pika.credentials.PlainCredentials(
     RABBITMQ_USERNAME, RABBITMQ_PASSWORD
 )
+
+
+def make_votable(fields: list[tuple[str, str]], rows: list[tuple]) -> str:
+    """Build a TABLEDATA VOTable response with the given fields and rows
+
+    Args:
+        fields (list[tuple[str, str]]): The (name, datatype) of each field
+        rows (list[tuple]): The rows of the table
+    """
+    arraysize = ' arraysize="*"'
+    field_elements = "".join(
+        f'<FIELD name="{name}" ID="{name}" datatype="{datatype}"'
+        f'{arraysize if datatype == "char" else ""}/>'
+        for name, datatype in fields
+    )
+    row_elements = "".join(
+        "<TR>" + "".join(f"<TD>{value}</TD>" for value in row) + "</TR>" for row in rows
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">'
+        '<RESOURCE type="results"><INFO name="QUERY_STATUS" value="OK"/>'
+        f"<TABLE>{field_elements}"
+        f"<DATA><TABLEDATA>{row_elements}</TABLEDATA></DATA>"
+        "</TABLE></RESOURCE></VOTABLE>"
+    )
+
+
+def make_binary2_votable(fields: list[tuple[str, str]], rows: list[tuple]) -> bytes:
+    """Build a BINARY2 VOTable response with the given fields and rows
+
+    Args:
+        fields (list[tuple[str, str]]): The (name, datatype) of each field
+        rows (list[tuple]): The rows of the table
+    """
+    votable = parse(BytesIO(make_votable(fields, rows).encode("utf-8")))
+    output = BytesIO()
+    votable.to_xml(output, tabledata_format="binary2")
+    return output.getvalue()
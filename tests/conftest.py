@@ -5,6 +5,7 @@ import subprocess
 import sys
 import pytest
 import redis
+import httpx
 import dramatiq  # type: ignore
 from dramatiq import Worker
 from dramatiq.brokers.rabbitmq import RabbitmqBroker  # type: ignore
@@ -12,6 +13,12 @@ from dramatiq.brokers.redis import RedisBroker  # type: ignore
 from dramatiq.brokers.stub import StubBroker  # type: ignore
 from dramatiq.rate_limits import backends as rl_backends  # type: ignore
 from dramatiq.results import backends as res_backends  # type: ignore
+from tapvalidator.services.format_negotiator import FormatNegotiator
+from tapvalidator.services.http_sessions import EndpointClient
+from tapvalidator.services.metadata_cache import metadata_cache
+from tapvalidator.services.query_backend import HTTPXBackend
+from tapvalidator.services.table_state import table_state
+from tapvalidator.services.tap_query import QueryRunner
 from .common import RABBITMQ_CREDENTIALS
 
 logfmt = "[%(asctime)s] [%(threadName)s] [%(name)s] [%(levelname)s] %(message)s"
@@ -177,3 +184,60 @@ def result_backends(redis_result_backend, stub_result_backend):
 @pytest.fixture(params=["redis", "stub"])
 def result_backend(request, result_backends):
     return result_backends[request.param]
+
+
+@pytest.fixture
+def tap_backend():
+    """Install an HTTPX query backend on the QueryRunner, whose responses are
+    produced by a function taking the query text"""
+    previous_backend = QueryRunner.backend
+
+    def install(respond):
+        queries = []
+
+        def handler(request: httpx.Request):
+            query_text = request.url.params.get("QUERY", "")
+            queries.append(query_text)
+            response = respond(query_text)
+            if isinstance(response, httpx.Response):
+                return response
+            return httpx.Response(200, text=response)
+
+        backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+        backend.queries = queries
+        QueryRunner.set_backend(backend)
+        return backend
+
+    yield install
+    QueryRunner.set_backend(previous_backend)
+
+
+@pytest.fixture(autouse=True)
+def isolated_metadata_cache(tmp_path, monkeypatch):
+    """Keep the metadata cache of each test in its own temporary file"""
+    monkeypatch.setattr(metadata_cache, "path", str(tmp_path / "metadata.json"))
+    monkeypatch.setattr(metadata_cache, "_entries", None)
+    return metadata_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_table_state(tmp_path, monkeypatch):
+    """Keep the table state of each test in its own temporary file"""
+    monkeypatch.setattr(table_state, "path", str(tmp_path / "tables.json"))
+    monkeypatch.setattr(table_state, "_entries", None)
+    return table_state
+
+
+@pytest.fixture(autouse=True)
+def isolated_endpoints(monkeypatch):
+    """Forget the negotiated result formats, and answer requests for the VOSI
+    endpoints with a 404 unless a test installs its own transport"""
+    FormatNegotiator.clear()
+    monkeypatch.setattr(EndpointClient, "_client", None)
+    monkeypatch.setattr(
+        EndpointClient,
+        "transport",
+        httpx.MockTransport(lambda request: httpx.Response(404)),
+    )
+    yield EndpointClient
+    FormatNegotiator.clear()
@@ -1,6 +1,9 @@
+import httpx
 import dramatiq  # type: ignore
 from dramatiq.results import Results  # type: ignore
 from dramatiq.results.backends import StubBackend  # type: ignore
+from tapvalidator.services.http_sessions import HTTPSessionPool
+from tapvalidator.utility.result_encoder import ResultEncoder
 
 
 def test_actors_can_be_defined(stub_broker):
@@ -30,3 +33,75 @@ def test_messages_can_get_results_from_inferred_backend(
     # And wait for a result
     # Then I should get that result back
     assert message.get_result(block=True) == 42
+
+
+def test_result_encoder_keeps_bytes():
+    # Given the encoder used for the query results
+    encoder = ResultEncoder()
+    response = b'<?xml version="1.0"?><VOTABLE>\xc3\xa9</VOTABLE>'
+
+    # Bytes results are stored as they are, and other results as JSON
+    assert encoder.decode(encoder.encode(response)) == response
+    assert encoder.encode(response)[1:] == response
+    assert encoder.decode(encoder.encode("error")) == "error"
+    assert encoder.decode(encoder.encode({"a": 1})) == {"a": 1}
+
+
+def test_result_encoder_compresses_large_results():
+    # Given an encoder compressing results larger than 100 bytes with gzip
+    encoder = ResultEncoder(compression="gzip", threshold=100)
+    response = b"<TR><TD>1</TD></TR>" * 100
+
+    # Large results are compressed, and decompressed when decoded
+    encoded = encoder.encode(response)
+    assert len(encoded) < len(response) // 10
+    assert encoder.decode(encoded) == response
+    assert encoder.encode(response[:50])[1:] == response[:50]
+
+    # And results are not compressed if compression is disabled
+    assert ResultEncoder(compression="none", threshold=100).encode(response)[1:] == (
+        response
+    )
+
+
+def test_run_sync_query_task_reuses_host_session(monkeypatch):
+    from tapvalidator import tasks
+
+    # Given a session pool whose transport records the requests
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, content=b"<VOTABLE/>")
+
+    sessions = HTTPSessionPool(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tasks, "sessions", sessions)
+
+    # When queries are run against the same host
+    url = "http://example.com/tap/sync"
+    first = tasks.run_sync_query_task.fn("SELECT 1", url)
+    second = tasks.run_sync_query_task.fn("SELECT 2", url, result_format="csv")
+
+    # Then they share the client of the host, and request compressed responses
+    assert first == second == b"<VOTABLE/>"
+    assert sessions.get(url) is sessions.get("http://example.com/other")
+    assert sessions.get(url) is not sessions.get("http://example.org/tap/sync")
+    assert requests[1].url.params["FORMAT"] == "csv"
+    assert "gzip" in requests[0].headers["Accept-Encoding"]
+    sessions.close()
+
+
+def test_run_sync_query_task_connection_error(monkeypatch):
+    from tapvalidator import tasks
+
+    # Given a TAP Service that cannot be reached
+    def handler(request: httpx.Request):
+        raise httpx.ConnectError("Connection refused", request=request)
+
+    sessions = HTTPSessionPool(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tasks, "sessions", sessions)
+
+    # The error is returned as the response
+    assert "Connection refused" in tasks.run_sync_query_task.fn(
+        "SELECT 1", "http://example.com/tap/sync"
+    )
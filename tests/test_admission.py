@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+
+from tapvalidator.models.query import Query
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.admission import AdmissionControl, AdmissionController
+from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.settings import settings
+from .common import make_votable
+
+
+class TestAdmissionController:
+    #  No more than the limit of queries are admitted at the same time
+    @pytest.mark.asyncio
+    async def test_limit_in_flight(self):
+        controller = AdmissionController(max_limit=3)
+        max_in_flight = 0
+
+        async def query():
+            nonlocal max_in_flight
+            async with controller.slot() as record:
+                max_in_flight = max(max_in_flight, controller.in_flight)
+                await asyncio.sleep(0.01)
+                record(True)
+
+        await asyncio.gather(*[query() for _ in range(10)])
+
+        assert max_in_flight == 3
+        assert controller.in_flight == 0
+
+    #  The limit is halved after a failure and raised again after successes
+    @pytest.mark.asyncio
+    async def test_adapt_limit(self, monkeypatch):
+        monkeypatch.setattr(settings, "admission_base_backoff", 0)
+        controller = AdmissionController(max_limit=8)
+
+        await controller.acquire()
+        await controller.release(success=False, latency=0.1)
+        assert controller.limit == 4
+
+        for _ in range(4):
+            await controller.acquire()
+            await controller.release(success=True, latency=0.1)
+        assert controller.limit == 5
+
+    #  Slow queries reduce the limit, but not below the minimum
+    @pytest.mark.asyncio
+    async def test_slow_queries(self, monkeypatch):
+        monkeypatch.setattr(settings, "admission_cooldown", 0)
+        controller = AdmissionController(max_limit=4, min_limit=2)
+
+        for _ in range(3):
+            await controller.acquire()
+            await controller.release(
+                success=True, latency=settings.admission_slow_query + 1
+            )
+        assert controller.limit == 2
+
+    #  Consecutive failures grow the back-off exponentially
+    @pytest.mark.asyncio
+    async def test_backoff(self, monkeypatch):
+        monkeypatch.setattr(settings, "admission_base_backoff", 1)
+        monkeypatch.setattr(settings, "admission_max_backoff", 3)
+        controller = AdmissionController(max_limit=4)
+
+        backoffs = []
+        for _ in range(3):
+            controller.in_flight += 1
+            await controller.release(success=False, latency=0.1)
+            backoffs.append(controller.backoff)
+
+        assert backoffs == [1, 2, 3]
+
+    #  A cancelled query releases its slot without reducing the limit
+    @pytest.mark.asyncio
+    async def test_cancelled_query(self):
+        controller = AdmissionController(max_limit=4)
+
+        async def query():
+            async with controller.slot():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(query())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert controller.in_flight == 0
+        assert controller.limit == 4
+        assert controller.backoff == 0
+
+
+class TestAdmissionControl:
+    #  Each TAP Service gets its own controller, using its configured limit
+    @pytest.mark.asyncio
+    async def test_for_service(self):
+        first = TAPService("http://example.com/first", max_parallel_queries=2)
+        second = TAPService("http://example.com/second")
+
+        assert AdmissionControl.for_service(first) is AdmissionControl.for_service(
+            first
+        )
+        assert AdmissionControl.for_service(first).max_limit == 2
+        assert (
+            AdmissionControl.for_service(second).max_limit
+            == settings.max_parallel_tasks
+        )
+
+    #  Queries run through the QueryRunner hold a slot until their result arrives
+    @pytest.mark.asyncio
+    async def test_run_query(self, tap_backend):
+        backend = tap_backend(lambda query_text: make_votable([("a", "int")], [(1,)]))
+        tap_service = TAPService("http://example.com/tap", max_parallel_queries=1)
+        queries = [Query("SELECT 1", tap_service=tap_service) for _ in range(3)]
+
+        await asyncio.gather(*[QueryRunner.run_query(query) for query in queries])
+        await backend.close()
+
+        assert AdmissionControl.for_service(tap_service).in_flight == 0
+        assert all(query.result.astropy_table.nrows == 1 for query in queries)
@@ -0,0 +1,176 @@
+import signal
+import asyncio
+from datetime import datetime
+import pytest
+
+from tapvalidator.models.result import ValidationResult
+from tapvalidator.models.scheduled_check import ScheduledCheck
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.models.validation_config import ValidationConfiguration
+from tapvalidator.services.daemon import Daemon, ScheduleLoader
+from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.tap_validator import TAPValidator
+from tapvalidator.utility.cron import CronSchedule
+
+
+class TestCronSchedule:
+    #  Steps match every n minutes
+    def test_step(self):
+        schedule = CronSchedule("*/15 * * * *")
+
+        assert schedule.next_after(datetime(2024, 5, 1, 10, 7, 30)) == datetime(
+            2024, 5, 1, 10, 15
+        )
+        assert schedule.next_after(datetime(2024, 5, 1, 10, 45)) == datetime(
+            2024, 5, 1, 11, 0
+        )
+
+    #  The day of week is counted from Sunday
+    def test_weekday(self):
+        schedule = CronSchedule("0 3 * * 1")
+
+        # 1 May 2024 is a Wednesday, the next Monday is the 6th
+        assert schedule.next_after(datetime(2024, 5, 1, 12, 0)) == datetime(
+            2024, 5, 6, 3, 0
+        )
+
+    #  Restricting both the day of month and of week matches either of them
+    def test_day_or_weekday(self):
+        schedule = CronSchedule("30 0 15 * 0")
+
+        assert schedule.next_after(datetime(2024, 5, 1)) == datetime(2024, 5, 5, 0, 30)
+        assert schedule.next_after(datetime(2024, 5, 13)) == datetime(
+            2024, 5, 15, 0, 30
+        )
+
+    #  Invalid expressions are rejected
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            CronSchedule("* * *")
+        with pytest.raises(ValueError):
+            CronSchedule("61 * * * *")
+        with pytest.raises(ValueError):
+            CronSchedule("0 0 31 2 *").next_after(datetime(2024, 1, 1))
+
+
+class TestScheduleLoader:
+    #  Each section of the schedule file is a check, defaults apply to all of them
+    def test_load(self, tmp_path):
+        path = tmp_path / "schedule.ini"
+        path.write_text(
+            "[DEFAULT]\n"
+            "jitter = 5\n"
+            "[tables]\n"
+            "url = http://example.com/tap/\n"
+            "interval = 300\n"
+            "[nightly]\n"
+            "url = http://example.com/tap\n"
+            "mode = validation\n"
+            "cron = 0 3 * * *\n"
+            "fullscan = true\n"
+        )
+
+        tables, nightly = ScheduleLoader.load(str(path))
+
+        assert tables.tap_service.url == "http://example.com/tap"
+        assert (tables.mode, tables.interval, tables.jitter) == (
+            "TABLE_VALIDATION",
+            300,
+            5,
+        )
+        assert (nightly.mode, nightly.cron, nightly.fullscan) == (
+            "VALIDATION",
+            "0 3 * * *",
+            True,
+        )
+
+    #  A check must have a schedule and a supported mode
+    def test_invalid_checks(self):
+        with pytest.raises(ValueError):
+            ScheduleLoader.from_text("[check]\nurl = http://example.com/tap\n")
+        with pytest.raises(ValueError):
+            ScheduleLoader.from_text(
+                "[check]\nurl = http://example.com/tap\ninterval = 1\nmode = FLEET\n"
+            )
+
+    #  Interval checks run at once, and do not overlap a run that took too long
+    def test_next_run(self):
+        check = ScheduledCheck(
+            "check", TAPService(url="http://example.com/tap"), interval=60
+        )
+        start = datetime(2024, 5, 1, 12, 0)
+
+        assert check.next_run(None, start) == start
+        assert check.next_run(start, datetime(2024, 5, 1, 12, 0, 10)) == datetime(
+            2024, 5, 1, 12, 1
+        )
+        late = datetime(2024, 5, 1, 12, 2)
+        assert check.next_run(start, late) == late
+
+
+class TestDaemon:
+    #  Checks run repeatedly on their schedules, and a failing run does not stop them
+    @pytest.mark.asyncio
+    async def test_runs_checks(self):
+        services = [TAPService(url=f"http://example.com/tap{i}") for i in range(2)]
+        validated = []
+
+        class StubValidator:
+            async def validate_tables(
+                self, fullscan, check_columns, tap_service, **kwargs
+            ):
+                validated.append(tap_service.url)
+                if tap_service is services[1]:
+                    raise RuntimeError("Unavailable")
+                return ValidationResult(status=Status.SUCCESS)
+
+        daemon = Daemon(
+            StubValidator(),
+            [
+                ScheduledCheck(f"check{i}", service, interval=0.05)
+                for i, service in enumerate(services)
+            ],
+        )
+        run = asyncio.create_task(daemon.run())
+        await asyncio.sleep(0.18)
+        daemon.stop()
+        await asyncio.wait_for(run, timeout=1)
+
+        assert daemon.runs["check0"] >= 3
+        assert daemon.runs["check1"] >= 3
+        assert validated.count(services[0].url) == daemon.runs["check0"]
+
+    #  The query backend is kept open between runs, and closed when SIGTERM stops the
+    #  daemon
+    @pytest.mark.asyncio
+    async def test_backend_closed_on_stop(self, monkeypatch):
+        closed = []
+        runs = []
+
+        class StubBackend:
+            async def close(self):
+                closed.append(len(runs))
+
+        async def validate_tables(self, fullscan, check_columns, tap_service, **kwargs):
+            runs.append(tap_service)
+            if len(runs) == 2:
+                signal.raise_signal(signal.SIGTERM)
+            return ValidationResult(status=Status.SUCCESS)
+
+        monkeypatch.setattr(QueryRunner, "backend", StubBackend())
+        monkeypatch.setattr(TAPValidator, "validate_tables", validate_tables)
+        tap_validator = TAPValidator(
+            ValidationConfiguration(
+                first_service=TAPService(),
+                checks=[
+                    ScheduledCheck(
+                        "check", TAPService(url="http://example.com/tap"), interval=0.01
+                    )
+                ],
+            )
+        )
+
+        await asyncio.wait_for(tap_validator.run(mode="DAEMON"), timeout=1)
+
+        assert closed == [2]
@@ -0,0 +1,78 @@
+from tapvalidator.utility.fingerprint import Fingerprinter
+from .common import make_binary2_votable, make_votable
+
+FIELDS = [("id", "long"), ("name", "char"), ("ra", "double")]
+ROWS = [(1, "a", 10.5), (2, "b", "NaN"), (3, "c", "")]
+
+
+def fingerprint(rows, ordered=False, chunk_size=50, fields=FIELDS):
+    data = make_votable(fields, rows).encode("utf-8")
+    fingerprinter = Fingerprinter(ordered=ordered)
+    for start in range(0, len(data), chunk_size):
+        end = start + chunk_size
+        fingerprinter.feed(data[start:end])
+    return fingerprinter.close()
+
+
+class TestFingerprinter:
+    #  The fingerprint does not depend on how the response is split up
+    def test_same_result(self):
+        fingerprint1 = fingerprint(ROWS, chunk_size=7)
+        fingerprint2 = fingerprint(ROWS, chunk_size=1000)
+
+        assert fingerprint1.valid
+        assert fingerprint1.nrows == 3
+        assert fingerprint1.fields == [
+            ("id", "long"),
+            ("name", "char"),
+            ("ra", "double"),
+        ]
+        assert fingerprint1.matches(fingerprint2)
+
+    #  By default the order of the rows does not matter
+    def test_unordered(self):
+        assert fingerprint(ROWS).matches(fingerprint(ROWS[::-1]))
+
+    #  An ordered fingerprint depends on the order of the rows
+    def test_ordered(self):
+        fingerprint1 = fingerprint(ROWS, ordered=True)
+
+        assert fingerprint1.matches(fingerprint(ROWS, ordered=True))
+        assert not fingerprint1.matches(fingerprint(ROWS[::-1], ordered=True))
+
+    #  Different values give different fingerprints
+    def test_different_value(self):
+        rows = ROWS[:2] + [(3, "c", 1.0)]
+
+        assert not fingerprint(ROWS).matches(fingerprint(rows))
+
+    #  Values swapped between rows give different fingerprints
+    def test_swapped_values(self):
+        rows = [(1, "b", 10.5), (2, "a", "NaN"), (3, "c", "")]
+
+        assert not fingerprint(ROWS).matches(fingerprint(rows))
+
+    #  Numbers are fingerprinted by value rather than by their text
+    def test_numeric_text(self):
+        fingerprint1 = fingerprint([(1, "a", "10.5")])
+        fingerprint2 = fingerprint([(1, "a", "1.05E1")])
+
+        assert fingerprint1.matches(fingerprint2)
+
+    #  A response which is not a VOTable has an invalid fingerprint
+    def test_invalid(self):
+        fingerprinter = Fingerprinter()
+        fingerprinter.feed(b"Connection refused")
+        result = fingerprinter.close()
+
+        assert not result.valid
+        assert not result.matches(result)
+
+    #  A BINARY2 response cannot be read while it is received, so it is invalid
+    def test_binary2(self):
+        fingerprinter = Fingerprinter()
+        fingerprinter.feed(make_binary2_votable(FIELDS, ROWS))
+        result = fingerprinter.close()
+
+        assert result.fields
+        assert not result.valid
@@ -0,0 +1,117 @@
+import json
+import time
+import asyncio
+import pytest
+
+from tapvalidator.models.fleet_report import FleetReport, ServiceReport
+from tapvalidator.models.result import ValidationResult
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.models.validation_config import ValidationConfiguration
+from tapvalidator.services.fleet import FleetLoader
+from tapvalidator.tap_validator import TAPValidator
+from .common import make_votable
+
+
+class TestFleetLoader:
+    #  A text file lists a URL and an optional name per line
+    def test_load_text(self, tmp_path):
+        path = tmp_path / "services.txt"
+        path.write_text(
+            "# Production services\n"
+            "http://example.com/tap/ Example TAP\n"
+            "\n"
+            "http://example.org/tap\n"
+            "http://example.com/tap\n"
+        )
+
+        services = FleetLoader.load(str(path))
+
+        assert [service.url for service in services] == [
+            "http://example.com/tap",
+            "http://example.org/tap",
+        ]
+        assert services[0].name == "Example TAP"
+
+    #  A JSON file lists URLs, or objects with their own query limit
+    def test_load_json(self, tmp_path):
+        path = tmp_path / "services.json"
+        path.write_text(
+            json.dumps(
+                [
+                    "http://example.org/tap",
+                    {"url": "http://example.com/tap", "max_parallel_queries": 2},
+                ]
+            )
+        )
+
+        services = FleetLoader.load(str(path))
+
+        assert [service.max_parallel_queries for service in services] == [0, 2]
+
+    #  A registry export is read from its access_url column
+    def test_load_registry_export(self, tmp_path):
+        path = tmp_path / "registry.xml"
+        path.write_text(
+            make_votable(
+                [("ivoid", "char"), ("access_url", "char")],
+                [("ivo://example/tap", "http://example.com/tap")],
+            )
+        )
+
+        services = FleetLoader.load(str(path))
+
+        assert [(service.url, service.name) for service in services] == [
+            ("http://example.com/tap", "ivo://example/tap")
+        ]
+
+
+class TestValidateFleet:
+    #  Services are validated concurrently, into a single consolidated report
+    @pytest.mark.asyncio
+    async def test_validate_fleet(self, tmp_path, monkeypatch):
+        services = [TAPService(f"http://tap{index}.example.com") for index in range(4)]
+        options = []
+
+        async def validate_tap_service(
+            self, fullscan, check_columns, tap_service, **kwargs
+        ):
+            options.append(kwargs)
+            await asyncio.sleep(0.1)
+            status = Status.FAIL if tap_service is services[1] else Status.SUCCESS
+            return {
+                "availability": ValidationResult(status=Status.SUCCESS),
+                "tables": ValidationResult(status=status, messages=["Query Failed"]),
+            }
+
+        monkeypatch.setattr(TAPValidator, "validate_tap_service", validate_tap_service)
+        tap_validator = TAPValidator(
+            ValidationConfiguration(first_service=TAPService(), services=services)
+        )
+        report_path = tmp_path / "fleet.json"
+
+        start_time = time.monotonic()
+        report = await tap_validator.validate_fleet(
+            report=str(report_path), incremental=True
+        )
+
+        assert time.monotonic() - start_time < 0.3
+        assert report.status is Status.FAIL
+        assert [service.url for service in report.failed] == [services[1].url]
+        assert report.summary.startswith("3 of 4 TAP Services passed")
+        assert all(option["incremental"] for option in options)
+        written = json.loads(report_path.read_text())
+        assert written["services"][1]["validations"]["tables"]["status"] == "FAIL"
+
+    #  A service passes only if all its validations succeed
+    def test_service_report(self):
+        report = ServiceReport.from_results(
+            TAPService("http://example.com/tap"),
+            {
+                "availability": ValidationResult(status=Status.SUCCESS),
+                "tables": ValidationResult(status=Status.TRUNCATED),
+            },
+        )
+
+        assert report.status is Status.TRUNCATED
+        assert FleetReport(services=[report]).status is Status.FAIL
@@ -0,0 +1,114 @@
+import asyncio
+import httpx
+import pytest
+
+from tapvalidator.models.query import Query
+from tapvalidator.models.result_format import ResultFormat
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.format_negotiator import FormatNegotiator
+from tapvalidator.services.http_sessions import EndpointClient
+from tapvalidator.services.query_backend import HTTPXBackend
+from tapvalidator.services.tap_query import QueryRunner
+from .common import make_binary2_votable
+
+CAPABILITIES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<vosi:capabilities xmlns:vosi="http://www.ivoa.net/xml/VOSICapabilities/v1.0"'
+    ' xmlns:tr="http://www.ivoa.net/xml/TAPRegExt/v1.0">'
+    "<capability><language><name>ADQL</name></language>"
+    "<outputFormat><mime>application/x-votable+xml</mime><alias>votable</alias>"
+    "</outputFormat>"
+    "<outputFormat><mime>application/x-votable+xml; serialization=BINARY2</mime>"
+    "<alias>votable/b2</alias></outputFormat>"
+    "<outputFormat><mime>text/csv;header=present</mime><alias>csv</alias>"
+    "</outputFormat>"
+    "</capability></vosi:capabilities>"
+)
+
+
+def install_capabilities(monkeypatch, requests: list):
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, text=CAPABILITIES)
+
+    monkeypatch.setattr(EndpointClient, "_client", None)
+    monkeypatch.setattr(EndpointClient, "transport", httpx.MockTransport(handler))
+
+
+class TestFormatNegotiator:
+    #  The known formats are read from the outputFormat elements
+    def test_get_output_formats(self):
+        output_formats = FormatNegotiator.get_output_formats(CAPABILITIES)
+
+        assert output_formats == {
+            ResultFormat.VOTABLE: "VOTABLE",
+            ResultFormat.BINARY2: "application/x-votable+xml; serialization=BINARY2",
+            ResultFormat.CSV: "text/csv;header=present",
+        }
+
+    #  The first advertised format is chosen, reading the capabilities only once
+    @pytest.mark.asyncio
+    async def test_negotiate(self, monkeypatch):
+        requests: list = []
+        install_capabilities(monkeypatch, requests)
+        tap_service = TAPService("http://example.com/tap")
+        preference = [ResultFormat.PARQUET, ResultFormat.CSV, ResultFormat.VOTABLE]
+        monkeypatch.setattr(
+            FormatNegotiator,
+            "is_readable",
+            staticmethod(lambda result_format: True),
+        )
+
+        negotiated = await asyncio.gather(
+            *(FormatNegotiator.negotiate(tap_service, preference) for _ in range(5))
+        )
+
+        assert set(negotiated) == {(ResultFormat.CSV, "text/csv;header=present")}
+        assert len(requests) == 1
+        assert requests[0].url.path == "/tap/capabilities"
+
+    #  VOTABLE is used if the capabilities cannot be read, or is preferred
+    @pytest.mark.asyncio
+    async def test_negotiate_votable(self, monkeypatch):
+        tap_service = TAPService("http://example.com/tap")
+
+        assert await FormatNegotiator.negotiate(
+            tap_service, [ResultFormat.BINARY2]
+        ) == (ResultFormat.VOTABLE, "VOTABLE")
+
+        requests: list = []
+        install_capabilities(monkeypatch, requests)
+        FormatNegotiator.clear()
+        assert await FormatNegotiator.negotiate(
+            tap_service, [ResultFormat.VOTABLE, ResultFormat.BINARY2]
+        ) == (ResultFormat.VOTABLE, "VOTABLE")
+        assert not requests
+
+    #  A query is sent with the negotiated format and its result parsed from it
+    @pytest.mark.asyncio
+    async def test_run_query(self, monkeypatch):
+        install_capabilities(monkeypatch, [])
+        requests: list = []
+
+        def handler(request: httpx.Request):
+            requests.append(request)
+            return httpx.Response(
+                200, content=make_binary2_votable([("a", "int")], [(1,)])
+            )
+
+        backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+        previous_backend = QueryRunner.backend
+        QueryRunner.set_backend(backend)
+        try:
+            query = Query("SELECT a FROM table", tap_service=TAPService("http://t/tap"))
+            result = await QueryRunner.run_query(query)
+        finally:
+            await backend.close()
+            QueryRunner.set_backend(previous_backend)
+
+        assert query.result_format is ResultFormat.BINARY2
+        assert result.result_format is ResultFormat.BINARY2
+        assert requests[0].url.params["FORMAT"].endswith("serialization=BINARY2")
+        assert result.status is Status.SUCCESS
+        assert result.astropy_table.array[0][0] == 1
@@ -0,0 +1,103 @@
+import time
+import pytest
+
+from tapvalidator.models.column_index import ColumnIndex
+from tapvalidator.models.tap_schema import TAPSchemaMetadata
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.metadata_cache import MetadataCache
+from tapvalidator.services.tap_query_generator import QueryGenerator
+from .common import make_votable
+
+TABLES = [("schema_a", "schema_a.table_1"), ("schema_b", "schema_b.table_1")]
+
+
+def responder(probe: dict):
+    def respond(query_text: str) -> str:
+        if query_text == "SELECT COUNT(*) FROM TAP_SCHEMA.columns":
+            return make_votable([("count", "long")], [(probe["count"],)])
+        return make_votable([("schema_name", "char"), ("table_name", "char")], TABLES)
+
+    return respond
+
+
+class TestMetadataCache:
+    #  Metadata written to the cache file can be read back
+    def test_persist(self, tmp_path):
+        tap_service = TAPService("http://example.com/tap")
+        column_index = ColumnIndex(schemas={"schema_a"})
+        column_index.add("schema_a", "schema_a.table_1", "a", "INTEGER")
+        metadata = TAPSchemaMetadata(
+            tables={"schema_a": ["schema_a.table_1"]},
+            column_index=column_index,
+            probe=1,
+            fetched_at=time.time(),
+            checked_at=time.time(),
+        )
+        MetadataCache(path=str(tmp_path / "cache.json")).put(tap_service, metadata)
+
+        cached = MetadataCache(path=str(tmp_path / "cache.json")).get(tap_service)
+
+        assert cached == metadata
+
+    #  Metadata older than the max age is not returned
+    def test_expired(self, tmp_path):
+        tap_service = TAPService("http://example.com/tap")
+        cache = MetadataCache(path=str(tmp_path / "cache.json"), max_age=10)
+        cache.put(tap_service, TAPSchemaMetadata(fetched_at=time.time() - 20))
+
+        assert cache.get(tap_service) is None
+
+
+class TestCachedDiscovery:
+    #  Fresh metadata is used without querying the service
+    @pytest.mark.asyncio
+    async def test_fresh_metadata(self, tap_backend):
+        backend = tap_backend(responder({"count": 5}))
+        tap_service = TAPService("http://example.com/tap")
+
+        first = await QueryGenerator.get_metadata(tap_service)
+        queries_sent = len(backend.queries)
+        second = await QueryGenerator.get_metadata(tap_service)
+        await backend.close()
+
+        assert second is first
+        assert queries_sent == 2
+        assert len(backend.queries) == 2
+
+    #  Stale metadata is reused if the probe shows TAP_SCHEMA has not changed
+    @pytest.mark.asyncio
+    async def test_unchanged_metadata(
+        self, tap_backend, isolated_metadata_cache, monkeypatch
+    ):
+        backend = tap_backend(responder({"count": 5}))
+        tap_service = TAPService("http://example.com/tap")
+
+        await QueryGenerator.get_metadata(tap_service)
+        monkeypatch.setattr(isolated_metadata_cache, "ttl", 0)
+        metadata = await QueryGenerator.get_metadata(tap_service)
+        await backend.close()
+
+        assert backend.queries[2:] == ["SELECT COUNT(*) FROM TAP_SCHEMA.columns"]
+        assert metadata.tables == {
+            "schema_a": ["schema_a.table_1"],
+            "schema_b": ["schema_b.table_1"],
+        }
+
+    #  Stale metadata is rediscovered if the probe shows TAP_SCHEMA has changed
+    @pytest.mark.asyncio
+    async def test_changed_metadata(
+        self, tap_backend, isolated_metadata_cache, monkeypatch
+    ):
+        probe = {"count": 5}
+        backend = tap_backend(responder(probe))
+        tap_service = TAPService("http://example.com/tap")
+
+        first = await QueryGenerator.get_metadata(tap_service)
+        monkeypatch.setattr(isolated_metadata_cache, "ttl", 0)
+        probe["count"] = 6
+        second = await QueryGenerator.get_metadata(tap_service)
+        await backend.close()
+
+        assert second is not first
+        assert second.probe == 6
+        assert len(backend.queries) == 5
@@ -1,5 +1,15 @@
 from tapvalidator.models.status import Status
-from tapvalidator.models.result import Result
+from tapvalidator.models.result import Result, VOTable
+from tapvalidator.models.result_format import ResultFormat
+from .common import make_binary2_votable, make_votable
+
+ERROR_VOTABLE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">'
+    '<RESOURCE type="results">'
+    '<INFO name="QUERY_STATUS" value="ERROR">Table does not exist</INFO>'
+    "</RESOURCE></VOTABLE>"
+)
 
 
 class TestResult:
@@ -51,3 +61,93 @@ class TestResult:
         for status in Status:
             result = Result(status=status)
             assert result.status == status
+
+
+class TestVOTable:
+    #  The table is only parsed when it is first accessed
+    def test_lazy_parsing(self):
+        votable = VOTable(data=make_votable([("a", "int")], [(1,), (2,)]))
+
+        assert votable.status is Status.SUCCESS
+        assert votable._parsed is False
+        assert votable.astropy_table.nrows == 2
+        assert votable._parsed is True
+
+    #  An ERROR query status fails the result, with the error as message
+    def test_error_status(self):
+        votable = VOTable(data=ERROR_VOTABLE)
+
+        assert votable.status is Status.FAIL
+        assert votable.messages == ["Table does not exist"]
+        assert votable.astropy_table is None
+
+    #  An OVERFLOW query status marks the result as truncated
+    def test_overflow_status(self):
+        data = make_votable([("a", "int")], [(1,)]).replace(
+            "</RESOURCE>", '<INFO name="QUERY_STATUS" value="OVERFLOW"/></RESOURCE>'
+        )
+        votable = VOTable(data=data)
+
+        assert votable.status is Status.TRUNCATED
+
+    #  A response which is not a VOTable fails the result
+    def test_not_a_votable(self):
+        votable = VOTable(data="Internal Server Error")
+
+        assert votable.status is Status.FAIL
+        assert len(votable.messages) == 1
+
+    #  An empty response has no table
+    def test_empty_data(self):
+        votable = VOTable(data="")
+
+        assert votable.status is Status.SUCCESS
+        assert votable.astropy_table is None
+
+    #  A response kept as bytes is parsed without decoding it
+    def test_bytes_data(self):
+        votable = VOTable(data=make_votable([("a", "char")], [("é",)]).encode("utf-8"))
+
+        assert votable.status is Status.SUCCESS
+        assert votable.astropy_table.array[0][0] == "é"
+        assert "é" in votable.text
+
+    #  A BINARY2 VOTable is parsed like a TABLEDATA one
+    def test_binary2_data(self):
+        data = make_binary2_votable([("a", "int"), ("b", "char")], [(1, "x"), (2, "")])
+        votable = VOTable(data=data, result_format=ResultFormat.BINARY2)
+
+        assert votable.status is Status.SUCCESS
+        assert votable.astropy_table.nrows == 2
+        assert votable.astropy_table.array[0][1] == "x"
+
+    #  A CSV result is read as a VOTable table, with the column types inferred
+    def test_csv_data(self):
+        votable = VOTable(data=b"a,b\n1,x\n2,\n", result_format=ResultFormat.CSV)
+
+        assert votable.status is Status.SUCCESS
+        assert votable.is_document is False
+        table = votable.astropy_table
+        assert len(table.array) == 2
+        assert [field.datatype for field in table.fields] == ["long", "unicodeChar"]
+        assert table.array.mask[1][1]
+
+    #  A Parquet result that is not a Parquet file fails
+    def test_parquet_not_parquet(self):
+        votable = VOTable(
+            data=b"[Errno 111] Connection refused", result_format=ResultFormat.PARQUET
+        )
+
+        assert votable.status is Status.FAIL
+        assert (
+            VOTable(data=b"PAR1\x15\x04", result_format=ResultFormat.PARQUET).status
+            is Status.SUCCESS
+        )
+
+    #  The error of a query requesting CSV is still read from the VOTable
+    def test_csv_error(self):
+        votable = VOTable(data=ERROR_VOTABLE, result_format=ResultFormat.CSV)
+
+        assert votable.is_document is True
+        assert votable.status is Status.FAIL
+        assert votable.messages == ["Table does not exist"]
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+from tapvalidator.utility.pipeline import Pipeline
+
+
+async def numbers(count: int):
+    for number in range(count):
+        yield number
+
+
+class TestPipeline:
+    #  Every item is processed, with no more than the given number of workers
+    @pytest.mark.asyncio
+    async def test_run(self):
+        processed = []
+        running = 0
+        max_running = 0
+
+        async def worker(item):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            processed.append(item)
+            running -= 1
+
+        await Pipeline.run(numbers(20), worker, concurrency=4)
+
+        assert sorted(processed) == list(range(20))
+        assert max_running == 4
+
+    #  An error in a worker is raised, and the other workers are stopped
+    @pytest.mark.asyncio
+    async def test_run_error(self):
+        async def worker(item):
+            if item == 3:
+                raise ValueError("Unable to process item")
+            await asyncio.sleep(0.01)
+
+        with pytest.raises(ValueError):
+            await Pipeline.run(numbers(20), worker, concurrency=2)
+
+    #  The results are returned in the order of the items
+    @pytest.mark.asyncio
+    async def test_map(self):
+        async def worker(item):
+            await asyncio.sleep(0.001 * (10 - item))
+            return item * 2
+
+        results = await Pipeline.map(range(10), worker, concurrency=4)
+
+        assert results == [item * 2 for item in range(10)]
+
+    #  Cancelling the pipeline waits for the workers to clean up
+    @pytest.mark.asyncio
+    async def test_run_cancelled(self):
+        cleaned_up = []
+
+        async def worker(item):
+            try:
+                await asyncio.sleep(10)
+            finally:
+                await asyncio.sleep(0.01)
+                cleaned_up.append(item)
+
+        with pytest.raises(TimeoutError):
+            async with asyncio.timeout(0.1):
+                await Pipeline.run(numbers(2), worker, concurrency=2)
+
+        assert sorted(cleaned_up) == [0, 1]
@@ -0,0 +1,312 @@
+import time
+import asyncio
+import httpx
+import pytest
+from dramatiq.message import Message  # type: ignore
+from dramatiq.results.errors import ResultMissing, ResultTimeout  # type: ignore
+
+from tapvalidator.models.query import Query
+from tapvalidator.models.result import VOTable
+from tapvalidator.models.result_format import ResultFormat
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.format_negotiator import FormatNegotiator
+from tapvalidator.services.query_backend import (
+    DramatiqBackend,
+    HTTPXBackend,
+    QueryBackendResolver,
+    UWSBackend,
+)
+from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.settings import settings
+
+VOTABLE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">'
+    '<RESOURCE type="results"><INFO name="QUERY_STATUS" value="OK"/>'
+    '<TABLE><FIELD name="a" datatype="int"/>'
+    "<DATA><TABLEDATA><TR><TD>1</TD></TR></TABLEDATA></DATA>"
+    "</TABLE></RESOURCE></VOTABLE>"
+)
+
+
+@pytest.fixture
+def httpx_backend():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, text=VOTABLE)
+
+    backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+    backend.requests = requests
+    previous_backend = QueryRunner.backend
+    QueryRunner.set_backend(backend)
+    yield backend
+    QueryRunner.set_backend(previous_backend)
+
+
+class TestQueryBackendResolver:
+    #  Known backend names are resolved to their implementation
+    def test_get_backend(self):
+        assert isinstance(QueryBackendResolver.get_backend("httpx"), HTTPXBackend)
+        assert isinstance(QueryBackendResolver.get_backend("DRAMATIQ"), DramatiqBackend)
+        assert isinstance(QueryBackendResolver.get_backend("UWS"), UWSBackend)
+
+    #  Unknown backend names fall back to the dramatiq backend
+    def test_get_unknown_backend(self):
+        assert isinstance(QueryBackendResolver.get_backend("unknown"), DramatiqBackend)
+
+
+class FakeMessage:
+    """Stands in for a dramatiq message, whose result is stored after a delay"""
+
+    def __init__(self, result: str, delay: float | None):
+        self.result = result
+        self.delay = delay
+        self.calls: list = []
+        self.sent_at = time.monotonic()
+
+    def get_result(self, block=False, timeout=None):
+        self.calls.append((block, timeout))
+        if not block:
+            if self.delay is None or time.monotonic() - self.sent_at < self.delay:
+                raise ResultMissing(self)
+            return self.result
+        if self.delay is None:
+            time.sleep(timeout / 1000)
+            raise ResultTimeout(self)
+        time.sleep(self.delay)
+        return self.result
+
+
+class TestDramatiqBackend:
+    #  A result is delivered as soon as it is stored, without polling
+    @pytest.mark.asyncio
+    async def test_fetch_result(self):
+        backend = DramatiqBackend()
+        message = FakeMessage(VOTABLE, delay=0.05)
+
+        start_time = time.monotonic()
+        response = await backend.fetch(message, block=True)
+        await backend.close()
+
+        assert response == VOTABLE
+        assert time.monotonic() - start_time < 1
+        assert len(message.calls) == 1
+        assert message.calls[0][0] is True
+
+    #  A blocking fetch raises TimeoutError if the result is not stored in time
+    @pytest.mark.asyncio
+    async def test_fetch_timeout(self, monkeypatch):
+        monkeypatch.setattr(
+            "tapvalidator.services.query_backend.settings.http_timeout", 0.2
+        )
+        monkeypatch.setattr(
+            "tapvalidator.services.query_backend.settings.result_wait_interval", 0.05
+        )
+        backend = DramatiqBackend()
+        message = FakeMessage(VOTABLE, delay=None)
+
+        with pytest.raises(TimeoutError):
+            await backend.fetch(message, block=True)
+        await backend.close()
+
+        # The result is waited for in bounded calls, of at least a second as the
+        # result backend would not block for less
+        assert message.calls == [(True, 1000)]
+
+    #  Results beyond the size of the thread pool are polled rather than queued
+    @pytest.mark.asyncio
+    async def test_fetch_beyond_pool(self, monkeypatch):
+        monkeypatch.setattr(settings, "max_parallel_tasks", 1)
+        monkeypatch.setattr(settings, "fleet_max_parallel_services", 1)
+        monkeypatch.setattr(
+            "tapvalidator.services.query_backend.RESULT_POLL_INTERVAL", 0.01
+        )
+        backend = DramatiqBackend()
+        messages = [FakeMessage(VOTABLE, delay=0.1) for _ in range(3)]
+
+        responses = await asyncio.gather(
+            *(backend.fetch(message, block=True) for message in messages)
+        )
+        await backend.close()
+
+        assert responses == [VOTABLE] * 3
+        assert backend.max_waiters == 2
+        assert [message.calls[0][0] for message in messages] == [True, True, False]
+
+    #  The result of a task is deleted from the result backend once fetched
+    @pytest.mark.asyncio
+    async def test_fetch_forgets_result(self, monkeypatch):
+        from tapvalidator import tasks
+
+        forgotten = []
+        monkeypatch.setattr(tasks, "forget_result", forgotten.append)
+        monkeypatch.setattr(Message, "get_result", lambda self, block, timeout: VOTABLE)
+        backend = DramatiqBackend()
+        message = Message("default", "run_sync_query_task", (), {}, {})
+
+        response = await backend.fetch(message, block=True)
+        await backend.close()
+
+        assert response == VOTABLE
+        assert forgotten == [message]
+
+
+class TestHTTPXBackend:
+    #  A query is run in-process and its result parsed into a VOTable
+    @pytest.mark.asyncio
+    async def test_run_query(self, httpx_backend):
+        tap_service = TAPService("http://example.com/tap")
+        query = Query("SELECT a FROM table", "schema", "table", tap_service)
+
+        query_task = await QueryRunner.send_query(query)
+        result = await QueryRunner.get_result(query_task)
+        await httpx_backend.close()
+
+        assert result.status is Status.SUCCESS
+        assert query.result is result
+        assert result.astropy_table.nrows == 1
+        request = httpx_backend.requests[0]
+        assert request.url.path == "/tap/sync"
+        assert request.url.params["QUERY"] == "SELECT a FROM table"
+        assert request.url.params["REQUEST"] == "doQuery"
+
+    #  The same client is shared between queries
+    @pytest.mark.asyncio
+    async def test_client_is_shared(self, httpx_backend):
+        assert httpx_backend.client is httpx_backend.client
+        await httpx_backend.close()
+
+    #  A connection error is returned as the response, failing the query
+    @pytest.mark.asyncio
+    async def test_connection_error(self):
+        def handler(request: httpx.Request):
+            raise httpx.ConnectError("Connection refused", request=request)
+
+        backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+        task = await backend.submit("SELECT 1", TAPService("http://example.com/tap"))
+        response = await backend.fetch(task)
+        await backend.close()
+
+        assert "Connection refused" in response
+
+    #  A connection error fails the query even if its result is requested as CSV,
+    #  which the error text would otherwise pass for
+    @pytest.mark.asyncio
+    async def test_connection_error_csv(self, monkeypatch):
+        def handler(request: httpx.Request):
+            raise httpx.ConnectError("[Errno 111] Connection refused", request=request)
+
+        async def negotiate(tap_service, preference=None):
+            return ResultFormat.CSV, "csv"
+
+        monkeypatch.setattr(FormatNegotiator, "negotiate", negotiate)
+        backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(QueryRunner, "backend", backend)
+        query = Query(
+            "SELECT TOP 1 * FROM t", "schema", "t", TAPService("http://example.com")
+        )
+
+        result = await QueryRunner.run_query(query)
+        await backend.close()
+
+        assert not isinstance(result, VOTable)
+        assert result.status is Status.FAIL
+        assert result.messages == ["[Errno 111] Connection refused"]
+
+
+class FakeUWSService:
+    """Stands in for the asynchronous endpoint of a TAP Service, whose jobs are
+    executing for a number of phase polls before they end"""
+
+    def __init__(self, polls: int, final_phase: str = "COMPLETED"):
+        self.polls = polls
+        self.final_phase = final_phase
+        self.requests: list = []
+
+    def handler(self, request: httpx.Request):
+        self.requests.append((request.method, request.url.path, request.content))
+        path = request.url.path
+        if request.method == "POST" and path == "/tap/async":
+            return httpx.Response(303, headers={"Location": "/tap/async/job1"})
+        if path == "/tap/async/job1/phase" and request.method == "GET":
+            self.polls -= 1
+            return httpx.Response(
+                200, text="EXECUTING" if self.polls >= 0 else self.final_phase
+            )
+        if path == "/tap/async/job1/results/result":
+            return httpx.Response(200, text=VOTABLE)
+        return httpx.Response(200, text="")
+
+
+class TestUWSBackend:
+    #  A job is created, polled until it completes, fetched and deleted
+    @pytest.mark.asyncio
+    async def test_run_job(self, monkeypatch):
+        monkeypatch.setattr(settings, "uws_poll_interval", 0.001)
+        service = FakeUWSService(polls=3)
+        backend = UWSBackend(transport=httpx.MockTransport(service.handler))
+
+        task = await backend.submit(
+            "SELECT a FROM table", TAPService("http://example.com/tap")
+        )
+        response = await backend.fetch(task, block=True)
+        await backend.close()
+
+        assert response == VOTABLE.encode("utf-8")
+        method, path, content = service.requests[0]
+        assert (method, path) == ("POST", "/tap/async")
+        assert b"PHASE=RUN" in content and b"QUERY=SELECT" in content
+        polls = [
+            request for request in service.requests if request[1].endswith("phase")
+        ]
+        assert len(polls) == 4
+        assert service.requests[-1][:2] == ("DELETE", "/tap/async/job1")
+
+    #  Cancelling the query aborts and deletes the job
+    @pytest.mark.asyncio
+    async def test_cancel_job(self, monkeypatch):
+        monkeypatch.setattr(settings, "uws_poll_interval", 0.001)
+        service = FakeUWSService(polls=1000)
+        backend = UWSBackend(transport=httpx.MockTransport(service.handler))
+
+        task = await backend.submit(
+            "SELECT a FROM table", TAPService("http://example.com/tap")
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await backend.close()
+
+        assert service.requests[-2:] == [
+            ("POST", "/tap/async/job1/phase", b"PHASE=ABORT"),
+            ("DELETE", "/tap/async/job1", b""),
+        ]
+
+    #  A failed request while polling aborts and deletes the job, failing the query
+    @pytest.mark.asyncio
+    async def test_poll_error(self, monkeypatch):
+        monkeypatch.setattr(settings, "uws_poll_interval", 0.001)
+        service = FakeUWSService(polls=1000)
+
+        def handler(request: httpx.Request):
+            response = service.handler(request)
+            if request.method == "GET" and service.polls < 997:
+                return httpx.Response(503)
+            return response
+
+        backend = UWSBackend(transport=httpx.MockTransport(handler))
+        task = await backend.submit(
+            "SELECT a FROM table", TAPService("http://example.com/tap")
+        )
+        response = await backend.fetch(task, block=True)
+        await backend.close()
+
+        assert "503" in response
+        assert service.requests[-2:] == [
+            ("POST", "/tap/async/job1/phase", b"PHASE=ABORT"),
+            ("DELETE", "/tap/async/job1", b""),
+        ]
@@ -0,0 +1,85 @@
+import pytest
+
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.tap_query_generator import QueryGenerator
+from .common import make_votable
+
+TABLES = [
+    ("schema_a", "schema_a.table_1"),
+    ("schema_a", "schema_a.table_2"),
+    ("schema_b", "schema_b.table_1"),
+]
+
+
+def respond(query_text: str) -> str:
+    if query_text == "SELECT schema_name, table_name FROM TAP_SCHEMA.tables":
+        return make_votable([("schema_name", "char"), ("table_name", "char")], TABLES)
+    return make_votable([("a", "int")], [(1,)])
+
+
+def respond_per_schema(query_text: str) -> str:
+    if query_text == "SELECT schema_name FROM TAP_SCHEMA.schemas":
+        return make_votable([("schema_name", "char")], [("schema_a",), ("schema_b",)])
+    if query_text.startswith("SELECT table_name FROM TAP_SCHEMA.tables"):
+        schema_name = query_text.split("'")[1]
+        return make_votable(
+            [("table_name", "char")],
+            [(table,) for schema, table in TABLES if schema == schema_name],
+        )
+    return "Unsupported query"
+
+
+class TestQueryGenerator:
+    #  Tables are discovered with a single query and grouped by schema
+    @pytest.mark.asyncio
+    async def test_discover_tables(self, tap_backend):
+        backend = tap_backend(respond)
+        tables = await QueryGenerator.discover_tables(TAPService("http://example.com"))
+        await backend.close()
+
+        assert tables == {
+            "schema_a": ["schema_a.table_1", "schema_a.table_2"],
+            "schema_b": ["schema_b.table_1"],
+        }
+        assert len(backend.queries) == 1
+
+    #  Tables are looked up per schema if the single query fails
+    @pytest.mark.asyncio
+    async def test_discover_tables_per_schema(self, tap_backend):
+        backend = tap_backend(respond_per_schema)
+        tables = await QueryGenerator.discover_tables(TAPService("http://example.com"))
+        await backend.close()
+
+        assert tables == {
+            "schema_a": ["schema_a.table_1", "schema_a.table_2"],
+            "schema_b": ["schema_b.table_1"],
+        }
+        assert len(backend.queries) == 4
+
+    #  A fullscan generates a query for every table
+    @pytest.mark.asyncio
+    async def test_generate_queries_fullscan(self, tap_backend):
+        backend = tap_backend(respond)
+        query_gen = QueryGenerator.generate_queries(
+            TAPService("http://example.com"), fullscan=True
+        )
+        queries = [query async for query in query_gen]
+        await backend.close()
+
+        assert [query.query_text for query in queries] == [
+            "SELECT TOP 1 * FROM schema_a.table_1",
+            "SELECT TOP 1 * FROM schema_a.table_2",
+            "SELECT TOP 1 * FROM schema_b.table_1",
+        ]
+
+    #  Without a fullscan, a single table is picked for each schema
+    @pytest.mark.asyncio
+    async def test_generate_queries(self, tap_backend):
+        backend = tap_backend(respond)
+        query_gen = QueryGenerator.generate_queries(
+            TAPService("http://example.com"), fullscan=False
+        )
+        queries = [query async for query in query_gen]
+        await backend.close()
+
+        assert [query.schema_name for query in queries] == ["schema_a", "schema_b"]
@@ -0,0 +1,80 @@
+import pytest
+
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.query_paginator import QueryPaginator
+from .common import make_votable
+
+QUERY = "SELECT id, ra FROM cat.sources;"
+
+
+def range_votable(nrows, lower, upper, datatype="long", nkeys=None):
+    return make_votable(
+        [
+            ("nrows", "long"),
+            ("nkeys", "long"),
+            ("lower", datatype),
+            ("upper", datatype),
+        ],
+        [(nrows, nrows if nkeys is None else nkeys, lower, upper)],
+    )
+
+
+class TestQueryPaginator:
+    #  Integer key ranges are split into pages with integer bounds
+    def test_get_page_queries(self):
+        pages = QueryPaginator.get_page_queries(QUERY, "id", 1, 10, 3)
+
+        assert pages == [
+            "SELECT * FROM (SELECT id, ra FROM cat.sources) AS q "
+            "WHERE q.id >= 1 AND q.id < 4",
+            "SELECT * FROM (SELECT id, ra FROM cat.sources) AS q "
+            "WHERE q.id >= 4 AND q.id < 7",
+            "SELECT * FROM (SELECT id, ra FROM cat.sources) AS q "
+            "WHERE q.id >= 7 AND q.id <= 10",
+        ]
+
+    #  The number of pages follows from the row count and the page size
+    @pytest.mark.asyncio
+    async def test_paginate(self, tap_backend):
+        backend = tap_backend(lambda query_text: range_votable(25, 0.5, 2.5, "double"))
+
+        pages = await QueryPaginator.paginate(
+            QUERY, "ra", [TAPService("http://example.com/tap")], page_size=10
+        )
+        await backend.close()
+
+        assert backend.queries == [
+            "SELECT COUNT(*) AS nrows, COUNT(q.ra) AS nkeys, "
+            "MIN(q.ra) AS lower, MAX(q.ra) AS upper "
+            "FROM (SELECT id, ra FROM cat.sources) AS q"
+        ]
+        assert len(pages) == 3
+        assert pages[0].endswith("WHERE q.ra >= 0.5 AND q.ra < 1.1666666666666665")
+        assert pages[-1].endswith("AND q.ra <= 2.5")
+
+    #  A query which fits in a single page is not paginated
+    @pytest.mark.asyncio
+    async def test_paginate_single_page(self, tap_backend):
+        backend = tap_backend(lambda query_text: range_votable(5, 1, 5))
+
+        pages = await QueryPaginator.paginate(
+            QUERY, "id", [TAPService("http://example.com/tap")], page_size=10
+        )
+        await backend.close()
+
+        assert pages is None
+
+    #  Rows with a null key are compared in their own page
+    @pytest.mark.asyncio
+    async def test_paginate_null_keys(self, tap_backend):
+        backend = tap_backend(lambda query_text: range_votable(25, 1, 25, nkeys=24))
+
+        pages = await QueryPaginator.paginate(
+            QUERY, "id", [TAPService("http://example.com/tap")], page_size=10
+        )
+        await backend.close()
+
+        assert len(pages) == 4
+        assert pages[-1] == (
+            "SELECT * FROM (SELECT id, ra FROM cat.sources) AS q WHERE q.id IS NULL"
+        )
@@ -0,0 +1,113 @@
+import gc
+import os
+import threading
+import httpx
+import pytest
+
+from tapvalidator.comparators.votable import StreamingVOTableComparator
+from tapvalidator.models.result import VOTable
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.models.status import Status
+from tapvalidator.services.query_backend import HTTPXBackend
+from tapvalidator.settings import settings
+from tapvalidator.utility.spool import AsyncSpoolWriter, SpoolWriter
+from .common import make_votable
+
+VOTABLE = make_votable([("id", "long"), ("ra", "double")], [(1, 1.5), (2, 2.5)])
+
+
+@pytest.fixture
+def spool_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "spool_threshold", 100)
+    monkeypatch.setattr(settings, "spool_directory", str(tmp_path / "spool"))
+    return tmp_path / "spool"
+
+
+def spool(data: bytes) -> dict:
+    writer = SpoolWriter()
+    for start in range(0, len(data), 64):
+        end = start + 64
+        writer.write(data[start:end])
+    descriptor = writer.close()
+    assert isinstance(descriptor, dict)
+    return descriptor
+
+
+class TestSpoolWriter:
+    #  Small responses are kept in memory
+    def test_small_response(self, spool_settings):
+        writer = SpoolWriter()
+        writer.write(b"small")
+
+        assert writer.close() == b"small"
+        assert not spool_settings.exists()
+
+    #  Large responses are spooled to disk
+    def test_large_response(self, spool_settings):
+        descriptor = spool(VOTABLE.encode("utf-8"))
+
+        assert descriptor["size"] == len(VOTABLE.encode("utf-8"))
+        assert os.path.dirname(descriptor["spool"]) == str(spool_settings)
+        with open(descriptor["spool"], "rb") as file:
+            assert file.read() == VOTABLE.encode("utf-8")
+
+    #  On the event loop, the spool file is written in a thread
+    @pytest.mark.asyncio
+    async def test_async_writer(self, spool_settings, monkeypatch):
+        threads = []
+        write = SpoolWriter.write
+
+        def record_write(writer, chunk):
+            threads.append(threading.current_thread())
+            write(writer, chunk)
+
+        monkeypatch.setattr(SpoolWriter, "write", record_write)
+        writer = AsyncSpoolWriter()
+        await writer.write(b"small")
+        data = VOTABLE.encode("utf-8")
+        await writer.write(data)
+        descriptor = await writer.close()
+
+        assert threads[0] is threading.main_thread()
+        assert threads[1] is not threading.main_thread()
+        with open(descriptor["spool"], "rb") as file:
+            assert file.read() == b"small" + data
+
+
+class TestSpooledVOTable:
+    #  A spooled response is read from its file, which is removed once released
+    def test_from_response(self, spool_settings):
+        descriptor = spool(VOTABLE.encode("utf-8"))
+
+        votable = VOTable.from_response(descriptor)
+
+        assert votable.spool == descriptor["spool"]
+        assert votable.status is Status.SUCCESS
+        assert votable.astropy_table.nrows == 2
+        del votable
+        gc.collect()
+        assert not os.path.exists(descriptor["spool"])
+
+    #  Spooled responses are compared from their memory-mapped views
+    def test_streaming_comparison(self, spool_settings):
+        votable1 = VOTable.from_response(spool(VOTABLE.encode("utf-8")))
+        votable2 = VOTable.from_response(spool(VOTABLE.encode("utf-8")))
+
+        assert StreamingVOTableComparator.compare(votable1.raw, votable2.raw)
+
+    #  The HTTPX backend spools large responses while they are received
+    @pytest.mark.asyncio
+    async def test_httpx_backend(self, spool_settings):
+        backend = HTTPXBackend(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, text=VOTABLE)
+            )
+        )
+        task = await backend.submit(
+            "SELECT id, ra FROM t", TAPService("http://example.com/tap")
+        )
+        response = await backend.fetch(task)
+        await backend.close()
+
+        assert os.path.exists(response["spool"])
+        assert VOTable.from_response(response).astropy_table.nrows == 2
@@ -0,0 +1,88 @@
+import time
+
+from tapvalidator.models.column_index import ColumnIndex
+from tapvalidator.models.status import Status
+from tapvalidator.models.table_state import TableState
+from tapvalidator.models.tap_schema import TAPSchemaMetadata
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.table_sampler import TableSampler
+from tapvalidator.services.table_state import TableStateStore
+
+SERVICE = TAPService("http://example.com")
+
+
+def make_metadata(column_index: ColumnIndex | None = None) -> TAPSchemaMetadata:
+    return TAPSchemaMetadata(
+        tables={"a": ["a.old", "a.new", "a.failing"], "b": ["b.changed", "b.recent"]},
+        column_index=column_index or ColumnIndex(),
+    )
+
+
+def make_store(tmp_path) -> TableStateStore:
+    now = time.time()
+    columns = ColumnIndex()
+    columns.add("b", "b.changed", "a", "int")
+    store = TableStateStore(str(tmp_path / "tables.json"))
+    store.record(SERVICE, "a", "a.old", TableState(checked_at=now - 100, latency=1))
+    store.record(
+        SERVICE,
+        "a",
+        "a.failing",
+        TableState(checked_at=now - 10, status=Status.FAIL, latency=1),
+    )
+    store.record(
+        SERVICE,
+        "b",
+        "b.changed",
+        TableState(
+            checked_at=now - 10,
+            status=Status.SUCCESS,
+            latency=1,
+            columns=TableState.signature(columns.get("b", "b.changed")),
+        ),
+    )
+    store.record(SERVICE, "b", "b.recent", TableState(checked_at=now, latency=1))
+    return store
+
+
+class TestTableSampler:
+    #  Failing tables come first, then new or changed ones, then the least recent
+    def test_priority(self, tmp_path):
+        columns = ColumnIndex()
+        columns.add("b", "b.changed", "a", "double")
+
+        selected = TableSampler.select(
+            SERVICE,
+            make_metadata(columns),
+            max_queries=0,
+            max_duration=0,
+            store=make_store(tmp_path),
+        )
+
+        assert selected == [
+            ("a", "a.failing"),
+            ("a", "a.new"),
+            ("b", "b.changed"),
+            ("a", "a.old"),
+            ("b", "b.recent"),
+        ]
+
+    #  The selection stops once the number of queries or their duration is reached
+    def test_budget(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            "tapvalidator.services.table_sampler.settings.max_parallel_tasks", 1
+        )
+        store = make_store(tmp_path)
+
+        assert len(TableSampler.select(SERVICE, make_metadata(), 2, 0, store)) == 2
+        assert len(TableSampler.select(SERVICE, make_metadata(), 0, 3, store)) == 3
+        assert len(TableSampler.select(SERVICE, make_metadata(), 0, 0.1, store)) == 1
+
+    #  The state of the tables is persisted between runs
+    def test_store_persisted(self, tmp_path):
+        make_store(tmp_path).save()
+
+        states = TableStateStore(str(tmp_path / "tables.json")).get(SERVICE)
+
+        assert states["a/a.failing"].status is Status.FAIL
+        assert states["a/a.old"].latency == 1
@@ -0,0 +1,213 @@
+import time
+import asyncio
+import pytest
+
+from tapvalidator.models.budget import ValidationBudget
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.metadata_cache import metadata_cache
+from tapvalidator.services.table_state import table_state
+from tapvalidator.services.tap_query import QueryRunner
+from tapvalidator.settings import settings
+from tapvalidator.validators.table_validator import TableValidator
+from .common import make_votable
+
+TABLES = [
+    ("schema_a", "schema_a.table_1"),
+    ("schema_a", "schema_a.broken"),
+    ("schema_b", "schema_b.table_1"),
+]
+
+ERROR_VOTABLE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<VOTABLE version="1.3" xmlns="http://www.ivoa.net/xml/VOTable/v1.3">'
+    '<RESOURCE type="results">'
+    '<INFO name="QUERY_STATUS" value="ERROR">Table does not exist</INFO>'
+    "</RESOURCE></VOTABLE>"
+)
+
+
+def respond_columns(query_text: str) -> str:
+    if "broken" in query_text:
+        return make_votable([("a", "double")], [(1.5,)])
+    return respond(query_text)
+
+
+def respond(query_text: str) -> str:
+    if query_text == "SELECT schema_name, table_name FROM TAP_SCHEMA.tables":
+        return make_votable([("schema_name", "char"), ("table_name", "char")], TABLES)
+    if query_text.startswith("SELECT c.table_name, c.column_name, c.datatype"):
+        schema_name = query_text.split("'")[1]
+        return make_votable(
+            [("table_name", "char"), ("column_name", "char"), ("datatype", "char")],
+            [
+                (table, "a", "INTEGER")
+                for schema, table in TABLES
+                if schema == schema_name
+            ],
+        )
+    if "broken" in query_text:
+        return ERROR_VOTABLE
+    return make_votable([("a", "int")], [(1,)])
+
+
+class TestTableValidator:
+    #  Every table is queried in a fullscan, and failing tables are reported
+    @pytest.mark.asyncio
+    async def test_validate_fullscan(self, tap_backend):
+        backend = tap_backend(respond)
+        validator = TableValidator(TAPService("http://example.com"), fullscan=True)
+        result = await validator.validate()
+        await backend.close()
+
+        assert result.status is Status.FAIL
+        assert [query.table_name for query in result.failures] == ["schema_a.broken"]
+        assert len(backend.queries) == 2 + len(TABLES)
+
+    #  A service whose tables can all be queried passes the validation
+    @pytest.mark.asyncio
+    async def test_validate_success(self, tap_backend):
+        backend = tap_backend(
+            lambda query_text: respond(query_text.replace("broken", "table_2"))
+        )
+        validator = TableValidator(TAPService("http://example.com"), fullscan=True)
+        result = await validator.validate()
+        await backend.close()
+
+        assert result.status is Status.SUCCESS
+        assert result.failures == []
+
+    #  Columns are checked against TAP_SCHEMA with one query per schema
+    @pytest.mark.asyncio
+    async def test_validate_columns(self, tap_backend):
+        backend = tap_backend(respond_columns)
+        validator = TableValidator(
+            TAPService("http://example.com"), fullscan=True, check_columns=True
+        )
+        result = await validator.validate()
+        await backend.close()
+
+        assert result.status is Status.COLUMN_VALIDATION_FAIL
+        assert [query.table_name for query in result.failures] == ["schema_a.broken"]
+        columns_queries = [
+            query
+            for query in backend.queries
+            if query.startswith("SELECT c.table_name, c.column_name")
+        ]
+        assert len(columns_queries) == 2
+        assert validator.column_index.get("schema_b", "schema_b.table_1") == {
+            "a": "INTEGER"
+        }
+
+    #  A schema whose columns can not be loaded is not marked as loaded, and its
+    #  tables do not fail the column validation
+    @pytest.mark.asyncio
+    async def test_validate_columns_load_failed(self, tap_backend):
+        def respond_failing_columns(query_text: str) -> str:
+            if (
+                query_text.startswith("SELECT c.table_name")
+                and "schema_a" in query_text
+            ):
+                return ERROR_VOTABLE
+            return respond_columns(query_text)
+
+        backend = tap_backend(respond_failing_columns)
+        validator = TableValidator(
+            TAPService("http://example.com"), fullscan=True, check_columns=True
+        )
+        result = await validator.validate()
+        await backend.close()
+
+        assert result.status is Status.SUCCESS
+        assert validator.column_index.schemas == {"schema_b"}
+        assert "schema_a" not in validator._column_loads
+        cached = metadata_cache.get(TAPService("http://example.com"))
+        assert cached.column_index.schemas == {"schema_b"}
+
+    #  Incremental runs check the failing table first, then the tables not checked
+    #  yet, until every table has been covered
+    @pytest.mark.asyncio
+    async def test_validate_incremental(self, tap_backend, monkeypatch):
+        monkeypatch.setattr(settings, "incremental_max_queries", 2)
+        backend = tap_backend(respond)
+        checked = []
+        for _ in range(3):
+            backend.queries.clear()
+            await TableValidator(
+                TAPService("http://example.com"), incremental=True
+            ).validate()
+            checked.append(
+                sorted(query for query in backend.queries if "TOP 1" in query)
+            )
+        await backend.close()
+
+        assert {query for queries in checked[:2] for query in queries} == {
+            f"SELECT TOP 1 * FROM {table}" for _, table in TABLES
+        }
+        assert "SELECT TOP 1 * FROM schema_a.broken" in checked[1]
+        assert "SELECT TOP 1 * FROM schema_a.broken" in checked[2]
+        assert table_state.get(TAPService("http://example.com"))[
+            "schema_a/schema_a.broken"
+        ].failing
+
+    #  Incremental runs record the columns of the tables without check_columns, so
+    #  that changed tables are detected
+    @pytest.mark.asyncio
+    async def test_validate_incremental_columns(self, tap_backend):
+        backend = tap_backend(respond)
+        tap_service = TAPService("http://example.com")
+        await TableValidator(tap_service, incremental=True).validate()
+        await backend.close()
+
+        states = table_state.get(tap_service)
+        assert all(state.columns for state in states.values())
+        cached = metadata_cache.get(tap_service)
+        assert cached is not None
+        assert cached.column_index.schemas == {"schema_a", "schema_b"}
+
+    #  With a limited number of queries, the previously failing table is checked
+    #  first and the coverage is reported
+    @pytest.mark.asyncio
+    async def test_validate_max_queries(self, tap_backend):
+        backend = tap_backend(respond)
+        await TableValidator(TAPService("http://example.com"), fullscan=True).validate()
+        backend.queries.clear()
+        result = await TableValidator(
+            TAPService("http://example.com"),
+            fullscan=True,
+            budget=ValidationBudget(max_queries=1),
+        ).validate()
+        await backend.close()
+
+        assert [query for query in backend.queries if "TOP 1" in query] == [
+            "SELECT TOP 1 * FROM schema_a.broken"
+        ]
+        assert (result.tables, result.checked) == (3, 1)
+        assert "Checked 1 of 3 tables (33%) within the budget" in result.messages
+
+    #  Queries still running at the deadline are cancelled
+    @pytest.mark.asyncio
+    async def test_validate_deadline(self, tap_backend, monkeypatch):
+        backend = tap_backend(respond)
+        run_query = QueryRunner.run_query
+
+        async def slow_run_query(query, block=False):
+            if "broken" in query.query_text:
+                await asyncio.sleep(10)
+            return await run_query(query, block=block)
+
+        monkeypatch.setattr(QueryRunner, "run_query", slow_run_query)
+        start_time = time.monotonic()
+        result = await TableValidator(
+            TAPService("http://example.com"),
+            fullscan=True,
+            budget=ValidationBudget(deadline=0.5),
+        ).validate()
+        await backend.close()
+
+        assert time.monotonic() - start_time < 2
+        assert result.status is Status.SUCCESS
+        assert (result.tables, result.checked) == (3, 2)
+        assert "schema_a/schema_a.broken" not in table_state.get(
+            TAPService("http://example.com")
+        )
@@ -1,13 +1,25 @@
+import re
+import json
+import asyncio
+import httpx
 import pytest
 from unittest.mock import patch
+from click.testing import CliRunner
+from tapvalidator.constants.tap_params import STANDARD_PARAMS
 from tapvalidator.models.validation_config import ValidationConfiguration
+from tapvalidator.models.comparison_options import ComparisonOptions
 from tapvalidator.models.tap_service import TAPService
-from tapvalidator.tap_validator import TAPValidator
+from tapvalidator.models.result_format import ResultFormat
+from tapvalidator.tap_validator import TAPValidator, main
 from tapvalidator.models.status import Status
 from tapvalidator.models.query import Query
 from tapvalidator.models.result import ValidationResult
 from tapvalidator.services.alerter import AlerterResolver
+from tapvalidator.services.format_negotiator import FormatNegotiator
 from tapvalidator.exceptions.invalid_mode import InvalidRunMode
+from tapvalidator.services.query_backend import HTTPXBackend
+from tapvalidator.services.tap_query import QueryRunner
+from .common import make_votable
 
 
 class TestTAPValidator:
@@ -81,3 +93,204 @@ class TestTAPValidator:
         # running comparison mode without known set of queries
         with pytest.raises(NotImplementedError):
             await tap_validator.run(mode="COMPARISON")
+
+    #  An unknown result format is rejected as a bad option value
+    def test_invalid_result_formats(self):
+        result = CliRunner().invoke(
+            main, ["--mode", "VALIDATION", "--result_formats", "votable,fits"]
+        )
+
+        assert result.exit_code == 2
+        assert "Unknown result format [fits]" in result.output
+
+    #  A malformed column tolerance is rejected as a bad option value
+    def test_invalid_tolerance(self):
+        for tolerance in ("ra:0.1", "ra:x:y"):
+            result = CliRunner().invoke(
+                main, ["--mode", "COMPARISON", "--tolerance", tolerance]
+            )
+
+            assert result.exit_code == 2
+            assert f"Invalid column tolerance [{tolerance}]" in result.output
+
+
+class TestCompareTAPServices:
+    @pytest.fixture(autouse=True)
+    def votable_format(self, monkeypatch):
+        """Request VOTABLE results without reading the capabilities of the
+        services"""
+
+        async def negotiate(tap_service, preference=None):
+            return ResultFormat.VOTABLE, STANDARD_PARAMS["FORMAT"]
+
+        monkeypatch.setattr(FormatNegotiator, "negotiate", negotiate)
+
+    @staticmethod
+    def make_validator(tmp_path, queries):
+        queries_file = tmp_path / "queries.txt"
+        queries_file.write_text("\n".join(queries))
+        config = ValidationConfiguration(
+            first_service=TAPService(url="http://first.example.com/tap"),
+            second_service=TAPService(url="http://second.example.com/tap"),
+            queries=str(queries_file),
+        )
+        return TAPValidator(config)
+
+    #  Results with the same fingerprint are not downloaded in full
+    @pytest.mark.asyncio
+    async def test_fingerprints_match(self, tap_backend, tmp_path):
+        votable = make_votable([("a", "int")], [(1,), (2,)])
+        backend = tap_backend(lambda query_text: votable)
+        tap_validator = self.make_validator(tmp_path, ["SELECT a FROM t"])
+
+        report = await tap_validator.compare_query("SELECT a FROM t", fingerprint=True)
+
+        assert report.equal
+        assert report.nrows1 == report.nrows2 == 2
+        assert len(backend.queries) == 2
+        await backend.close()
+
+    #  Results with different fingerprints are compared in full
+    @pytest.mark.asyncio
+    async def test_fingerprints_differ(self, tap_backend, tmp_path):
+        votable1 = make_votable([("a", "int")], [(1,), (2,)])
+        votable2 = make_votable([("a", "int")], [(1,), (3,)])
+        votables = iter([votable1, votable2, votable1, votable2])
+        backend = tap_backend(lambda query_text: next(votables))
+        tap_validator = self.make_validator(tmp_path, ["SELECT a FROM t"])
+
+        report = await tap_validator.compare_query("SELECT a FROM t", fingerprint=True)
+
+        assert not report.equal
+        assert report.column_mismatches == {"a": 1}
+        assert len(backend.queries) == 4
+        await backend.close()
+
+    #  Each query of the file is run once on each service
+    @pytest.mark.asyncio
+    async def test_compare_tap_services(self, tap_backend, tmp_path):
+        votable = make_votable([("a", "int")], [(1,)])
+        backend = tap_backend(lambda query_text: votable)
+        tap_validator = self.make_validator(tmp_path, ["SELECT 1", "SELECT 2"])
+
+        reports = await tap_validator.compare_tap_services(
+            report=str(tmp_path / "report.json")
+        )
+
+        assert [report.query for report in reports] == ["SELECT 1", "SELECT 2"]
+        assert all(report.equal for report in reports)
+        assert json.loads((tmp_path / "report.json").read_text())[1]["equal"]
+        assert sorted(backend.queries) == [
+            "SELECT 1",
+            "SELECT 1",
+            "SELECT 2",
+            "SELECT 2",
+        ]
+        await backend.close()
+
+    #  Both services and several queries are queried at the same time
+    @pytest.mark.asyncio
+    async def test_compare_tap_services_concurrently(self, tmp_path):
+        votable = make_votable([("a", "int")], [(1,)])
+        in_flight = {"current": 0, "max": 0}
+
+        async def handler(request: httpx.Request):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            await asyncio.sleep(0.01)
+            in_flight["current"] -= 1
+            return httpx.Response(200, text=votable)
+
+        backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+        previous_backend = QueryRunner.backend
+        QueryRunner.set_backend(backend)
+        queries = [f"SELECT {index}" for index in range(10)]
+        try:
+            await self.make_validator(tmp_path, queries).compare_tap_services()
+        finally:
+            QueryRunner.set_backend(previous_backend)
+            await backend.close()
+
+        assert in_flight["max"] > 2
+
+    #  Large queries are compared in pages, combined into a single report
+    @pytest.mark.asyncio
+    async def test_compare_pages(self, tap_backend, tmp_path):
+        def respond(query_text):
+            if query_text.startswith("SELECT COUNT(*)"):
+                return make_votable(
+                    [
+                        ("nrows", "long"),
+                        ("nkeys", "long"),
+                        ("lower", "long"),
+                        ("upper", "long"),
+                    ],
+                    [(4, 4, 1, 4)],
+                )
+            if "q.id >= 1 AND" in query_text:
+                return make_votable([("id", "long")], [(1,), (2,)])
+            return make_votable([("id", "long")], [(3,), (4,)])
+
+        backend = tap_backend(respond)
+        tap_validator = self.make_validator(tmp_path, ["SELECT id FROM t"])
+        tap_validator.config.comparison_options = ComparisonOptions(
+            key_columns=["id"], page_size=2
+        )
+
+        report = await tap_validator.compare_query("SELECT id FROM t")
+
+        assert report.equal
+        assert report.nrows1 == report.nrows2 == 4
+        assert len(backend.queries) == 6
+        await backend.close()
+
+    #  Pages cover the key range of both services, so extra rows of the second
+    #  service are found
+    @pytest.mark.asyncio
+    async def test_compare_pages_extra_row(self, tmp_path):
+        ids = {"first.example.com": [1, 2, 3, 4], "second.example.com": [1, 2, 3, 4, 5]}
+        range_queries = []
+
+        def handler(request: httpx.Request):
+            query_text = request.url.params.get("QUERY", "")
+            rows = ids[request.url.host]
+            if query_text.startswith("SELECT COUNT(*)"):
+                range_queries.append(request.url.host)
+                return httpx.Response(
+                    200,
+                    text=make_votable(
+                        [
+                            ("nrows", "long"),
+                            ("nkeys", "long"),
+                            ("lower", "long"),
+                            ("upper", "long"),
+                        ],
+                        [(len(rows), len(rows), min(rows), max(rows))],
+                    ),
+                )
+            match = re.search(r"q.id >= (\d+) AND q.id (<=?) (\d+)", query_text)
+            assert match is not None
+            lower, operator, upper = int(match[1]), match[2], int(match[3])
+            page = [
+                (row,)
+                for row in rows
+                if lower <= row and (row <= upper if operator == "<=" else row < upper)
+            ]
+            return httpx.Response(200, text=make_votable([("id", "long")], page))
+
+        backend = HTTPXBackend(transport=httpx.MockTransport(handler))
+        previous_backend = QueryRunner.backend
+        QueryRunner.set_backend(backend)
+        tap_validator = self.make_validator(tmp_path, ["SELECT id FROM t"])
+        tap_validator.config.comparison_options = ComparisonOptions(
+            key_columns=["id"], page_size=2
+        )
+        try:
+            report = await tap_validator.compare_query("SELECT id FROM t")
+        finally:
+            QueryRunner.set_backend(previous_backend)
+            await backend.close()
+
+        assert sorted(range_queries) == ["first.example.com", "second.example.com"]
+        assert not report.equal
+        assert (report.nrows1, report.nrows2) == (4, 5)
@@ -0,0 +1,104 @@
+import time
+import asyncio
+import httpx
+import pytest
+
+from tapvalidator.models.result import ValidationResult
+from tapvalidator.models.status import Status
+from tapvalidator.models.tap_service import TAPService
+from tapvalidator.services.http_sessions import EndpointClient
+from tapvalidator.services.validator_scheduler import ValidatorScheduler
+from tapvalidator.validators.availability_validator import AvailabilityValidator
+from tapvalidator.validators.vosi_validator import VOSIValidator
+
+AVAILABILITY = (
+    '<vosi:availability xmlns:vosi="http://www.ivoa.net/xml/VOSIAvailability/v1.0">'
+    "<vosi:available>true</vosi:available></vosi:availability>"
+)
+
+
+class SleepingValidator:
+    """Validator which takes some time, and records when it ran"""
+
+    def __init__(self, delay: float, status: Status = Status.SUCCESS):
+        self.delay = delay
+        self.status = status
+        self.started: float | None = None
+
+    async def validate(self) -> ValidationResult:
+        self.started = time.monotonic()
+        await asyncio.sleep(self.delay)
+        return ValidationResult(status=self.status)
+
+
+class TestValidatorScheduler:
+    #  Independent validators run at the same time
+    @pytest.mark.asyncio
+    async def test_concurrent(self):
+        scheduler = ValidatorScheduler()
+        for name in ("a", "b", "c"):
+            scheduler.add(name, SleepingValidator(0.1))
+
+        start_time = time.monotonic()
+        results = await scheduler.run()
+
+        assert time.monotonic() - start_time < 0.25
+        assert list(results) == ["a", "b", "c"]
+        assert all(result.status is Status.SUCCESS for result in results.values())
+
+    #  A validator only starts once its dependencies have succeeded
+    @pytest.mark.asyncio
+    async def test_dependencies(self):
+        first, second = SleepingValidator(0.05), SleepingValidator(0)
+        completed = []
+
+        async def on_result(name, result):
+            completed.append((name, time.monotonic()))
+
+        scheduler = ValidatorScheduler()
+        scheduler.add("first", first)
+        scheduler.add("second", second, depends_on=("first",))
+        await scheduler.run(on_result=on_result)
+
+        assert [name for name, _ in completed] == ["first", "second"]
+        assert second.started >= completed[0][1]
+
+    #  A validator whose dependency failed is skipped
+    @pytest.mark.asyncio
+    async def test_failed_dependency(self):
+        dependent = SleepingValidator(0)
+        scheduler = ValidatorScheduler()
+        scheduler.add("availability", SleepingValidator(0, status=Status.FAIL))
+        scheduler.add("tables", dependent, depends_on=("availability",))
+
+        results = await scheduler.run()
+
+        assert dependent.started is None
+        assert results["tables"].status is Status.FAIL
+        assert "availability" in results["tables"].messages[0]
+
+    #  Dependencies must be added before the validators depending on them
+    def test_unknown_dependency(self):
+        with pytest.raises(ValueError):
+            ValidatorScheduler().add("tables", SleepingValidator(0), ("missing",))
+
+
+class TestXMLValidators:
+    #  The VOSI endpoints are requested without blocking the event loop
+    @pytest.mark.asyncio
+    async def test_validate_endpoints(self, monkeypatch):
+        def handler(request: httpx.Request):
+            if request.url.path.endswith("availability"):
+                return httpx.Response(200, text=AVAILABILITY)
+            raise httpx.ConnectError("Connection refused", request=request)
+
+        monkeypatch.setattr(EndpointClient, "transport", httpx.MockTransport(handler))
+        tap_service = TAPService("http://example.com/tap")
+
+        availability = await AvailabilityValidator(tap_service).validate()
+        tables = await VOSIValidator(tap_service).validate()
+        await EndpointClient.close()
+
+        assert availability.status is Status.SUCCESS
+        assert tables.status is Status.FAIL
+        assert "Connection refused" in tables.messages[0]
@@ -0,0 +1,195 @@
+import json
+import numpy as np
+import pytest
+
+from tapvalidator.comparators.votable import (
+    StreamingVOTableComparator,
+    VOTableComparator,
+)
+from tapvalidator.models.comparison_options import ComparisonOptions
+from tapvalidator.models.result import VOTable
+from .common import make_binary2_votable, make_votable
+
+FIELDS = [("id", "long"), ("name", "char"), ("ra", "double")]
+ROWS = [(1, "a", 10.5), (2, "b", "NaN"), (3, "c", "")]
+
+
+class TestVOTableComparator:
+    #  Identical VOTables are equal
+    def test_compare_equal(self):
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, ROWS))
+
+        assert VOTableComparator.compare(votable1, votable2)
+
+    #  A single different cell makes the VOTables differ
+    def test_compare_different_value(self):
+        rows = ROWS[:2] + [(3, "d", "")]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+
+        assert not VOTableComparator.compare(votable1, votable2)
+
+    #  A null value differs from a non null value
+    def test_compare_null_value(self):
+        rows = ROWS[:2] + [(3, "c", 1.0)]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+
+        assert not VOTableComparator.compare(votable1, votable2)
+
+    #  VOTables with different fields differ
+    def test_compare_different_fields(self):
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS[:2], [row[:2] for row in ROWS]))
+
+        assert not VOTableComparator.compare(votable1, votable2)
+
+    #  NaN and masked values are handled when comparing columns
+    def test_column_mismatches(self):
+        column1 = np.ma.array([1.0, np.nan, 3.0, 4.0], mask=[0, 0, 1, 1])
+        column2 = np.ma.array([1.0, np.nan, 5.0, 4.0], mask=[0, 0, 1, 0])
+
+        mismatches = VOTableComparator.column_mismatches(column1, column2)
+
+        assert mismatches.tolist() == [False, False, False, True]
+
+
+class TestStreamingVOTableComparator:
+    #  Identical VOTables are equal, whatever the chunk size
+    def test_compare_equal(self):
+        data = make_votable(FIELDS, ROWS * 10).encode("utf-8")
+
+        assert StreamingVOTableComparator.compare(data, data, chunk_size=7)
+
+    #  A difference in the last chunk is found
+    def test_compare_different_value(self):
+        data1 = make_votable(FIELDS, ROWS * 10).encode("utf-8")
+        data2 = make_votable(FIELDS, ROWS * 9 + [(1, "a", 10.5), (2, "b", 1.0)])
+
+        assert not StreamingVOTableComparator.compare(
+            data1, data2.encode("utf-8"), chunk_size=7
+        )
+
+    #  VOTables with a different number of rows differ
+    def test_compare_different_length(self):
+        data1 = make_votable(FIELDS, ROWS * 10).encode("utf-8")
+        data2 = make_votable(FIELDS, ROWS * 9).encode("utf-8")
+
+        assert not StreamingVOTableComparator.compare(data1, data2, chunk_size=7)
+
+    #  Numbers are compared by value rather than by their text
+    def test_compare_numeric_text(self):
+        data1 = make_votable(FIELDS, [(1, "a", "10.5")]).encode("utf-8")
+        data2 = make_votable(FIELDS, [(1, "a", "1.05E1")]).encode("utf-8")
+
+        assert StreamingVOTableComparator.compare(data1, data2)
+
+    #  Only TABLEDATA can be streamed, other serializations are not read as empty
+    def test_compare_binary2(self):
+        data = make_binary2_votable(FIELDS, ROWS)
+
+        with pytest.raises(ValueError):
+            StreamingVOTableComparator.compare(data, data)
+
+
+class TestVOTableDiff:
+    #  The report lists the mismatched rows and the mismatches per column
+    def test_diff_values(self):
+        rows = [(1, "a", 10.5), (2, "x", 1.0), (3, "y", "")]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+
+        report = VOTableComparator.diff(votable1, votable2)
+
+        assert not report.equal
+        assert report.column_mismatches == {"name": 2, "ra": 1}
+        assert report.mismatched_rows == [
+            {"row": 1, "columns": {"name": ["b", "x"], "ra": [None, 1.0]}},
+            {"row": 2, "columns": {"name": ["c", "y"]}},
+        ]
+
+    #  The number of reported rows is limited
+    def test_diff_max_rows(self):
+        rows = [(1, "x", 10.5), (2, "y", "NaN"), (3, "z", "")]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+
+        report = VOTableComparator.diff(votable1, votable2, max_rows=1)
+
+        assert report.column_mismatches == {"name": 3}
+        assert len(report.mismatched_rows) == 1
+
+    #  Differences in fields and row counts are reported
+    def test_diff_fields_and_rows(self):
+        fields = [("id", "int"), ("name", "char"), ("dec", "double")]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(fields, ROWS[:2]))
+
+        report = VOTableComparator.diff(votable1, votable2)
+
+        assert not report.equal
+        assert report.row_count_delta == -1
+        assert report.field_differences == [
+            "Field [id] has datatype [long] in the first result "
+            "and [int] in the second",
+            "Field [ra] is missing from the second result",
+            "Field [dec] is missing from the first result",
+        ]
+        assert report.column_mismatches == {}
+
+    #  The report can be exported as JSON
+    def test_report_json(self):
+        rows = ROWS[:2] + [(3, "c", 1.0)]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+
+        report = json.loads(VOTableComparator.diff(votable1, votable2).to_json())
+
+        assert report["equal"] is False
+        assert report["mismatched_rows"] == [{"row": 2, "columns": {"ra": [None, 1.0]}}]
+
+
+class TestComparisonOptions:
+    #  Numeric values within the tolerance are equal
+    def test_tolerance(self):
+        column1 = np.ma.array([1.0, 100.0, 5.0])
+        column2 = np.ma.array([1.0 + 1e-9, 100.1, 6.0])
+
+        mismatches = VOTableComparator.column_mismatches(
+            column1, column2, atol=1e-6, rtol=1e-3
+        )
+
+        assert mismatches.tolist() == [False, False, True]
+
+    #  Column tolerances and excluded columns are applied when comparing tables
+    def test_options(self):
+        rows = [(1, "x", 10.5000001), (2, "y", "NaN"), (3, "z", "")]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+        options = ComparisonOptions.from_strings(
+            tolerances=("ra:1e-6:0",), exclude="name"
+        )
+
+        assert not VOTableComparator.compare(votable1, votable2)
+        assert VOTableComparator.compare(votable1, votable2, options)
+
+    #  Rows are matched on the key columns, whatever their order
+    def test_key_columns(self):
+        rows = [(3, "c", ""), (4, "d", 2.0), (1, "a", 10.5), (2, "b", 1.0)]
+        votable1 = VOTable(data=make_votable(FIELDS, ROWS))
+        votable2 = VOTable(data=make_votable(FIELDS, rows))
+        options = ComparisonOptions(key_columns=["id"])
+
+        report = VOTableComparator.diff(votable1, votable2, options)
+
+        assert not report.equal
+        assert report.unmatched_rows1 == 0
+        assert report.unmatched_rows2 == 1
+        assert report.column_mismatches == {"ra": 1}
+        assert report.mismatched_rows == [
+            {"row": 1, "columns": {"ra": [None, 1.0]}, "key": {"id": 2}}
+        ]
+        assert VOTableComparator.compare(
+            votable1, VOTable(data=make_votable(FIELDS, ROWS[::-1])), options
+        )